@@ -1,9 +1,42 @@
-from flask import Flask, render_template, request, redirect, url_for, session, flash
+from flask import Flask, Response, render_template, request, redirect, url_for, session, flash, jsonify, g, has_request_context
+from flask.sessions import SecureCookieSession, SessionInterface, session_json_serializer
 import mysql.connector
+import numpy as np
+from mysql.connector import errors as mysql_errors
+from collections import OrderedDict, deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
+from datetime import datetime, timedelta
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
 from functools import wraps
+from itertools import chain, groupby
+from operator import itemgetter
+from werkzeug.security import generate_password_hash, check_password_hash
+from array import array
+import ast
+import base64
+import click
+import csv
+import multiprocessing
+import fcntl
+import gzip
+import hashlib
+import hmac
+import io
+import json
+import os
+import re
+import secrets
+import shutil
+import signal
+import sqlite3
+import threading
+import uuid
+import time
 
 app = Flask(__name__)
 app.secret_key = 'your_secret_key'  # Replace with a secure key for sessions
+# Web worker processes, as set for gunicorn; state kept in process memory is not shared between them
+app.config['WORKERS'] = int(os.environ.get('WEB_CONCURRENCY', 1))
 
 
 # -----------------------------
@@ -19,35 +52,3384 @@ db_config = {
     'collation': 'utf8mb4_general_ci'
 }
 
+pool_config = {
+    'size': 10,             # Maximum number of open connections
+    'timeout': 5,           # Seconds to wait for a free connection before giving up
+    'max_idle': 300,        # Seconds an unused connection may sit in the pool
+    'max_lifetime': 3600,   # Seconds before a connection is recycled regardless of use
+    'ping_after': 30        # Seconds of idleness after which a borrowed connection is health-checked
+}
+
+replica_config = {
+    'hosts': [],                  # Settings merged over db_config per replica, e.g. [{'host': '127.0.0.1', 'port': 3307}]
+    'strategy': 'round_robin',    # 'round_robin', or 'least_loaded' for the replica with the fewest borrowed connections
+    'eject_after': 3,             # Consecutive connection failures before a replica is taken out of rotation
+    'eject_for': 30,              # Seconds an ejected replica sits out before it is tried again
+    'sticky_for': 5               # Seconds a session keeps reading from the primary after it writes
+}
+
+# -----------------------------
+# Connection Pool
+# -----------------------------
+
+class ConnectionPool:
+    """A bounded pool of reusable MySQL connections."""
+
+    def __init__(self, config, size=10, timeout=5, max_idle=300, max_lifetime=3600, ping_after=30):
+        self.config = config
+        self.size = size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.max_lifetime = max_lifetime
+        self.ping_after = ping_after
+        self._idle = deque()   # (connection, created_at, last_used), most recently used on the right
+        self._born = {}        # id(connection) -> created_at for connections currently borrowed
+        self._open = 0
+        self._lock = threading.Condition()
+        self._stats = {'in_use': 0, 'waiting': 0, 'created': 0, 'recycled': 0, 'timeouts': 0}
+
+    def _connect(self):
+        conn = mysql.connector.connect(**self.config)
+        with self._lock:
+            self._stats['created'] += 1
+        return conn
+
+    def _discard(self, conn):
+        """Closes a connection that is no longer fit for reuse. Caller must hold the lock."""
+        self._open -= 1
+        self._stats['recycled'] += 1
+        self._lock.notify()
+        try:
+            conn.close()
+        except mysql.connector.Error:
+            pass
+
+    def _evict_idle(self, now):
+        """Drops connections that have been idle or alive for too long. Caller must hold the lock."""
+        # The least recently used connections sit on the left.
+        while self._idle:
+            conn, created_at, last_used = self._idle[0]
+            if now - last_used < self.max_idle and now - created_at < self.max_lifetime:
+                break
+            self._idle.popleft()
+            self._discard(conn)
+
+    def acquire(self):
+        """Borrows a healthy connection, opening a new one if the pool has room."""
+        deadline = time.monotonic() + self.timeout
+        with self._lock:
+            while True:
+                now = time.monotonic()
+                self._evict_idle(now)
+                if self._idle:
+                    conn, created_at, last_used = self._idle.pop()
+                    break
+                if self._open < self.size:
+                    conn, created_at, last_used = None, now, now
+                    self._open += 1
+                    break
+                remaining = deadline - now
+                if remaining <= 0:
+                    self._stats['timeouts'] += 1
+                    raise mysql_errors.PoolError('Timed out waiting for a database connection.')
+                self._stats['waiting'] += 1
+                try:
+                    self._lock.wait(remaining)
+                finally:
+                    self._stats['waiting'] -= 1
+            self._stats['in_use'] += 1
+
+        try:
+            if conn is not None and now - last_used >= self.ping_after:
+                # Health-check connections that have been idle long enough to have been dropped by the server.
+                try:
+                    conn.ping(reconnect=False)
+                except mysql.connector.Error:
+                    with self._lock:
+                        self._stats['recycled'] += 1
+                    try:
+                        conn.close()
+                    except mysql.connector.Error:
+                        pass
+                    conn = None
+            if conn is None:
+                conn = self._connect()
+                created_at = time.monotonic()
+        except Exception:
+            with self._lock:
+                self._open -= 1
+                self._stats['in_use'] -= 1
+                self._lock.notify()
+            raise
+
+        with self._lock:
+            self._born[id(conn)] = created_at
+        return conn
+
+    def release(self, conn):
+        """Returns a borrowed connection to the pool."""
+        healthy = True
+        try:
+            # End any open transaction so the next borrower does not inherit locks or a stale snapshot.
+            conn.rollback()
+        except mysql.connector.Error:
+            healthy = False
+
+        now = time.monotonic()
+        with self._lock:
+            created_at = self._born.pop(id(conn), now)
+            self._stats['in_use'] -= 1
+            if healthy and now - created_at < self.max_lifetime:
+                self._idle.append((conn, created_at, now))
+                self._lock.notify()
+            else:
+                self._discard(conn)
+
+    def stats(self):
+        """Returns a snapshot of the pool counters."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['idle'] = len(self._idle)
+            stats['open'] = self._open
+            stats['size'] = self.size
+        return stats
+
+class ReplicaSet:
+    """Read replicas, each with its own pool. Replicas that keep failing are ejected for a while."""
+
+    def __init__(self, hosts, strategy='round_robin', eject_after=3, eject_for=30):
+        self.replicas = [{
+            'name': f"{config.get('host', db_config['host'])}:{config.get('port', 3306)}",
+            'pool': ConnectionPool({**db_config, **config}, **pool_config),
+            'failures': 0,
+            'ejected_until': 0
+        } for config in hosts]
+        self.strategy = strategy
+        self.eject_after = eject_after
+        self.eject_for = eject_for
+        self._turn = 0
+        self._lock = threading.Lock()
+
+    def _order(self):
+        """Returns the replicas in rotation, best candidate first."""
+        now = time.monotonic()
+        with self._lock:
+            healthy = [replica for replica in self.replicas if replica['ejected_until'] <= now]
+            if not healthy:
+                return []
+            if self.strategy == 'least_loaded':
+                return sorted(healthy, key=lambda replica: replica['pool'].stats()['in_use'])
+            start = self._turn % len(healthy)
+            self._turn += 1
+            return healthy[start:] + healthy[:start]
+
+    def _record_failure(self, replica):
+        with self._lock:
+            replica['failures'] += 1
+            if replica['failures'] >= self.eject_after:
+                replica['ejected_until'] = time.monotonic() + self.eject_for
+                print(f"Error: replica {replica['name']} ejected for {self.eject_for}s")
+
+    def acquire(self):
+        """Borrows a connection from a healthy replica. Returns (replica, connection), or None if there is none."""
+        for replica in self._order():
+            try:
+                conn = replica['pool'].acquire()
+            except mysql_errors.PoolError:
+                continue  # Busy rather than unhealthy
+            except mysql.connector.Error as err:
+                print(f"Error: {err}")
+                self._record_failure(replica)
+                continue
+            return replica, conn
+        return None
+
+    def release(self, replica, conn, failed=False):
+        """Returns a connection from acquire(). Only consecutive failures count towards ejection."""
+        replica['pool'].release(conn)
+        if failed:
+            self._record_failure(replica)
+        else:
+            with self._lock:
+                replica['failures'] = 0
+
+    def stats(self):
+        now = time.monotonic()
+        return [dict(replica['pool'].stats(), name=replica['name'], failures=replica['failures'],
+                     healthy=replica['ejected_until'] <= now) for replica in self.replicas]
+
+db_pool = ConnectionPool(db_config, **pool_config)
+replica_set = ReplicaSet(replica_config['hosts'], replica_config['strategy'], replica_config['eject_after'],
+                         replica_config['eject_for'])
+
+# -----------------------------
+# Caching
+# -----------------------------
+
+class LRUCache:
+    """A thread-safe LRU cache whose entries optionally expire after ttl seconds."""
+
+    def __init__(self, maxsize=1024, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (value, expires_at)
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._data.pop(key, None)
+        return default if entry is None else entry[0]
+
+    def pop_where(self, predicate):
+        """Removes every entry whose value satisfies predicate."""
+        with self._lock:
+            stale = [key for key, (value, _) in self._data.items() if predicate(value)]
+            for key in stale:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+class LocalVersionStore:
+    """Keeps cache version counters in process memory."""
+
+    def __init__(self):
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def get(self, name):
+        return self._versions.get(name, 0)
+
+    def bump(self, name):
+        with self._lock:
+            self._versions[name] = self._versions.get(name, 0) + 1
+
+class FileVersionStore:
+    """Keeps cache version counters in files so every worker on the host sees a bump."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, name):
+        return os.path.join(self.directory, f'{name}.version')
+
+    def get(self, name):
+        try:
+            with open(self._path(name)) as f:
+                return int(f.read() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    def bump(self, name):
+        with open(self._path(name), 'a+') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            f.seek(0)
+            try:
+                version = int(f.read() or 0)
+            except ValueError:
+                version = 0
+            f.seek(0)
+            f.truncate()
+            f.write(str(version + 1))
+
+class ReferenceCache:
+    """Read-through cache for small lookup lists, invalidated by bumping a version.
+
+    Entries are also reloaded after ttl seconds, which bounds how stale a
+    list can get if a bump is missed.
+    """
+
+    def __init__(self, versions, ttl=None):
+        self.versions = versions
+        self.ttl = ttl
+        self._entries = {}  # name -> (version, value, expires_at)
+
+    def get(self, name, loader):
+        # Read the version before loading so a concurrent bump is never masked
+        version = self.versions.get(name)
+        now = time.monotonic()
+        entry = self._entries.get(name)
+        if entry is not None and entry[0] == version and (entry[2] is None or entry[2] > now):
+            return entry[1]
+        value = loader()
+        if value is not None:
+            self._entries[name] = (version, value, now + self.ttl if self.ttl is not None else None)
+        return value
+
+    def invalidate(self, name):
+        self.versions.bump(name)
+
+cache_config = {
+    # Shared by every worker on the host; None keeps the counters in process memory, for a single worker only
+    'version_dir': os.path.join(app.instance_path, 'versions'),
+    'reference_ttl': 300    # Seconds a cached lookup list is reused even if no version bump is seen
+}
+
+def create_version_store():
+    if cache_config['version_dir']:
+        return FileVersionStore(cache_config['version_dir'])
+    if app.config['WORKERS'] > 1:
+        # A bump in one worker would never reach the pages and ETags cached by the others
+        raise RuntimeError("In-memory cache versions cannot be shared by "
+                           f"{app.config['WORKERS']} workers; set cache_config['version_dir'].")
+    return LocalVersionStore()
+
+version_store = create_version_store()
+reference_cache = ReferenceCache(version_store, ttl=cache_config['reference_ttl'])
+
+# -----------------------------
+# Instrumentation
+# -----------------------------
+
+metrics_config = {
+    'slow_query_ms': 200,       # Statements slower than this are logged
+    'slow_request_ms': 1000,    # Requests slower than this are logged
+    'slow_log_size': 200,       # Most recent slow entries kept for /employee/db/slow-queries
+    'max_statements': 1000,     # Distinct statements tracked; the rest are counted as 'other'
+    'debug_headers': True,      # Adds X-DB-Queries / X-DB-Time / Server-Timing to every response
+    'token': None               # If set, /metrics requires 'Authorization: Bearer <token>'
+}
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def normalize_statement(query):
+    """Collapses whitespace and IN lists so one statement shape maps to one metric."""
+    statement = ' '.join(query.split())
+    return re.sub(r'%s(?:, %s)+', '%s, ...', statement)
+
+class Metrics:
+    """In-process request and query counters, rendered in the Prometheus text format.
+
+    Counters are per process; with several workers each one is scraped separately.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._routes = {}       # (endpoint, method, status) -> [bucket counts..., count, sum]
+        self._statements = {}   # statement -> [count, seconds, rows, errors, slow]
+        self.slow_log = deque(maxlen=metrics_config['slow_log_size'])
+
+    def observe_request(self, endpoint, method, status, seconds):
+        key = (endpoint, method, status)
+        with self._lock:
+            series = self._routes.get(key)
+            if series is None:
+                series = self._routes[key] = [0] * (len(self.buckets) + 2)
+            for index, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    series[index] += 1
+            series[-2] += 1
+            series[-1] += seconds
+
+    def observe_query(self, statement, seconds, rows, failed):
+        slow = seconds * 1000 >= metrics_config['slow_query_ms']
+        with self._lock:
+            if statement not in self._statements and len(self._statements) >= metrics_config['max_statements']:
+                statement = 'other'
+            counters = self._statements.setdefault(statement, [0, 0.0, 0, 0, 0])
+            counters[0] += 1
+            counters[1] += seconds
+            counters[2] += max(rows, 0)
+            counters[3] += int(failed)
+            counters[4] += int(slow)
+        return slow
+
+    def log_slow(self, kind, name, seconds, **details):
+        entry = dict(details, kind=kind, name=name, ms=round(seconds * 1000, 1),
+                     at=datetime.now().isoformat(timespec='seconds'))
+        with self._lock:
+            self.slow_log.append(entry)
+        print(f"Slow {kind} ({entry['ms']} ms): {name}")
+
+    def render(self, gauges=None, counters=None):
+        """Returns every series, plus the given extra gauges and counters, in the Prometheus text format."""
+        with self._lock:
+            routes = {key: list(series) for key, series in self._routes.items()}
+            statements = {key: list(totals) for key, totals in self._statements.items()}
+
+        lines = [
+            '# HELP bank_request_duration_seconds Request latency by endpoint.',
+            '# TYPE bank_request_duration_seconds histogram'
+        ]
+        for (endpoint, method, status), series in sorted(routes.items()):
+            labels = f'endpoint="{_label(endpoint)}",method="{method}",status="{status}"'
+            for bound, count in zip(self.buckets, series):
+                lines.append(f'bank_request_duration_seconds_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f'bank_request_duration_seconds_bucket{{{labels},le="+Inf"}} {series[-2]}')
+            lines.append(f'bank_request_duration_seconds_count{{{labels}}} {series[-2]}')
+            lines.append(f'bank_request_duration_seconds_sum{{{labels}}} {series[-1]:.6f}')
+
+        families = [
+            ('bank_db_queries_total', 'Statements executed.', 0),
+            ('bank_db_query_seconds_total', 'Time spent executing and fetching statements.', 1),
+            ('bank_db_query_rows_total', 'Rows returned or affected by statements.', 2),
+            ('bank_db_query_errors_total', 'Statements that raised a database error.', 3),
+            ('bank_db_slow_queries_total', 'Statements slower than the slow query threshold.', 4)
+        ]
+        for name, description, index in families:
+            lines.append(f'# HELP {name} {description}')
+            lines.append(f'# TYPE {name} counter')
+            for statement, totals in sorted(statements.items()):
+                value = f'{totals[index]:.6f}' if index == 1 else totals[index]
+                lines.append(f'{name}{{statement="{_label(statement)}"}} {value}')
+
+        for kind, values in (('gauge', gauges), ('counter', counters)):
+            for name, value in sorted((values or {}).items()):
+                lines.append(f'# TYPE {name} {kind}')
+                lines.append(f'{name} {value}')
+        return '\n'.join(lines) + '\n'
+
+    def snapshot_slow_log(self):
+        with self._lock:
+            return list(self.slow_log)
+
+def _label(value, limit=300):
+    value = value if len(value) <= limit else value[:limit] + '...'
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+metrics = Metrics()
+
+def record_query(query, seconds, rows, failed=False):
+    """Records one statement's timing and row count, globally and for the current request."""
+    statement = normalize_statement(query)
+    if metrics.observe_query(statement, seconds, rows, failed):
+        metrics.log_slow('query', statement, seconds, rows=rows,
+                         endpoint=request.endpoint if has_request_context() else None)
+    if has_request_context():
+        g.db_queries = g.get('db_queries', 0) + 1
+        g.db_seconds = g.get('db_seconds', 0.0) + seconds
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    """Records the request's latency and, if enabled, adds per-request database debug headers."""
+    started = g.get('request_started')
+    if started is None:
+        return response
+    seconds = time.perf_counter() - started
+    endpoint = request.endpoint or 'unmatched'
+    metrics.observe_request(endpoint, request.method, f'{response.status_code // 100}xx', seconds)
+    if seconds * 1000 >= metrics_config['slow_request_ms']:
+        metrics.log_slow('request', f'{request.method} {endpoint}', seconds, queries=g.get('db_queries', 0))
+    if metrics_config['debug_headers']:
+        db_ms = g.get('db_seconds', 0.0) * 1000
+        response.headers['X-DB-Queries'] = str(g.get('db_queries', 0))
+        response.headers['X-DB-Time'] = f'{db_ms:.1f}ms'
+        response.headers['Server-Timing'] = f'db;dur={db_ms:.1f}, total;dur={seconds * 1000:.1f}'
+    return response
+
+# -----------------------------
+# Helper Functions
+# -----------------------------
+
+def get_db_connection():
+    """Borrows a database connection from the pool."""
+    return db_pool.acquire()
+
+def release_db_connection(conn):
+    """Returns a connection obtained from get_db_connection() to the pool."""
+    db_pool.release(conn)
+
+def get_request_db():
+    """Returns the connection bound to the current request, borrowing one on first use."""
+    if 'db' not in g:
+        g.db = get_db_connection()
+        g.db_dirty = False
+        g.db_failed = False
+    return g.db
+
+# Reads that may go to a replica; locking reads and lock functions must run on the primary
+REPLICA_SAFE_QUERY = re.compile(r'^\s*SELECT\b(?!.*\b(FOR UPDATE|FOR SHARE|LOCK IN SHARE MODE|GET_LOCK|RELEASE_LOCK)\b)',
+                                re.S | re.I)
+
+def reads_from_primary():
+    """True when the current request must read from the primary to see its own writes."""
+    return (request.method not in ('GET', 'HEAD') or g.get('db_dirty')
+            or session.get('primary_until', 0) > time.time())
+
+def get_replica_db():
+    """Returns the (replica, connection) the current request reads from, or None to read from the primary.
+
+    The replica is chosen on the first read and kept for the rest of the request.
+    """
+    if not replica_set.replicas or reads_from_primary():
+        return None
+    if 'replica_db' not in g:
+        g.replica_db = replica_set.acquire()
+    return g.replica_db
+
+def release_replica_db(failed=False):
+    """Returns the request's replica connection. After a failure the request reads from the primary."""
+    replica = g.pop('replica_db', None)
+    if replica is not None:
+        replica_set.release(*replica, failed=failed)
+    if failed:
+        g.replica_db = None
+
+def get_read_db():
+    """Returns the connection the current request should run a plain read on."""
+    replica = get_replica_db()
+    return replica[1] if replica else get_request_db()
+
+def on_commit(callback):
+    """Runs callback once the current request's pending writes are committed.
+
+    Callbacks are dropped if the request rolls back. With no pending writes
+    (or outside a request) the callback runs immediately.
+    """
+    if has_request_context() and g.get('db_dirty'):
+        g.setdefault('db_on_commit', []).append(callback)
+    else:
+        callback()
+
+def commit_db():
+    """Commits the current request's unit of work. Returns False if the commit failed."""
+    if 'db' not in g or not g.db_dirty:
+        return True
+    if g.db_failed:
+        rollback_db()
+        return False
+    try:
+        g.db.commit()
+    except mysql.connector.Error as err:
+        print(f"Error: {err}")
+        flash(f"Database error: {err}", 'danger')
+        rollback_db()
+        return False
+    g.db_dirty = False
+    for callback in g.pop('db_on_commit', []):
+        callback()
+    return True
+
+def rollback_db():
+    """Discards every write made so far in the current request."""
+    if 'db' in g:
+        g.db.rollback()
+        g.db_dirty = g.db_failed = False
+    g.pop('db_on_commit', None)
+
+def _execute_read(conn, query, params, fetchone):
+    cursor = conn.cursor(dictionary=True, buffered=True)
+    started = time.perf_counter()
+    rows, failed = 0, True
+    try:
+        cursor.execute(query, params)
+        result = cursor.fetchone() if fetchone else cursor.fetchall()
+        rows = int(result is not None) if fetchone else len(result)
+        failed = False
+        return result
+    finally:
+        record_query(query, time.perf_counter() - started, rows, failed)
+        try:
+            cursor.close()
+        except mysql.connector.Error:
+            pass
+
+def query_db(query, params=(), fetchone=False, commit=False):
+    """Executes a database query and returns the result.
+
+    Inside a request all statements share one connection, and writes are
+    committed together once the view returns (or rolled back if any failed).
+    Outside a request each write commits immediately. Plain SELECTs in a
+    request go to a read replica when one is configured, unless the request
+    has to see its own writes.
+    """
+    in_request = has_request_context()
+    if in_request and not commit and REPLICA_SAFE_QUERY.match(query):
+        replica = get_replica_db()
+        if replica is not None:
+            try:
+                return _execute_read(replica[1], query, params, fetchone)
+            except (mysql_errors.InterfaceError, mysql_errors.OperationalError) as err:
+                # Count it against the replica and answer from the primary instead
+                print(f"Error: {err}")
+                release_replica_db(failed=True)
+            except mysql.connector.Error as err:
+                print(f"Error: {err}")
+                flash(f"Database error: {err}", 'danger')
+                return None
+    try:
+        conn = get_request_db() if in_request else get_db_connection()
+    except mysql.connector.Error as err:
+        print(f"Error: {err}")
+        if in_request:
+            flash(f"Database error: {err}", 'danger')
+        return False if commit else None
+    # Buffered so a fetchone() never leaves unread rows on a connection that goes back to the pool.
+    cursor = conn.cursor(dictionary=True, buffered=True)
+    started = time.perf_counter()
+    rows, failed = 0, False
+    try:
+        cursor.execute(query, params)
+        if commit:
+            rows = cursor.rowcount
+            if in_request:
+                g.db_dirty = True
+            else:
+                conn.commit()
+            return None
+        if fetchone:
+            result = cursor.fetchone()
+            rows = int(result is not None)
+        else:
+            result = cursor.fetchall()
+            rows = len(result)
+        return result
+    except mysql.connector.Error as err:
+        failed = True
+        print(f"Error: {err}")
+        if in_request:
+            flash(f"Database error: {err}", 'danger')
+        if commit:
+            if in_request:
+                g.db_failed = True
+            return False
+        return None
+    finally:
+        record_query(query, time.perf_counter() - started, rows, failed)
+        cursor.close()
+        if not in_request:
+            release_db_connection(conn)
+
+def stream_db(query, params=(), batch_size=1000, dictionary=True):
+    """Yields rows one at a time from an unbuffered cursor on a dedicated connection.
+
+    Rows are pulled from the server in batches as the caller iterates, so
+    memory stays flat regardless of the result size. Errors are raised, not
+    flashed, since the response may already be partly sent. Pass
+    dictionary=False for plain tuples.
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=dictionary)
+    started = time.perf_counter()
+    count, failed = 0, True
+    try:
+        cursor.execute(query, params)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            count += len(rows)
+            yield from rows
+        failed = False
+    finally:
+        # Includes the time the caller spent consuming rows, which is what holds the connection
+        record_query(query, time.perf_counter() - started, count, failed)
+        try:
+            cursor.close()
+        except mysql.connector.Error:
+            pass
+        release_db_connection(conn)
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson'
+}
+
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+def export_response(fmt, rows, columns, name):
+    """Streams rows as a CSV or JSON-lines download in bounded memory.
+
+    Output is flushed in chunks of roughly EXPORT_CHUNK_SIZE bytes so large
+    exports neither buffer in full nor pay per-row WSGI overhead.
+    """
+    def generate():
+        buffer = io.StringIO()
+        if fmt == 'csv':
+            writer = csv.writer(buffer)
+            writer.writerow(columns)
+        for row in rows:
+            if fmt == 'csv':
+                writer.writerow([row[column] for column in columns])
+            else:
+                buffer.write(json.dumps({column: row[column] for column in columns}, default=str))
+                buffer.write('\n')
+            if buffer.tell() >= EXPORT_CHUNK_SIZE:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate(0)
+        yield buffer.getvalue()
+    return Response(generate(), mimetype=EXPORT_FORMATS[fmt],
+                    headers={'Content-Disposition': f'attachment; filename={name}.{fmt}'})
+
+def get_export_format():
+    """Returns the requested export format, or None for the HTML view."""
+    fmt = request.args.get('format')
+    return fmt if fmt in EXPORT_FORMATS else None
+
+def encode_cursor(values):
+    """Encodes the sort key of a row as an opaque pagination token."""
+    raw = json.dumps([str(value) for value in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def decode_cursor(token, size):
+    """Decodes a pagination token from encode_cursor(). Returns None if it is malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        values = json.loads(raw)
+    except ValueError:
+        return None
+    if not isinstance(values, list) or len(values) != size:
+        return None
+    return values
+
+def get_page_size(default=50, maximum=500):
+    """Reads the page_size query parameter, clamped to a sane range."""
+    try:
+        page_size = int(request.args.get('page_size', default))
+    except ValueError:
+        page_size = default
+    return max(1, min(page_size, maximum))
+
+def paginate_transactions(base_query, filters, params):
+    """Runs one page of a Transaction query with keyset pagination, newest first.
+
+    Pages are keyed on (TDate, TTime, TransactionID) and read from the
+    request's after/before tokens and page_size. Returns (rows, page_size,
+    next_cursor, prev_cursor); a cursor is None when there is no such page.
+    """
+    filters = list(filters)
+    params = list(params)
+    page_size = get_page_size()
+    after = request.args.get('after')
+    before = request.args.get('before')
+    token = after or before
+    position = decode_cursor(token, 3) if token else None
+    if token and position is None:
+        flash('Invalid page cursor, showing the newest transactions.', 'warning')
+        after = before = None
+    if position:
+        comparison = "<" if after else ">"
+        filters.append(f"(Transaction.TDate, Transaction.TTime, Transaction.TransactionID) {comparison} (%s, %s, %s)")
+        params.extend(position)
+
+    query = base_query
+    if filters:
+        query += " WHERE " + " AND ".join(filters)
+    direction = "ASC" if before else "DESC"
+    query += f" ORDER BY Transaction.TDate {direction}, Transaction.TTime {direction}, Transaction.TransactionID {direction}"
+    query += " LIMIT %s"
+    params.append(page_size + 1)
+
+    transactions = query_db(query, tuple(params)) or []
+    has_more = len(transactions) > page_size
+    transactions = transactions[:page_size]
+    if before:
+        transactions.reverse()
+
+    # Paging backwards always leaves newer rows behind; paging forwards leaves older ones if has_more
+    if before:
+        has_next, has_prev = True, has_more
+    else:
+        has_next, has_prev = has_more, bool(after)
+
+    next_cursor = prev_cursor = None
+    if transactions:
+        if has_next:
+            last = transactions[-1]
+            next_cursor = encode_cursor((last['TDate'], last['TTime'], last['TransactionID']))
+        if has_prev:
+            first = transactions[0]
+            prev_cursor = encode_cursor((first['TDate'], first['TTime'], first['TransactionID']))
+
+    return transactions, page_size, next_cursor, prev_cursor
+
+def parse_date(value):
+    """Parses a YYYY-MM-DD string. Returns None if it is empty or malformed."""
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        return None
+
+@app.after_request
+def commit_request_db(response):
+    """Commits the request's writes in a single transaction."""
+    commit_db()
+    # Keep this session on the primary until the replicas have caught up with what it may have written
+    if replica_set.replicas and request.method not in ('GET', 'HEAD'):
+        session['primary_until'] = time.time() + replica_config['sticky_for']
+    return response
+
+@app.teardown_request
+def close_request_db(exc):
+    """Returns the request's connections to their pools, rolling back anything uncommitted."""
+    conn = g.pop('db', None)
+    if conn is not None:
+        release_db_connection(conn)
+    release_replica_db()
+
+# -----------------------------
+# Schema Migrations
+# -----------------------------
+
+migration_config = {
+    'directory': os.path.join(app.root_path, 'migrations'),
+    'lock_timeout': 60    # Seconds to wait while another process is migrating
+}
+
+MIGRATION_FILE = re.compile(r'^(\d+)_(\w+)\.sql$')
+
+# MySQL commits DDL implicitly, so a migration that failed part-way is re-run from the top.
+# "Already exists" errors (table, column, index) mark the statements it had applied before.
+MIGRATION_REAPPLIED_ERRORS = {1050, 1060, 1061}
+
+def list_migrations():
+    """Returns (version, name, path) for every migration file, oldest first."""
+    migrations = []
+    for filename in os.listdir(migration_config['directory']):
+        match = MIGRATION_FILE.match(filename)
+        if match:
+            migrations.append((int(match.group(1)), match.group(2),
+                               os.path.join(migration_config['directory'], filename)))
+    return sorted(migrations)
+
+def read_sql_statements(path):
+    """Splits a .sql file into statements, dropping -- comment lines."""
+    with open(path) as f:
+        lines = [line for line in f if not line.lstrip().startswith('--')]
+    return [statement.strip() for statement in ''.join(lines).split(';') if statement.strip()]
+
+def _checksum(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def get_applied_migrations(cursor):
+    """Returns {version: checksum} for the migrations recorded in SchemaMigration."""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS SchemaMigration (
+            Version INT PRIMARY KEY,
+            Name VARCHAR(100) NOT NULL,
+            Checksum CHAR(64) NOT NULL,
+            AppliedAt DATETIME NOT NULL
+        ) ENGINE=InnoDB
+    """)
+    cursor.execute("SELECT Version, Checksum FROM SchemaMigration")
+    return dict(cursor.fetchall())
+
+def apply_migrations(conn, target=None, progress=None):
+    """Applies the pending migrations up to target in version order. Returns the versions applied.
+
+    A named lock keeps two processes from migrating the same database at once.
+    """
+    cursor = conn.cursor()
+    cursor.execute("SELECT GET_LOCK('schema_migrations', %s)", (migration_config['lock_timeout'],))
+    if cursor.fetchone()[0] != 1:
+        cursor.close()
+        raise RuntimeError('Another process is applying migrations')
+    applied = []
+    try:
+        done = get_applied_migrations(cursor)
+        for version, name, path in list_migrations():
+            if target is not None and version > target:
+                break
+            if version in done:
+                if done[version] != _checksum(path):
+                    print(f"Warning: migration {version:04d}_{name} has changed since it was applied")
+                continue
+            if progress:
+                progress(version, name)
+            for statement in read_sql_statements(path):
+                try:
+                    cursor.execute(statement)
+                except mysql.connector.Error as err:
+                    if err.errno not in MIGRATION_REAPPLIED_ERRORS:
+                        raise
+            cursor.execute(
+                "INSERT INTO SchemaMigration (Version, Name, Checksum, AppliedAt) VALUES (%s, %s, %s, NOW())",
+                (version, name, _checksum(path)))
+            conn.commit()
+            applied.append(version)
+    finally:
+        cursor.execute("SELECT RELEASE_LOCK('schema_migrations')")
+        cursor.fetchall()
+        cursor.close()
+    return applied
+
+# ----- Query Plans -----
+
+SQL_STATEMENT = re.compile(r'^\s*(SELECT|UPDATE|DELETE|INSERT\b.*\bSELECT)\b', re.S)
+
+def find_queries(path=__file__):
+    """Returns (line, query) for the SQL string literals in a source file.
+
+    Queries built up with `query += "..."` are followed through each function,
+    so appended WHERE/ORDER BY clauses are explained too; each branch of an if
+    is followed separately. Strings with {} placeholders are completed at run
+    time and skipped.
+    """
+    with open(path) as f:
+        tree = ast.parse(f.read())
+    found = {}
+
+    def add(line, text):
+        # '?' placeholders belong to the SQLite session store, not MySQL
+        if SQL_STATEMENT.match(text) and re.search(r'\b(FROM|UPDATE)\b', text) and not re.search(r'[{?]', text):
+            found.setdefault(' '.join(text.split()), line)
+
+    def literal(node):
+        return node.value if isinstance(node, ast.Constant) and isinstance(node.value, str) else None
+
+    def follow(statements, built):
+        for statement in statements:
+            if isinstance(statement, ast.Assign):
+                for target in statement.targets:
+                    if isinstance(target, ast.Name):
+                        built[target.id] = literal(statement.value)
+            elif isinstance(statement, ast.AugAssign) and isinstance(statement.target, ast.Name):
+                name = statement.target.id
+                if built.get(name) is not None and literal(statement.value) is not None:
+                    built[name] += literal(statement.value)
+                    add(statement.lineno, built[name])
+                else:
+                    built[name] = None
+            elif not isinstance(statement, (ast.FunctionDef, ast.ClassDef)):
+                for block in [getattr(statement, 'body', None), getattr(statement, 'orelse', None),
+                              getattr(statement, 'finalbody', None)] + \
+                             [handler.body for handler in getattr(statement, 'handlers', [])]:
+                    if isinstance(block, list):
+                        follow(block, dict(built))
+
+    # The literal parts of f-strings are fragments, not queries
+    fragments = {id(part) for node in ast.walk(tree) if isinstance(node, ast.JoinedStr) for part in node.values}
+    for node in ast.walk(tree):
+        if literal(node) is not None and id(node) not in fragments:
+            add(node.lineno, node.value)
+        elif isinstance(node, ast.FunctionDef):
+            follow(node.body, {})
+    return sorted((line, query) for query, line in found.items())
+
+def explain_query(cursor, query):
+    """Returns the EXPLAIN rows for query, with every placeholder bound to a dummy value."""
+    # LIMIT/OFFSET need numbers; elsewhere a quoted '1' keeps string and integer comparisons indexable
+    query = re.sub(r'\b(LIMIT|OFFSET) %s', r'\1 1', query)
+    params = ('1',) * query.count('%s')
+    cursor.execute('EXPLAIN ' + query, params or None)
+    return cursor.fetchall()
+
+# -----------------------------
+# Ledger Posting
+# -----------------------------
+
+# +1 credits the account, -1 debits it.
+TRANSACTION_TYPES = {
+    'Deposit': 1,
+    'Withdrawal': -1,
+    'Transfer In': 1,
+    'Transfer Out': -1
+}
+
+TRANSACTION_CHARGES = {
+    'Deposit': Decimal('0.50'),
+    'Withdrawal': Decimal('1.00')
+}  # Example charges; transfers are free
+
+transfer_config = {
+    'chunk_size': 500,       # Transfers committed per transaction
+    'max_items': 10000       # Largest batch accepted in one request
+}
+
+CENT = Decimal('0.01')
+
+# A posting transaction that deadlocks or times out waiting for a lock is retried from the start.
+POSTING_RETRY_ERRORS = {1205, 1213}
+POSTING_RETRIES = 3
+
+# owner_ssn, when given, restricts the posting to accounts held by that customer.
+Posting = namedtuple('Posting', ['account_number', 'transaction_type', 'amount', 'owner_ssn'], defaults=[None])
+Transfer = namedtuple('Transfer', ['from_account', 'to_account', 'amount'])
+
+class PostingError(Exception):
+    """Raised when a posting is rejected; the message is safe to show to the user."""
+
+def parse_amount(value):
+    """Parses a positive money amount rounded to cents."""
+    try:
+        amount = Decimal(str(value).strip()).quantize(CENT, rounding=ROUND_HALF_UP)
+    except (InvalidOperation, ValueError):
+        raise PostingError('Invalid amount.')
+    if not amount.is_finite():
+        raise PostingError('Invalid amount.')
+    if amount <= 0:
+        raise PostingError('Amount must be positive.')
+    return amount
+
+def post_entries(conn, postings, update_aggregates=True):
+    """Applies postings to their accounts inside the caller's transaction.
+
+    Callers screen debits with velocity_screen.check() beforehand and
+    record() them after committing. Each balance check and update is a single conditional UPDATE, so the
+    balance is never read into Python and concurrent postings cannot lose
+    updates. Accounts are locked in ascending AccountNumber order, and the
+    branch aggregate rows afterwards in ascending (BranchID, Slot) order.
+    Deadlocks are still possible against other writers of those rows, so
+    callers retry on POSTING_RETRY_ERRORS. With update_aggregates=False the
+    caller applies apply_posting_aggregates() itself. The caller commits,
+    or rolls back on PostingError. Returns the new TransactionIDs in input
+    order.
+    """
+    transaction_ids = [None] * len(postings)
+    ordered = sorted(enumerate(postings), key=lambda item: int(item[1].account_number))
+    cursor = conn.cursor(dictionary=True, buffered=True)
+    try:
+        for index, posting in ordered:
+            sign = TRANSACTION_TYPES.get(posting.transaction_type)
+            if sign is None:
+                raise PostingError('Invalid transaction type.')
+
+            update_query = "UPDATE Account"
+            params = []
+            if posting.owner_ssn is not None:
+                update_query += " JOIN Customer_Account ON Account.AccountNumber = Customer_Account.AccountNumber"
+            update_query += " SET Account.Balance = Account.Balance + %s, Account.LastAccessDate = CURDATE()"
+            update_query += " WHERE Account.AccountNumber = %s"
+            params.extend([posting.amount * sign, posting.account_number])
+            if posting.owner_ssn is not None:
+                update_query += " AND Customer_Account.SSN = %s"
+                params.append(posting.owner_ssn)
+            if sign < 0:
+                update_query += " AND Account.Balance >= %s"
+                params.append(posting.amount)
+            cursor.execute(update_query, tuple(params))
+
+            if cursor.rowcount == 0:
+                # Only the failure path pays for a second look at the account.
+                check_query = "SELECT Account.AccountNumber FROM Account"
+                check_params = [posting.account_number]
+                if posting.owner_ssn is not None:
+                    check_query += " JOIN Customer_Account ON Account.AccountNumber = Customer_Account.AccountNumber"
+                check_query += " WHERE Account.AccountNumber = %s"
+                if posting.owner_ssn is not None:
+                    check_query += " AND Customer_Account.SSN = %s"
+                    check_params.append(posting.owner_ssn)
+                cursor.execute(check_query, tuple(check_params))
+                if cursor.fetchone() is None:
+                    raise PostingError('Account not found.')
+                raise PostingError(f'Insufficient funds for {posting.transaction_type.lower()}.')
+
+            transaction_query = """
+                INSERT INTO `Transaction` (TransactionType, TDate, TTime, Amount, AccountNumber, TransactionCharge)
+                VALUES (%s, CURDATE(), CURTIME(), %s, %s, %s)
+            """
+            charge = TRANSACTION_CHARGES.get(posting.transaction_type, Decimal('0.00'))
+            cursor.execute(transaction_query, (posting.transaction_type, posting.amount, posting.account_number, charge))
+            transaction_ids[index] = cursor.lastrowid
+        if update_aggregates:
+            apply_posting_aggregates(cursor, postings)
+    finally:
+        cursor.close()
+    return transaction_ids
+
+def transfer_postings(transfer, owner_ssn=None):
+    """Returns the debit and credit postings of a transfer; owner_ssn restricts the source account."""
+    if int(transfer.from_account) == int(transfer.to_account):
+        raise PostingError('Cannot transfer to the same account.')
+    return [Posting(int(transfer.from_account), 'Transfer Out', transfer.amount, owner_ssn),
+            Posting(int(transfer.to_account), 'Transfer In', transfer.amount)]
+
+def parse_transfer(item):
+    """Builds a Transfer from one item of a batch request."""
+    try:
+        transfer = Transfer(int(item['from_account']), int(item['to_account']), parse_amount(item['amount']))
+    except (KeyError, TypeError, ValueError):
+        raise PostingError('Each transfer needs from_account, to_account and amount.')
+    transfer_postings(transfer)
+    return transfer
+
+def _post_transfer_chunk(conn, chunk):
+    """Posts one chunk of (index, postings) pairs inside the caller's transaction."""
+    accounts = sorted({posting.account_number for _, postings in chunk for posting in postings})
+    results = []
+    cursor = conn.cursor(dictionary=True, buffered=True)
+    try:
+        # Lock every account the chunk touches up front, in the same ascending order as post_entries
+        cursor.execute(f"""
+            SELECT AccountNumber FROM Account WHERE AccountNumber IN ({_in_list(accounts)})
+            ORDER BY AccountNumber FOR UPDATE
+        """, tuple(accounts))
+        cursor.fetchall()
+        posted = []
+        for index, postings in chunk:
+            cursor.execute("SAVEPOINT transfer_item")
+            try:
+                transaction_ids = post_entries(conn, postings, update_aggregates=False)
+                results.append((index, {'status': 'posted', 'transaction_ids': transaction_ids}))
+                posted.extend(postings)
+            except PostingError as err:
+                cursor.execute("ROLLBACK TO SAVEPOINT transfer_item")
+                results.append((index, {'status': 'rejected', 'error': str(err)}))
+        # The whole chunk's aggregate deltas go in once, in key order
+        apply_posting_aggregates(cursor, posted)
+    finally:
+        cursor.close()
+    return results
+
+def post_transfers(transfers, chunk_size=None, progress=None):
+    """Posts a batch of transfers in chunked transactions and returns one result per transfer.
+
+    Each chunk locks all of its accounts in ascending AccountNumber order
+    before posting, and its branch aggregate rows once at the end in
+    (BranchID, Slot) order, the same orders post_entries uses. Every
+    transfer runs under a savepoint, so a rejected one is undone without
+    failing the rest of its chunk. A chunk that still hits a deadlock is
+    retried; one that fails for any other database error is reported as
+    failed and the batch carries on.
+    """
+    chunk_size = chunk_size or transfer_config['chunk_size']
+    results = [None] * len(transfers)
+    pending = []
+    for index, transfer in enumerate(transfers):
+        try:
+            pending.append((index, transfer_postings(transfer)))
+        except PostingError as err:
+            results[index] = {'status': 'rejected', 'error': str(err)}
+
+    conn = get_db_connection()
+    try:
+        for start in range(0, len(pending), chunk_size):
+            chunk = pending[start:start + chunk_size]
+            for attempt in range(POSTING_RETRIES + 1):
+                try:
+                    chunk_results = _post_transfer_chunk(conn, chunk)
+                    conn.commit()
+                    break
+                except mysql.connector.Error as err:
+                    conn.rollback()
+                    if err.errno in POSTING_RETRY_ERRORS and attempt < POSTING_RETRIES:
+                        continue
+                    print(f"Error: {err}")
+                    chunk_results = [(index, {'status': 'failed', 'error': 'Database error; not posted.'})
+                                     for index, _ in chunk]
+                    break
+            for index, result in chunk_results:
+                results[index] = result
+            # Batches are posted by staff, so velocity limits only flag them, and only once committed
+            posted = [posting for (index, postings) in chunk if results[index]['status'] == 'posted'
+                      for posting in postings]
+            velocity_screen.record(velocity_screen.check(posted, enforce=False))
+            if progress:
+                progress(min(start + chunk_size, len(pending)) / len(pending))
+    finally:
+        release_db_connection(conn)
+
+    # One version bump rather than one per account holder; a batch can touch thousands of customers
+    if any(result['status'] == 'posted' for result in results):
+        touch_pages('accounts')
+    return results
+
+# -----------------------------
+# Velocity Screening
+# -----------------------------
+
+velocity_config = {
+    'enabled': True,
+    'max_keys': 500000,      # Accounts and customers tracked; the least recently active are dropped first
+    'flag_log_size': 1000,   # Most recent flagged debits kept for /employee/screening
+    'rebuild_retry': 60,     # Seconds before a failed rebuild of the counters is tried again
+    # (name, seconds, buckets); each window slides one bucket (seconds / buckets) at a time
+    'windows': [('1m', 60, 6), ('1h', 3600, 12), ('24h', 86400, 24)],
+    # (scope, window, max debits, max debited amount, action); action is 'reject' or 'flag'
+    'limits': [
+        ('account', '1m', 5, Decimal('5000.00'), 'reject'),
+        ('account', '1h', 30, Decimal('20000.00'), 'flag'),
+        ('account', '24h', 100, Decimal('50000.00'), 'reject'),
+        ('customer', '1m', 10, Decimal('10000.00'), 'reject'),
+        ('customer', '24h', 200, Decimal('100000.00'), 'flag')
+    ]
+}
+
+class VelocityCounters:
+    """Debit counts and amounts per key over sliding windows, kept in fixed-size ring buffers.
+
+    Each key owns one flat array of (bucket number, count, cents) triples,
+    one ring per window, so its memory is bounded however busy it is.
+    """
+
+    def __init__(self, windows, max_keys):
+        self.windows = []   # (name, bucket width, buckets, first slot)
+        slots = 0
+        for name, seconds, buckets in windows:
+            self.windows.append((name, seconds // buckets, buckets, slots))
+            slots += buckets
+        self.slots = slots
+        self.max_keys = max_keys
+        self.keys = OrderedDict()   # key -> array, least recently active first
+
+    def __len__(self):
+        return len(self.keys)
+
+    def totals(self, key, now):
+        """Returns {window: (count, cents)} for key as of now."""
+        ring = self.keys.get(key)
+        totals = {}
+        for name, width, buckets, first in self.windows:
+            count = cents = 0
+            if ring is not None:
+                oldest = int(now // width) - buckets
+                for index in range(3 * first, 3 * (first + buckets), 3):
+                    if ring[index] > oldest:
+                        count += ring[index + 1]
+                        cents += ring[index + 2]
+            totals[name] = (count, cents)
+        return totals
+
+    def add(self, key, now, cents):
+        ring = self.keys.get(key)
+        if ring is None:
+            ring = self.keys[key] = array('q', bytes(24 * self.slots))
+            if len(self.keys) > self.max_keys:
+                self.keys.popitem(last=False)
+        else:
+            self.keys.move_to_end(key)
+        for name, width, buckets, first in self.windows:
+            bucket = int(now // width)
+            index = 3 * (first + bucket % buckets)
+            if ring[index] > bucket:
+                continue    # An older event whose slot has already been reused
+            if ring[index] < bucket:
+                ring[index], ring[index + 1], ring[index + 2] = bucket, 0, 0
+            ring[index + 1] += 1
+            ring[index + 2] += cents
+
+    def merge(self, other):
+        """Adds the counts of other (built with the same windows) into these counters."""
+        for key, theirs in other.keys.items():
+            ring = self.keys.get(key)
+            if ring is None:
+                self.keys[key] = array('q', theirs)
+                continue
+            self.keys.move_to_end(key)
+            for index in range(0, 3 * self.slots, 3):
+                if theirs[index] > ring[index]:
+                    ring[index:index + 3] = theirs[index:index + 3]
+                elif theirs[index] == ring[index]:
+                    ring[index + 1] += theirs[index + 1]
+                    ring[index + 2] += theirs[index + 2]
+        while len(self.keys) > self.max_keys:
+            self.keys.popitem(last=False)
+
+class VelocityScreen:
+    """Screens debit postings against velocity_config['limits'] without a database round trip.
+
+    Counters are per process; with several workers each enforces the limits
+    on its own share of the traffic. A background thread rebuilds them from
+    the last day of `Transaction` rows (see start()), and until it finishes
+    debits are screened against what this process has counted so far.
+    Screening is split in two: check() before posting and record() once
+    the transaction has committed, so rolled back or retried postings are
+    never counted. Concurrent checks can each pass a limit the pair of
+    them together exceeds.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.counters = VelocityCounters(config['windows'], config['max_keys'])
+        # AccountNumber -> customer SSNs, from the rebuild and from customer postings
+        self.owners = LRUCache(maxsize=config['max_keys'])
+        self.limits = {}    # scope -> [(window, max count, max cents, action)]
+        for scope, window, max_count, max_amount, action in config['limits']:
+            max_cents = int(max_amount * 100) if max_amount is not None else None
+            self.limits.setdefault(scope, []).append((window, max_count, max_cents, action))
+        self.flags = deque(maxlen=config['flag_log_size'])
+        self.stats = {'screened': 0, 'rejected': 0, 'flagged': 0}
+        self.loaded = False
+        self._warmer = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Starts the background rebuild once per process; later calls return immediately."""
+        if self._warmer is not None or not self.config['enabled']:
+            return
+        with self._lock:
+            if self._warmer is None:
+                self._warmer = threading.Thread(target=self._warm, name='velocity-rebuild', daemon=True)
+                self._warmer.start()
+
+    def _warm(self):
+        while True:
+            # Debits recorded from here on are counted live; the rebuild covers the ones before
+            cutoff = int(time.time())
+            with self._lock:
+                self.counters = VelocityCounters(self.config['windows'], self.config['max_keys'])
+            try:
+                self.rebuild(cutoff)
+                return
+            except mysql.connector.Error as err:
+                # Keep screening from the live counts and try again later
+                print(f"Error: {err}")
+                time.sleep(self.config['rebuild_retry'])
+
+    def rebuild(self, cutoff):
+        """Loads the debits posted inside the longest window and before cutoff into the counters."""
+        horizon = max(seconds for _, seconds, _ in self.config['windows'])
+        debit_types = debit_transaction_types()
+        # Ordered like idx_transaction_date, so each transaction's owner rows arrive together
+        query = f"""
+            SELECT `Transaction`.TransactionID, `Transaction`.AccountNumber, `Transaction`.Amount,
+                   TIMESTAMP(`Transaction`.TDate, `Transaction`.TTime) AS PostedAt, Customer_Account.SSN
+            FROM `Transaction`
+            LEFT JOIN Customer_Account ON `Transaction`.AccountNumber = Customer_Account.AccountNumber
+            WHERE `Transaction`.TDate >= CURDATE() - INTERVAL %s DAY
+              AND `Transaction`.TransactionType IN ({_in_list(debit_types)})
+            ORDER BY `Transaction`.TDate, `Transaction`.TTime, `Transaction`.TransactionID
+        """
+        counters = VelocityCounters(self.config['windows'], self.config['max_keys'])
+        since = cutoff - horizon
+        for _, rows in groupby(stream_db(query, (horizon // 86400 + 1, *debit_types)), key=itemgetter('TransactionID')):
+            rows = list(rows)
+            posted = rows[0]['PostedAt'].timestamp()
+            if posted < since or posted >= cutoff:
+                continue
+            account = rows[0]['AccountNumber']
+            owners = tuple(row['SSN'] for row in rows if row['SSN'] is not None)
+            self.owners.set(account, owners)
+            cents = int(rows[0]['Amount'] * 100)
+            counters.add(('account', account), posted, cents)
+            for ssn in owners:
+                counters.add(('customer', ssn), posted, cents)
+        with self._lock:
+            counters.merge(self.counters)
+            self.counters = counters
+            self.loaded = True
+        return len(counters)
+
+    def _keys(self, posting):
+        account = int(posting.account_number)
+        owners = self.owners.get(account, ())
+        if posting.owner_ssn is not None and posting.owner_ssn not in owners:
+            owners = owners + (posting.owner_ssn,)
+            self.owners.set(account, owners)
+        return [('account', account)] + [('customer', ssn) for ssn in owners]
+
+    def check(self, postings, enforce=True):
+        """Checks the debits among postings; raises PostingError if a 'reject' limit is exceeded.
+
+        With enforce=False (trusted bulk postings) every exceeded limit is
+        only flagged. Nothing is counted yet: pass the returned list to
+        record() once the postings have committed.
+        """
+        pending = []
+        if not self.config['enabled']:
+            return pending
+        now = time.time()
+        added = {}  # key -> (count, cents) of the earlier debits in postings
+        with self._lock:
+            for posting in postings:
+                if TRANSACTION_TYPES.get(posting.transaction_type, 0) >= 0:
+                    continue
+                cents = int(posting.amount * 100)
+                keys = self._keys(posting)
+                exceeded = []
+                for scope, key in keys:
+                    totals = self.counters.totals((scope, key), now)
+                    earlier_count, earlier_cents = added.get((scope, key), (0, 0))
+                    for window, max_count, max_cents, action in self.limits.get(scope, ()):
+                        count, total = totals[window]
+                        count, total = count + earlier_count + 1, total + earlier_cents + cents
+                        if (max_count is not None and count > max_count) or \
+                                (max_cents is not None and total > max_cents):
+                            if action == 'reject' and enforce:
+                                self.stats['rejected'] += 1
+                                raise PostingError('This transaction exceeds the activity limits on your account. '
+                                                   'Please contact your bank.')
+                            exceeded.append(f'{scope} {key} {window}')
+                for key in keys:
+                    earlier_count, earlier_cents = added.get(key, (0, 0))
+                    added[key] = (earlier_count + 1, earlier_cents + cents)
+                pending.append((posting, keys, cents, exceeded))
+        return pending
+
+    def record(self, pending):
+        """Counts debits returned by check() whose transaction has committed."""
+        if not pending:
+            return
+        now = time.time()
+        with self._lock:
+            for posting, keys, cents, exceeded in pending:
+                for key in keys:
+                    self.counters.add(key, now, cents)
+                self.stats['screened'] += 1
+                if exceeded:
+                    self.stats['flagged'] += 1
+                    self.flags.append({
+                        'at': datetime.now().isoformat(timespec='seconds'),
+                        'account': int(posting.account_number),
+                        'type': posting.transaction_type,
+                        'amount': str(posting.amount),
+                        'limits': exceeded
+                    })
+
+    def snapshot(self):
+        with self._lock:
+            return {'stats': dict(self.stats), 'keys': len(self.counters), 'flags': list(self.flags)}
+
+velocity_screen = VelocityScreen(velocity_config)
+
+@app.before_request
+def start_velocity_screen():
+    # Started from the first request rather than at import, so each forked worker gets its own thread
+    velocity_screen.start()
+
+# -----------------------------
+# Search
+# -----------------------------
+
+# InnoDB ignores FULLTEXT tokens shorter than innodb_ft_min_token_size (3 by default)
+FULLTEXT_MIN_TOKEN = 3
+SEARCH_PAGE_SIZE = 25
+SEARCH_MAX_PAGE_SIZE = 200
+
+# Each source yields candidate keys from one indexed access path; see migrations/0002_search_indexes.sql.
+SEARCH_SOURCES = {
+    'customers': [
+        {
+            'from': "Customer",
+            'key': "Customer.SSN",
+            'fulltext': "Customer.FirstName, Customer.LastName",
+            'prefix': ["Customer.FirstName", "Customer.LastName"],
+            'exact': "Customer.SSN"
+        }
+    ],
+    'employees': [
+        {
+            'from': "Employee",
+            'key': "Employee.SSN",
+            'fulltext': "Employee.FirstName, Employee.LastName",
+            'prefix': ["Employee.FirstName", "Employee.LastName"]
+        },
+        {
+            'from': "Branch JOIN Employee ON Employee.BranchID = Branch.BranchID",
+            'key': "Employee.SSN",
+            'fulltext': "Branch.Name",
+            'prefix': ["Branch.Name"]
+        }
+    ]
+}
+
+def build_search(term, sources):
+    """Builds a derived table of (MatchKey, Score) rows for a search term.
+
+    Terms whose words are all long enough go through the FULLTEXT indexes in
+    boolean mode, each word matched as a required prefix and ranked by
+    relevance. Shorter terms fall back to anchored LIKE 'term%' lookups that
+    can use ordinary B-tree indexes. Numeric terms are exact key lookups.
+    Every access path is a separate UNION ALL branch so MySQL never has to
+    fall back to a table scan to evaluate an OR across indexes.
+    """
+    tokens = re.findall(r'\w+', term)
+    branches = []
+    params = []
+
+    exact_sources = [source for source in sources if source.get('exact')]
+    if term.isdigit() and exact_sources:
+        # Names never contain digits, so a numeric term can only be a key lookup
+        for source in exact_sources:
+            branches.append(f"SELECT {source['key']} AS MatchKey, 1 AS Score FROM {source['from']} WHERE {source['exact']} = %s")
+            params.append(int(term))
+    elif tokens and all(len(token) >= FULLTEXT_MIN_TOKEN for token in tokens):
+        boolean_query = ' '.join(f'+{token}*' for token in tokens)
+        for source in sources:
+            branches.append(
+                f"SELECT {source['key']} AS MatchKey, "
+                f"MATCH({source['fulltext']}) AGAINST (%s IN BOOLEAN MODE) AS Score "
+                f"FROM {source['from']} "
+                f"WHERE MATCH({source['fulltext']}) AGAINST (%s IN BOOLEAN MODE)"
+            )
+            params.extend([boolean_query, boolean_query])
+    else:
+        prefix = term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        for source in sources:
+            for column in source['prefix']:
+                branches.append(f"SELECT {source['key']} AS MatchKey, 1 AS Score FROM {source['from']} WHERE {column} LIKE %s")
+                params.append(prefix)
+
+    matches = "SELECT MatchKey, MAX(Score) AS Score FROM (" + " UNION ALL ".join(branches) + ") AS Candidates GROUP BY MatchKey"
+    return matches, params
+
+def get_search_page():
+    """Reads the page and page_size query parameters for a search listing."""
+    try:
+        page = max(1, int(request.args.get('page', 1)))
+    except ValueError:
+        page = 1
+    return page, get_page_size(SEARCH_PAGE_SIZE, SEARCH_MAX_PAGE_SIZE)
+
+# -----------------------------
+# Reference Data
+# -----------------------------
+
+def get_branch_choices():
+    """Returns every branch for selection lists."""
+    return reference_cache.get('branches', lambda: query_db("SELECT BranchID, Name FROM Branch"))
+
+def get_employee_choices():
+    """Returns every employee for manager and personal banker selection lists."""
+    return reference_cache.get('employees', lambda: query_db("SELECT SSN, FirstName, LastName FROM Employee"))
+
+def invalidate_reference_data(name):
+    """Marks a cached lookup list stale once the current request commits."""
+    on_commit(lambda: reference_cache.invalidate(name))
+
+# -----------------------------
+# Page Caching
+# -----------------------------
+
+page_cache_config = {
+    'size': 2000,         # Rendered pages kept in memory
+    'ttl': 300,           # Seconds a rendered page is reused; bounds staleness when it was read from a lagging replica
+    'etag_salt': None     # Set to a value shared by every worker (e.g. a release id) to let any worker answer 304;
+                          # by default each process has its own, since versions restart at 0 if their files are removed
+}
+
+# (template, user, versions, key) -> rendered HTML
+render_cache = LRUCache(maxsize=page_cache_config['size'], ttl=page_cache_config['ttl'])
+page_etag_salt = page_cache_config['etag_salt'] or secrets.token_hex(8)
+
+def customer_version(ssn):
+    """Names the version stamp of everything on one customer's pages."""
+    return f'customer:{ssn}'
+
+def touch_pages(*names):
+    """Marks pages built from the named versions stale once the current request commits."""
+    def bump():
+        for name in names:
+            version_store.bump(name)
+    on_commit(bump)
+
+def touch_account_owners(account_numbers):
+    """Marks the pages of every customer who owns one of the accounts stale once the request commits."""
+    query = f"SELECT DISTINCT SSN FROM Customer_Account WHERE AccountNumber IN ({_in_list(account_numbers)})"
+    owners = query_db(query, tuple(account_numbers)) or []
+    touch_pages(*[customer_version(row['SSN']) for row in owners])
+
+def render_page(template, versions, load_context, key=None):
+    """Renders a page whose content only changes when one of the named versions is bumped.
+
+    The ETag covers the versions, the user and key (e.g. the search term), so a
+    matching If-None-Match is answered 304 without querying or rendering, and a
+    render_cache hit skips both as well. Pages that show flash messages are
+    always rendered and never cached.
+    """
+    if '_flashes' in session:
+        return render_template(template, **load_context())
+    cache_key = (template, session.get('user_id'), tuple(version_store.get(name) for name in versions), key)
+    etag = hashlib.sha1(repr((page_etag_salt,) + cache_key).encode()).hexdigest()
+    if etag in request.if_none_match:
+        response = Response(status=304)
+    else:
+        body = render_cache.get(cache_key)
+        if body is None:
+            context = load_context()
+            if '_flashes' in session:
+                # Loading flashed a warning, which this render consumes; the page is not reusable
+                return render_template(template, **context)
+            body = render_template(template, **context)
+            render_cache.set(cache_key, body)
+        response = Response(body)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+# -----------------------------
+# Bulk Import
+# -----------------------------
+
+IMPORT_BATCH_SIZE = 1000
+IMPORT_MAX_REPORTED_ERRORS = 1000
+
+def _text(value):
+    return str(value).strip()
+
+def _integer(value):
+    # JSON lines carry real numbers; refuse 1.9 rather than truncate it to 1
+    if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+        raise ValueError(f'not a whole number: {value!r}')
+    if isinstance(value, str):
+        value = value.strip()
+    elif not isinstance(value, (int, float)):
+        raise ValueError(f'not a whole number: {value!r}')
+    return int(value)
+
+def _flag(value):
+    if isinstance(value, bool):
+        return value
+    flag = str(value).strip().lower()
+    if flag in ('1', 'true', 'yes', 'y', 'on'):
+        return True
+    if flag in ('0', 'false', 'no', 'n', 'off'):
+        return False
+    raise ValueError(f'not a true/false value: {value!r}')
+
+def _money(value):
+    try:
+        amount = Decimal(str(value).strip())
+    except InvalidOperation:
+        raise ValueError(f'not an amount: {value!r}')
+    if not amount.is_finite():
+        raise ValueError(f'not an amount: {value!r}')
+    return amount.quantize(CENT, rounding=ROUND_HALF_UP)
+
+def _date(value):
+    parsed = parse_date(str(value).strip())
+    if parsed is None:
+        raise ValueError(f'not a YYYY-MM-DD date: {value!r}')
+    return parsed
+
+# Per kind: (field, converter, required, default) and the statements each row feeds.
+# A statement's params function returns None to skip the statement for that row.
+# 'aggregate', if present, returns the (query, params) that adds a written chunk to the branch aggregates.
+# 'prepare', if present, transforms a validated chunk in place before it is written.
+IMPORT_SPECS = {
+    'customers': {
+        'fields': [
+            ('SSN', _integer, True, None),
+            ('FirstName', _text, True, None),
+            ('MiddleName', _text, False, ''),
+            ('LastName', _text, True, None),
+            ('StreetNumber', _text, True, None),
+            ('StreetName', _text, True, None),
+            ('ApartmentNumber', _text, False, None),
+            ('City', _text, True, None),
+            ('State', _text, True, None),
+            ('ZipCode', _text, True, None),
+            ('PersonalBankerID', _integer, False, None),
+            ('Username', _text, False, None),
+            ('Password', _text, False, None)
+        ],
+        'statements': [
+            ("""
+                INSERT INTO Customer (SSN, FirstName, MiddleName, LastName, StreetNumber, StreetName, ApartmentNumber, City, State, ZipCode, PersonalBankerID)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            """, lambda row: (row['SSN'], row['FirstName'], row['MiddleName'], row['LastName'], row['StreetNumber'],
+                               row['StreetName'], row['ApartmentNumber'], row['City'], row['State'], row['ZipCode'],
+                               row['PersonalBankerID'])),
+            ("""
+                INSERT INTO Users (Username, Password, UserType, CustomerSSN)
+                VALUES (%s, %s, 'Customer', %s)
+            """, lambda row: (row['Username'], row['Password'], row['SSN']) if row['Username'] and row['Password'] else None)
+        ],
+        'prepare': lambda rows: hash_import_passwords(rows)
+    },
+    'accounts': {
+        'fields': [
+            ('AccountNumber', _integer, True, None),
+            ('AccountType', _text, True, None),
+            ('Balance', _money, True, None),
+            ('LastAccessDate', _date, False, None),
+            ('InterestRate', Decimal, False, Decimal('0')),
+            ('OverdraftFlag', _flag, False, False),
+            ('CustomerSSN', _integer, False, None)
+        ],
+        'statements': [
+            ("""
+                INSERT INTO Account (AccountNumber, AccountType, Balance, LastAccessDate, InterestRate, OverdraftFlag)
+                VALUES (%s, %s, %s, COALESCE(%s, CURDATE()), %s, %s)
+            """, lambda row: (row['AccountNumber'], row['AccountType'], row['Balance'], row['LastAccessDate'],
+                               row['InterestRate'], row['OverdraftFlag'])),
+            ("""
+                INSERT INTO Customer_Account (SSN, AccountNumber)
+                VALUES (%s, %s)
+            """, lambda row: (row['CustomerSSN'], row['AccountNumber']) if row['CustomerSSN'] is not None else None)
+        ],
+        'aggregate': lambda rows: account_aggregate_query([row['AccountNumber'] for row in rows], 1),
+        'versions': ('accounts',)
+    },
+    'loans': {
+        'fields': [
+            ('LoanNumber', _integer, True, None),
+            ('Amount', _money, True, None),
+            ('MonthlyRepayment', _money, True, None),
+            ('BranchID', _integer, True, None)
+        ],
+        'statements': [
+            ("""
+                INSERT INTO Loan (LoanNumber, Amount, MonthlyRepayment, BranchID)
+                VALUES (%s, %s, %s, %s)
+            """, lambda row: (row['LoanNumber'], row['Amount'], row['MonthlyRepayment'], row['BranchID']))
+        ],
+        'aggregate': lambda rows: loan_aggregate_query([row['LoanNumber'] for row in rows], 1),
+        'versions': ('loans',)
+    }
+}
+
+def read_import_rows(stream, fmt):
+    """Yields (line_number, raw_row) from a CSV or JSON-lines text stream without loading it whole."""
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+    elif fmt == 'jsonl':
+        for line_number, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as err:
+                yield line_number, ValueError(f'invalid JSON: {err}')
+                continue
+            yield line_number, row if isinstance(row, dict) else ValueError('expected a JSON object')
+    else:
+        raise ValueError(f'Unsupported import format: {fmt}')
+
+def validate_import_row(spec, raw):
+    """Converts a raw row to typed values. Raises ValueError describing the first bad field."""
+    if isinstance(raw, Exception):
+        raise raw
+    row = {}
+    for field, convert, required, default in spec['fields']:
+        value = raw.get(field)
+        if value is None or (isinstance(value, str) and not value.strip()):
+            if required:
+                raise ValueError(f'{field} is required')
+            row[field] = default
+            continue
+        try:
+            row[field] = convert(value)
+        except (ValueError, TypeError, InvalidOperation) as err:
+            raise ValueError(f'{field}: {err}')
+    return row
+
+def _write_import_rows(cursor, spec, rows, many):
+    for statement, params_for in spec['statements']:
+        batch = [params for params in (params_for(row) for _, row in rows) if params is not None]
+        if not batch:
+            continue
+        if many:
+            cursor.executemany(statement, batch)
+        else:
+            cursor.execute(statement, batch[0])
+    if 'aggregate' in spec:
+        cursor.execute(*spec['aggregate']([row for _, row in rows]))
+
+def hash_import_passwords(rows):
+    """Replaces plaintext passwords in a customer chunk with hashes, computed in parallel."""
+    with_password = [row for _, row in rows if row['Password']]
+    for row, hashed in zip(with_password, hash_passwords([row['Password'] for row in with_password])):
+        row['Password'] = hashed
+
+def write_import_chunk(conn, spec, rows, report):
+    """Writes a chunk of validated rows in one transaction.
+
+    If the batch is rejected, the chunk is replayed row by row so the
+    offending rows are reported and the rest still land.
+    """
+    if 'prepare' in spec:
+        spec['prepare'](rows)
+    cursor = conn.cursor()
+    try:
+        try:
+            _write_import_rows(cursor, spec, rows, many=True)
+            conn.commit()
+            report['rows_imported'] += len(rows)
+            return
+        except mysql.connector.Error:
+            conn.rollback()
+
+        for line_number, row in rows:
+            try:
+                _write_import_rows(cursor, spec, [(line_number, row)], many=False)
+                conn.commit()
+                report['rows_imported'] += 1
+            except mysql.connector.Error as err:
+                conn.rollback()
+                record_import_error(report, line_number, str(err))
+    finally:
+        cursor.close()
+
+def record_import_error(report, line_number, message):
+    report['error_count'] += 1
+    if len(report['errors']) < IMPORT_MAX_REPORTED_ERRORS:
+        report['errors'].append({'line': line_number, 'error': message})
+
+def run_import(kind, stream, fmt='csv', batch_size=IMPORT_BATCH_SIZE, progress=None):
+    """Streams rows from stream into the tables for kind, batch_size rows per transaction.
+
+    Bad rows are reported and skipped; they never stop the import. progress,
+    if given, is called with the report after every chunk. Returns a report
+    with row counts, per-row errors and throughput.
+    """
+    spec = IMPORT_SPECS[kind]
+    report = {
+        'kind': kind,
+        'rows_read': 0,
+        'rows_imported': 0,
+        'error_count': 0,
+        'errors': [],
+        'seconds': 0.0,
+        'rows_per_second': 0.0
+    }
+    started = time.perf_counter()
+    conn = get_db_connection()
+    try:
+        chunk = []
+        for line_number, raw in read_import_rows(stream, fmt):
+            report['rows_read'] += 1
+            try:
+                chunk.append((line_number, validate_import_row(spec, raw)))
+            except ValueError as err:
+                record_import_error(report, line_number, str(err))
+            if len(chunk) >= batch_size:
+                write_import_chunk(conn, spec, chunk, report)
+                chunk = []
+                if progress:
+                    progress(report)
+        if chunk:
+            write_import_chunk(conn, spec, chunk, report)
+    finally:
+        release_db_connection(conn)
+        # Committed chunks are visible even if the import stopped part-way
+        for name in spec.get('versions', ()):
+            version_store.bump(name)
+    elapsed = time.perf_counter() - started
+    report['seconds'] = round(elapsed, 3)
+    if elapsed > 0:
+        report['rows_per_second'] = round(report['rows_imported'] / elapsed, 1)
+    return report
+
+# -----------------------------
+# Background Jobs
+# -----------------------------
+
+job_config = {
+    'poll_interval': 1.0,     # Seconds an idle worker sleeps between polls
+    'stale_after': 300,       # Seconds without a heartbeat before a running job is presumed dead
+    'upload_dir': os.path.join(app.instance_path, 'uploads')
+}
+
+# JobType -> {'handler', 'concurrency', 'max_attempts', 'backoff'}
+JOB_HANDLERS = {}
+
+def job_handler(job_type, concurrency=1, max_attempts=3, backoff=30):
+    """Registers a function as the handler for a job type.
+
+    The handler is called as handler(payload, progress) and returns a
+    JSON-serializable result; progress(fraction) records how far it got and
+    doubles as the heartbeat, so long handlers must call it at least every
+    job_config['stale_after'] seconds. At most concurrency jobs of the type run at once across all workers.
+    Failed jobs are retried up to max_attempts times, waiting backoff
+    seconds after the first failure and doubling after each one.
+    """
+    def decorator(f):
+        JOB_HANDLERS[job_type] = {
+            'handler': f,
+            'concurrency': concurrency,
+            'max_attempts': max_attempts,
+            'backoff': backoff
+        }
+        return f
+    return decorator
+
+def enqueue_job(job_type, payload, created_by=None, delay=0):
+    """Queues a job to run after delay seconds and returns its JobID. The job is committed immediately."""
+    if job_type not in JOB_HANDLERS:
+        raise ValueError(f'Unknown job type: {job_type}')
+    query = """
+        INSERT INTO Job (JobType, Payload, MaxAttempts, RunAfter, CreatedBy)
+        VALUES (%s, %s, %s, NOW(6) + INTERVAL %s SECOND, %s)
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(query, (job_type, json.dumps(payload, default=str), JOB_HANDLERS[job_type]['max_attempts'], delay, created_by))
+        conn.commit()
+        return cursor.lastrowid
+    finally:
+        cursor.close()
+        release_db_connection(conn)
+
+def get_job(job_id):
+    """Returns a job's status row with Payload and Result decoded, or None."""
+    query = """
+        SELECT JobID, JobType, Status, Payload, Result, Error, Progress, Attempts, MaxAttempts,
+               RunAfter, CreatedAt, StartedAt, FinishedAt, CreatedBy
+        FROM Job WHERE JobID = %s
+    """
+    job = query_db(query, (job_id,), fetchone=True)
+    if job:
+        job['Payload'] = json.loads(job['Payload']) if job['Payload'] else None
+        job['Result'] = json.loads(job['Result']) if job['Result'] else None
+    return job
+
+def claim_job(conn, worker_id):
+    """Atomically claims the next runnable job whose type is under its concurrency limit."""
+    cursor = conn.cursor(dictionary=True, buffered=True)
+    try:
+        # Serialize claims across workers so concurrency limits cannot be overshot
+        cursor.execute("SELECT GET_LOCK('bank_job_claim', 10) AS Acquired")
+        if not cursor.fetchone()['Acquired']:
+            return None
+        try:
+            # Requeue jobs whose worker stopped sending heartbeats
+            cursor.execute("""
+                UPDATE Job
+                SET Status = IF(Attempts < MaxAttempts, 'queued', 'failed'),
+                    Error = 'Worker stopped responding.',
+                    FinishedAt = IF(Attempts < MaxAttempts, NULL, NOW())
+                WHERE Status = 'running' AND HeartbeatAt < NOW() - INTERVAL %s SECOND
+            """, (job_config['stale_after'],))
+
+            cursor.execute("SELECT JobType, COUNT(*) AS Running FROM Job WHERE Status = 'running' GROUP BY JobType")
+            running = {row['JobType']: row['Running'] for row in cursor.fetchall()}
+            job_types = [job_type for job_type, spec in JOB_HANDLERS.items()
+                         if running.get(job_type, 0) < spec['concurrency']]
+            if not job_types:
+                conn.commit()
+                return None
+
+            placeholders = ', '.join(['%s'] * len(job_types))
+            cursor.execute(f"""
+                SELECT JobID, JobType, Payload, Attempts, MaxAttempts
+                FROM Job
+                WHERE Status = 'queued' AND RunAfter <= NOW(6) AND JobType IN ({placeholders})
+                ORDER BY RunAfter, JobID
+                LIMIT 1
+                FOR UPDATE SKIP LOCKED
+            """, tuple(job_types))
+            job = cursor.fetchone()
+            if job:
+                cursor.execute("""
+                    UPDATE Job
+                    SET Status = 'running', Attempts = Attempts + 1, Progress = 0, StartedAt = NOW(),
+                        HeartbeatAt = NOW(), WorkerID = %s
+                    WHERE JobID = %s
+                """, (worker_id, job['JobID']))
+                job['Attempts'] += 1
+            conn.commit()
+            return job
+        finally:
+            cursor.execute("DO RELEASE_LOCK('bank_job_claim')")
+    finally:
+        cursor.close()
+
+def _update_job(conn, query, params):
+    cursor = conn.cursor()
+    try:
+        cursor.execute(query, params)
+        conn.commit()
+    finally:
+        cursor.close()
+
+def run_job(conn, job):
+    """Runs a claimed job and records its result, scheduling a retry if it fails."""
+    spec = JOB_HANDLERS[job['JobType']]
+
+    def progress(fraction):
+        _update_job(conn, "UPDATE Job SET Progress = %s, HeartbeatAt = NOW() WHERE JobID = %s",
+                    (round(max(0.0, min(fraction, 1.0)) * 100, 2), job['JobID']))
+
+    try:
+        result = spec['handler'](json.loads(job['Payload']), progress)
+    except Exception as err:
+        print(f"Job {job['JobID']} ({job['JobType']}) failed: {err!r}")
+        if job['Attempts'] < job['MaxAttempts']:
+            delay = spec['backoff'] * 2 ** (job['Attempts'] - 1)
+            _update_job(conn, """
+                UPDATE Job SET Status = 'queued', Error = %s, RunAfter = NOW(6) + INTERVAL %s SECOND
+                WHERE JobID = %s
+            """, (repr(err), delay, job['JobID']))
+        else:
+            _update_job(conn, """
+                UPDATE Job SET Status = 'failed', Error = %s, FinishedAt = NOW()
+                WHERE JobID = %s
+            """, (repr(err), job['JobID']))
+        return
+
+    _update_job(conn, """
+        UPDATE Job SET Status = 'succeeded', Result = %s, Error = NULL, Progress = 100, FinishedAt = NOW()
+        WHERE JobID = %s
+    """, (json.dumps(result, default=str), job['JobID']))
+
+def work_loop(worker_id, stop=None):
+    """Claims and runs jobs until stop is set."""
+    while stop is None or not stop.is_set():
+        try:
+            conn = get_db_connection()
+            try:
+                job = claim_job(conn, worker_id)
+                if job:
+                    run_job(conn, job)
+            finally:
+                release_db_connection(conn)
+        except mysql.connector.Error as err:
+            print(f"Worker {worker_id}: {err}")
+            job = None
+        if not job:
+            if stop is not None:
+                stop.wait(job_config['poll_interval'])
+            else:
+                time.sleep(job_config['poll_interval'])
+
+def _worker_process(worker_id, stop):
+    # Finish the current job on Ctrl-C or SIGTERM rather than dying mid-write
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+    work_loop(worker_id, stop)
+
+@job_handler('bulk_import', concurrency=2, max_attempts=1)
+def bulk_import_job(payload, progress):
+    """Imports an uploaded file saved under job_config['upload_dir']."""
+    path = payload['path']
+    size = os.path.getsize(path) or 1
+    try:
+        with open(path, 'rb') as raw:
+            stream = io.TextIOWrapper(raw, encoding='utf-8-sig', newline='')
+            # The raw position runs slightly ahead of the parser, which is close enough for progress
+            report = run_import(payload['kind'], stream, payload['format'], payload['batch_size'],
+                                progress=lambda report: progress(raw.tell() / size))
+    finally:
+        os.remove(path)
+    return report
+
+# -----------------------------
+# Idempotency Keys
+# -----------------------------
+
+idempotency_config = {
+    'ttl': 24 * 3600,       # Seconds a key is remembered
+    'cache_size': 20000,    # Completed keys answered from memory
+    'purge_batch': 5000     # Expired keys deleted per statement
+}
+
+# KeyHash -> (RequestHash, result) for completed requests
+idempotency_cache = LRUCache(maxsize=idempotency_config['cache_size'], ttl=idempotency_config['ttl'])
+
+class IdempotencyConflict(PostingError):
+    """Raised when a key is reused for a request with different details."""
+
+def idempotency_hash(*parts):
+    return hashlib.sha256('\x1f'.join(str(part) for part in parts).encode()).digest()[:16]
+
+def get_idempotency_key():
+    """Returns the client's key from the Idempotency-Key header or the form, or None."""
+    key = (request.headers.get('Idempotency-Key') or request.form.get('idempotency_key') or '').strip()
+    return key[:255] or None
+
+def claim_idempotency_key(conn, key_hash, request_hash):
+    """Reserves a key inside the caller's transaction; returns the stored result if it was already used.
+
+    The insert takes the key's row lock, so a retry that arrives while the
+    first attempt is still running waits here, then either sees its result
+    (first attempt committed) or takes over the key (first attempt rolled
+    back). Either way Account is only touched once. A key that has expired
+    but is not purged yet is claimed afresh.
+    """
+    cached = idempotency_cache.get(key_hash)
+    if cached is not None and cached[2] <= time.time():
+        cached = None
+    if cached is None:
+        cursor = conn.cursor(buffered=True)
+        try:
+            try:
+                cursor.execute("""
+                    INSERT INTO IdempotencyKey (KeyHash, RequestHash, ExpiresAt)
+                    VALUES (%s, %s, NOW() + INTERVAL %s SECOND)
+                """, (key_hash, request_hash, idempotency_config['ttl']))
+                return None
+            except mysql_errors.IntegrityError as err:
+                if err.errno != 1062:
+                    raise
+            cursor.execute("""
+                UPDATE IdempotencyKey SET RequestHash = %s, Result = NULL, ExpiresAt = NOW() + INTERVAL %s SECOND
+                WHERE KeyHash = %s AND ExpiresAt <= NOW()
+            """, (request_hash, idempotency_config['ttl'], key_hash))
+            if cursor.rowcount:
+                return None
+            cursor.execute("""
+                SELECT RequestHash, Result, TIMESTAMPDIFF(SECOND, NOW(), ExpiresAt)
+                FROM IdempotencyKey WHERE KeyHash = %s
+            """, (key_hash,))
+            stored_hash, result, remaining = cursor.fetchone()
+        finally:
+            cursor.close()
+        cached = (bytes(stored_hash), json.loads(result), time.time() + remaining)
+        idempotency_cache.set(key_hash, cached)
+    if cached[0] != request_hash:
+        raise IdempotencyConflict('This request was already submitted with different details.')
+    return cached[1]
+
+def save_idempotent_result(conn, key_hash, result):
+    """Stores the result for a claimed key; it becomes visible to retries when the caller commits.
+
+    After committing, the caller adds (request_hash, result, expires_at) to
+    idempotency_cache, with expires_at taken before the key was claimed.
+    """
+    cursor = conn.cursor()
+    try:
+        cursor.execute("UPDATE IdempotencyKey SET Result = %s WHERE KeyHash = %s", (json.dumps(result), key_hash))
+    finally:
+        cursor.close()
+
+def purge_idempotency_keys(progress=None):
+    """Deletes expired keys in small batches, so the purge never holds long locks.
+
+    progress(fraction), if given, is called after each batch.
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    deleted = 0
+    try:
+        cursor.execute("SELECT COUNT(*) FROM IdempotencyKey WHERE ExpiresAt < NOW()")
+        expired = cursor.fetchone()[0]
+        conn.commit()
+        while True:
+            cursor.execute("DELETE FROM IdempotencyKey WHERE ExpiresAt < NOW() LIMIT %s",
+                           (idempotency_config['purge_batch'],))
+            conn.commit()
+            deleted += cursor.rowcount
+            if progress:
+                progress(deleted / max(expired, deleted, 1))
+            if cursor.rowcount < idempotency_config['purge_batch']:
+                return deleted
+    finally:
+        cursor.close()
+        release_db_connection(conn)
+
+@job_handler('purge_idempotency_keys', concurrency=1, max_attempts=3, backoff=60)
+def purge_idempotency_keys_job(payload, progress):
+    """Deletes expired idempotency keys; with payload['every'] (seconds) the job re-queues itself."""
+    result = {'deleted': purge_idempotency_keys(progress)}
+    if payload.get('every'):
+        result['next_job'] = enqueue_job('purge_idempotency_keys', payload, delay=int(payload['every']))
+    return result
+
+# -----------------------------
+# Interest Accrual
+# -----------------------------
+
+accrual_config = {
+    'chunk_size': 50000,   # Accounts read, computed and written per transaction
+    'day_count': 365       # Days per year for the daily rate
+}
+
+# InterestRate is an annual percentage; it is carried as an integer scaled by RATE_SCALE
+RATE_SCALE = 10000
+# Keeps 2 * balance * rate inside int64 for the vectorized path
+ACCRUAL_INT_LIMIT = 2 ** 62
+
+def compute_daily_interest(balance_cents, rate_units, day_count=365):
+    """Returns one day's interest in whole cents for each account, rounded half up.
+
+    balance_cents and rate_units are int64 arrays; rate_units is the annual
+    percentage rate times RATE_SCALE. All arithmetic is exact integer math;
+    the rare rows too large for int64 are computed with Python integers.
+    Accounts with a non-positive balance or rate accrue nothing.
+    """
+    balance_cents = np.asarray(balance_cents, dtype=np.int64)
+    rate_units = np.asarray(rate_units, dtype=np.int64)
+    denominator = 100 * RATE_SCALE * day_count
+    accrues = (balance_cents > 0) & (rate_units > 0)
+    safe = accrues & (balance_cents <= ACCRUAL_INT_LIMIT // np.maximum(rate_units, 1))
+
+    interest = np.zeros(balance_cents.shape, dtype=np.int64)
+    numerator = balance_cents[safe] * rate_units[safe]
+    interest[safe] = (2 * numerator + denominator) // (2 * denominator)
+    for index in np.flatnonzero(accrues & ~safe):
+        numerator = int(balance_cents[index]) * int(rate_units[index])
+        interest[index] = (2 * numerator + denominator) // (2 * denominator)
+    return interest
+
+def run_interest_accrual(business_date, chunk_size=None, progress=None):
+    """Accrues one day of interest on every account for business_date.
+
+    Accounts are streamed in AccountNumber order, chunk_size at a time. Each
+    chunk's interest is computed in one vectorized pass, then applied with
+    set-based statements: a bulk insert into a temporary table, one joined
+    UPDATE of Account.Balance and one INSERT ... SELECT of 'Interest'
+    Transaction rows. The run's high-water mark is advanced in the same
+    transaction, so re-running a date resumes after the last committed chunk
+    and never accrues an account twice. Returns the run summary.
+    """
+    chunk_size = chunk_size or accrual_config['chunk_size']
+    conn = get_db_connection()
+    cursor = conn.cursor(buffered=True)
+    try:
+        cursor.execute("""
+            INSERT IGNORE INTO InterestAccrualRun (BusinessDate, Status, LastAccountNumber, StartedAt)
+            VALUES (%s, 'running', -1, NOW())
+        """, (business_date,))
+        cursor.execute("""
+            CREATE TEMPORARY TABLE IF NOT EXISTS AccrualChunk (
+                AccountNumber INT PRIMARY KEY,
+                InterestCents BIGINT NOT NULL
+            )
+        """)
+        cursor.execute("SELECT MAX(AccountNumber) FROM Account")
+        max_account = cursor.fetchone()[0] or 0
+        conn.commit()
+
+        while True:
+            # Lock the run row so concurrent runs for the same date take turns
+            cursor.execute("""
+                SELECT Status, LastAccountNumber FROM InterestAccrualRun
+                WHERE BusinessDate = %s FOR UPDATE
+            """, (business_date,))
+            status, last_account = cursor.fetchone()
+            if status == 'completed':
+                conn.commit()
+                break
+
+            cursor.execute("""
+                SELECT AccountNumber,
+                       CAST(ROUND(Balance * 100) AS SIGNED),
+                       CAST(ROUND(InterestRate * %s) AS SIGNED)
+                FROM Account
+                WHERE AccountNumber > %s
+                ORDER BY AccountNumber
+                LIMIT %s
+            """, (RATE_SCALE, last_account, chunk_size))
+            rows = cursor.fetchall()
+            if not rows:
+                cursor.execute("""
+                    UPDATE InterestAccrualRun SET Status = 'completed', FinishedAt = NOW()
+                    WHERE BusinessDate = %s
+                """, (business_date,))
+                conn.commit()
+                break
+
+            chunk = np.array(rows, dtype=np.int64)
+            interest = compute_daily_interest(chunk[:, 1], chunk[:, 2], accrual_config['day_count'])
+            accrued = interest > 0
+            accounts = chunk[accrued, 0].tolist()
+            amounts = interest[accrued].tolist()
+
+            if accounts:
+                cursor.execute("DELETE FROM AccrualChunk")
+                cursor.executemany("INSERT INTO AccrualChunk (AccountNumber, InterestCents) VALUES (%s, %s)",
+                                   list(zip(accounts, amounts)))
+                cursor.execute("""
+                    UPDATE Account JOIN AccrualChunk ON Account.AccountNumber = AccrualChunk.AccountNumber
+                    SET Account.Balance = Account.Balance + AccrualChunk.InterestCents / 100
+                """)
+                cursor.execute("""
+                    INSERT INTO `Transaction` (TransactionType, TDate, TTime, Amount, AccountNumber, TransactionCharge)
+                    SELECT 'Interest', %s, '23:59:59', InterestCents / 100, AccountNumber, 0
+                    FROM AccrualChunk
+                """, (business_date,))
+                for query, params in accrual_aggregate_queries(business_date, accounts[0], accounts[-1]):
+                    cursor.execute(query, params)
+
+            cursor.execute("""
+                UPDATE InterestAccrualRun
+                SET LastAccountNumber = %s,
+                    AccountsAccrued = AccountsAccrued + %s,
+                    InterestCents = InterestCents + %s
+                WHERE BusinessDate = %s
+            """, (int(chunk[-1, 0]), len(accounts), sum(amounts), business_date))
+            conn.commit()
+            if accounts:
+                version_store.bump('accounts')
+            if progress and max_account:
+                progress(int(chunk[-1, 0]) / max_account)
+
+        cursor.execute("""
+            SELECT BusinessDate, Status, AccountsAccrued, InterestCents, StartedAt, FinishedAt
+            FROM InterestAccrualRun WHERE BusinessDate = %s
+        """, (business_date,))
+        columns = [column[0] for column in cursor.description]
+        summary = dict(zip(columns, cursor.fetchone()))
+        conn.commit()
+        return summary
+    finally:
+        cursor.close()
+        release_db_connection(conn)
+
+@job_handler('interest_accrual', concurrency=1, max_attempts=3, backoff=60)
+def interest_accrual_job(payload, progress):
+    """Accrues interest for payload['business_date'] (default: today)."""
+    business_date = parse_date(payload.get('business_date', '')) or datetime.now().date()
+    return run_interest_accrual(business_date, payload.get('chunk_size'), progress)
+
+# -----------------------------
+# Loan Amortization
+# -----------------------------
+
+loan_config = {
+    'annual_rate': Decimal('6.5'),  # Loans carry no rate of their own; annual percentage used for schedules
+    'max_rate': Decimal('100'),     # Highest annual percentage accepted from the rate query parameter
+    'max_months': 600               # Loans still open after this many payments are reported as not amortizing
+}
+
+# (LoanNumber, Amount, MonthlyRepayment, rate, start month) -> schedule
+schedule_cache = LRUCache(maxsize=4096)
+
+def add_months(day, months):
+    """Returns the first day of the month `months` after day's month."""
+    index = day.year * 12 + day.month - 1 + months
+    return day.replace(year=index // 12, month=index % 12 + 1, day=1)
+
+def amortize(amount_cents, payment_cents, rate_units, max_months=None, keep_schedule=False):
+    """Runs every loan forward one month at a time, all loans in lockstep.
+
+    Each month interest is charged on the remaining balance (rounded half up
+    to the cent), the repayment is applied, and loans drop out of the working
+    arrays once paid off, so the cost follows the total number of payments
+    rather than loans times the longest term. A loan whose repayment does
+    not cover its interest can never be paid off and is marked as not
+    amortizing. Returns per-loan arrays of months, total interest and total
+    paid; with keep_schedule, also a per-month list of
+    (loan indexes, interest, principal, payment, balance) arrays.
+    """
+    max_months = max_months or loan_config['max_months']
+    try:
+        amount_cents = np.asarray(amount_cents, dtype=np.int64)
+        rate_units = np.broadcast_to(np.asarray(rate_units, dtype=np.int64), amount_cents.shape)
+    except OverflowError:
+        raise ValueError('Loan amount or rate is too large to amortize.')
+    count = amount_cents.shape[0]
+    # Fall back to Python integers if balance * rate could overflow int64
+    dtype = np.int64
+    if count and int(amount_cents.max()) * int(max(rate_units.max(), 1)) > ACCRUAL_INT_LIMIT:
+        dtype = object
+    denominator = 100 * RATE_SCALE * 12
+
+    months = np.zeros(count, dtype=np.int64)
+    total_interest = np.zeros(count, dtype=dtype)
+    total_paid = np.zeros(count, dtype=dtype)
+    amortizing = np.ones(count, dtype=bool)
+    schedule = []
+
+    # Working arrays hold only the loans still open
+    index = np.flatnonzero(amount_cents > 0)
+    balance = amount_cents[index].astype(dtype)
+    payment_due = np.asarray(payment_cents, dtype=np.int64)[index].astype(dtype)
+    rate = rate_units[index].astype(dtype)
+
+    for month in range(1, max_months + 1):
+        if not index.size:
+            break
+        interest = (2 * balance * rate + denominator) // (2 * denominator)
+        payment = np.minimum(payment_due, balance + interest)
+        principal = payment - interest
+
+        covering = principal > 0
+        if not covering.all():
+            amortizing[index[~covering]] = False
+            index, balance, payment_due, rate = index[covering], balance[covering], payment_due[covering], rate[covering]
+            interest, payment, principal = interest[covering], payment[covering], principal[covering]
+
+        balance = balance - principal
+        months[index] = month
+        total_interest[index] += interest
+        total_paid[index] += payment
+        if keep_schedule:
+            schedule.append((index, interest, principal, payment, balance))
+
+        still_open = balance > 0
+        if not still_open.all():
+            index, balance, payment_due, rate = index[still_open], balance[still_open], payment_due[still_open], rate[still_open]
+
+    amortizing[index] = False  # Still open after max_months
+    result = {
+        'months': months,
+        'total_interest': total_interest,
+        'total_paid': total_paid,
+        'amortizing': amortizing
+    }
+    if keep_schedule:
+        result['schedule'] = schedule
+    return result
+
+def get_loan_rate():
+    """Returns the annual rate for schedules, from the rate query parameter or loan_config.
+
+    Raises ValueError if the parameter is not a percentage between 0 and max_rate.
+    """
+    value = request.args.get('rate', '')
+    if not value:
+        return loan_config['annual_rate']
+    try:
+        rate = Decimal(value)
+    except InvalidOperation:
+        rate = None
+    if rate is None or not rate.is_finite() or not 0 <= rate <= loan_config['max_rate']:
+        raise ValueError(f"Rate must be a percentage between 0 and {loan_config['max_rate']}.")
+    return rate
+
+def build_loan_schedules(loans, annual_rate, start):
+    """Returns the full payment schedule of each loan, computed together and memoized."""
+    rate_units = int((annual_rate * RATE_SCALE).to_integral_value(rounding=ROUND_HALF_UP))
+    schedules = {}
+    missing = []
+    for loan in loans:
+        key = (loan['LoanNumber'], loan['Amount'], loan['MonthlyRepayment'], annual_rate, start)
+        cached = schedule_cache.get(key)
+        if cached is not None:
+            schedules[loan['LoanNumber']] = cached
+        else:
+            missing.append((key, loan))
+
+    if missing:
+        result = amortize([int(loan['Amount'] * 100) for _, loan in missing],
+                          [int(loan['MonthlyRepayment'] * 100) for _, loan in missing],
+                          rate_units, keep_schedule=True)
+        payments = [[] for _ in missing]
+        for period, (index, interest, principal, payment, balance) in enumerate(result['schedule'], start=1):
+            for position, loan_index in enumerate(index.tolist()):
+                payments[loan_index].append({
+                    'Period': period,
+                    'Date': add_months(start, period),
+                    'Payment': Decimal(int(payment[position])) / 100,
+                    'Interest': Decimal(int(interest[position])) / 100,
+                    'Principal': Decimal(int(principal[position])) / 100,
+                    'Balance': Decimal(int(balance[position])) / 100
+                })
+
+        for loan_index, (key, loan) in enumerate(missing):
+            amortizing = bool(result['amortizing'][loan_index])
+            schedule = {
+                'LoanNumber': loan['LoanNumber'],
+                'Amount': loan['Amount'],
+                'MonthlyRepayment': loan['MonthlyRepayment'],
+                'AnnualRate': annual_rate,
+                'Amortizing': amortizing,
+                'Months': int(result['months'][loan_index]),
+                'TotalInterest': Decimal(int(result['total_interest'][loan_index])) / 100,
+                'TotalPaid': Decimal(int(result['total_paid'][loan_index])) / 100,
+                'PayoffDate': payments[loan_index][-1]['Date'] if amortizing and payments[loan_index] else None,
+                'Payments': payments[loan_index]
+            }
+            schedule_cache.set(key, schedule)
+            schedules[loan['LoanNumber']] = schedule
+
+    return [schedules[loan['LoanNumber']] for loan in loans]
+
+def invalidate_loan_schedule(loan_number):
+    """Drops memoized schedules for a loan whose terms changed."""
+    on_commit(lambda: schedule_cache.pop_where(lambda schedule: schedule['LoanNumber'] == loan_number))
+
+# -----------------------------
+# Branch Aggregates
+# -----------------------------
+
+aggregate_config = {
+    'slots': 8,              # Rows per branch; spreads posting updates over several row locks
+    'reconcile_days': 35,    # Days of BranchDailyVolume rebuilt by reconciliation
+    'reconcile_batch': 50000,    # Account numbers rebuilt per statement; progress is reported between batches
+    'dashboard_days': 7      # Days of volume returned by the dashboard summary
+}
+
+# An account belongs to the branch of its holders' personal banker; joint
+# accounts whose holders bank at different branches count at the lowest BranchID.
+ACCOUNT_BRANCH_SQL = """
+    SELECT Customer_Account.AccountNumber, MIN(Banker.BranchID) AS BranchID
+    FROM Customer_Account
+    JOIN Customer ON Customer.SSN = Customer_Account.SSN
+    JOIN Employee AS Banker ON Banker.SSN = Customer.PersonalBankerID
+    WHERE {where}
+    GROUP BY Customer_Account.AccountNumber
+"""
+
+def debit_transaction_types():
+    return [transaction_type for transaction_type, sign in TRANSACTION_TYPES.items() if sign < 0]
+
+def _in_list(values):
+    return ', '.join(['%s'] * len(values))
+
+def posting_aggregate_queries(postings, branches):
+    """Returns the (query, params) pairs that fold postings into the branch aggregates.
+
+    branches maps AccountNumber to BranchID; postings on accounts without a
+    branch are skipped. Deltas are summed per (BranchID, Slot) and written in
+    ascending key order, so concurrent postings lock the aggregate rows in
+    one global order.
+    """
+    deltas = {}
+    for posting in postings:
+        branch = branches.get(int(posting.account_number))
+        if branch is None:
+            continue
+        sign = TRANSACTION_TYPES[posting.transaction_type]
+        key = (branch, int(posting.account_number) % aggregate_config['slots'])
+        delta = deltas.setdefault(key, [0, Decimal('0.00'), Decimal('0.00'), Decimal('0.00')])
+        delta[0] += 1
+        delta[1] += posting.amount * sign
+        delta[2 if sign > 0 else 3] += posting.amount
+    if not deltas:
+        return []
+
+    keys = sorted(deltas)
+    summary_params, volume_params = [], []
+    for branch, slot in keys:
+        count, net, credits, debits = deltas[(branch, slot)]
+        summary_params.extend((branch, slot, net))
+        volume_params.extend((branch, slot, count, credits, debits))
+    return [
+        (f"""
+            INSERT INTO BranchSummary (BranchID, Slot, Deposits)
+            VALUES {', '.join(['(%s, %s, %s)'] * len(keys))}
+            ON DUPLICATE KEY UPDATE Deposits = Deposits + VALUES(Deposits)
+        """, tuple(summary_params)),
+        (f"""
+            INSERT INTO BranchDailyVolume (BranchID, TDate, Slot, Transactions, Credits, Debits)
+            VALUES {', '.join(['(%s, CURDATE(), %s, %s, %s, %s)'] * len(keys))}
+            ON DUPLICATE KEY UPDATE Transactions = Transactions + VALUES(Transactions),
+                                    Credits = Credits + VALUES(Credits),
+                                    Debits = Debits + VALUES(Debits)
+        """, tuple(volume_params))
+    ]
+
+def apply_posting_aggregates(cursor, postings):
+    """Folds postings into the branch aggregates on a dictionary cursor, inside the caller's transaction."""
+    accounts = sorted({int(posting.account_number) for posting in postings})
+    if not accounts:
+        return
+    cursor.execute(ACCOUNT_BRANCH_SQL.format(where=f'Customer_Account.AccountNumber IN ({_in_list(accounts)})'),
+                   tuple(accounts))
+    branches = {row['AccountNumber']: row['BranchID'] for row in cursor.fetchall()}
+    for query, params in posting_aggregate_queries(postings, branches):
+        cursor.execute(query, params)
+
+def account_aggregate_query(account_numbers, sign):
+    """Returns a (query, params) pair adding (sign=1) or removing (sign=-1) accounts from the aggregates.
+
+    Removing reads the balances being removed, so it must run before the
+    accounts are updated or deleted; adding runs after they are written.
+    """
+    branch = ACCOUNT_BRANCH_SQL.format(where=f'Customer_Account.AccountNumber IN ({_in_list(account_numbers)})')
+    slots = aggregate_config['slots']
+    query = f"""
+        INSERT INTO BranchSummary (BranchID, Slot, AccountCount, Deposits)
+        SELECT AccountBranch.BranchID, MOD(Account.AccountNumber, {slots}), %s * COUNT(*), %s * SUM(Account.Balance)
+        FROM Account JOIN ({branch}) AS AccountBranch ON AccountBranch.AccountNumber = Account.AccountNumber
+        GROUP BY AccountBranch.BranchID, MOD(Account.AccountNumber, {slots})
+        ON DUPLICATE KEY UPDATE AccountCount = AccountCount + VALUES(AccountCount),
+                                Deposits = Deposits + VALUES(Deposits)
+    """
+    return query, (sign, sign, *account_numbers)
+
+def loan_aggregate_query(loan_numbers, sign):
+    """Returns a (query, params) pair adding (sign=1) or removing (sign=-1) loans from the aggregates."""
+    slots = aggregate_config['slots']
+    query = f"""
+        INSERT INTO BranchSummary (BranchID, Slot, LoanCount, LoanBook)
+        SELECT BranchID, MOD(LoanNumber, {slots}), %s * COUNT(*), %s * SUM(Amount)
+        FROM Loan WHERE LoanNumber IN ({_in_list(loan_numbers)})
+        GROUP BY BranchID, MOD(LoanNumber, {slots})
+        ON DUPLICATE KEY UPDATE LoanCount = LoanCount + VALUES(LoanCount),
+                                LoanBook = LoanBook + VALUES(LoanBook)
+    """
+    return query, (sign, sign, *loan_numbers)
+
+def accrual_aggregate_queries(business_date, first_account, last_account):
+    """Returns the (query, params) pairs that fold an accrual chunk held in AccrualChunk into the aggregates."""
+    branch = ACCOUNT_BRANCH_SQL.format(where='Customer_Account.AccountNumber BETWEEN %s AND %s')
+    slots = aggregate_config['slots']
+    return [
+        (f"""
+            INSERT INTO BranchSummary (BranchID, Slot, Deposits)
+            SELECT AccountBranch.BranchID, MOD(AccrualChunk.AccountNumber, {slots}), SUM(AccrualChunk.InterestCents) / 100
+            FROM AccrualChunk JOIN ({branch}) AS AccountBranch ON AccountBranch.AccountNumber = AccrualChunk.AccountNumber
+            GROUP BY AccountBranch.BranchID, MOD(AccrualChunk.AccountNumber, {slots})
+            ON DUPLICATE KEY UPDATE Deposits = Deposits + VALUES(Deposits)
+        """, (first_account, last_account)),
+        (f"""
+            INSERT INTO BranchDailyVolume (BranchID, TDate, Slot, Transactions, Credits, Debits)
+            SELECT AccountBranch.BranchID, %s, MOD(AccrualChunk.AccountNumber, {slots}), COUNT(*), SUM(AccrualChunk.InterestCents) / 100, 0
+            FROM AccrualChunk JOIN ({branch}) AS AccountBranch ON AccountBranch.AccountNumber = AccrualChunk.AccountNumber
+            GROUP BY AccountBranch.BranchID, MOD(AccrualChunk.AccountNumber, {slots})
+            ON DUPLICATE KEY UPDATE Transactions = Transactions + VALUES(Transactions),
+                                    Credits = Credits + VALUES(Credits)
+        """, (business_date, first_account, last_account))
+    ]
+
+def read_branch_totals(cursor):
+    """Returns {BranchID: (AccountCount, Deposits, LoanCount, LoanBook)} summed over slots."""
+    cursor.execute("""
+        SELECT BranchID, SUM(AccountCount), SUM(Deposits), SUM(LoanCount), SUM(LoanBook)
+        FROM BranchSummary GROUP BY BranchID
+    """)
+    return {row[0]: tuple(row[1:]) for row in cursor.fetchall()}
+
+def reconcile_branch_aggregates(days=None, progress=None, batch_size=None):
+    """Rebuilds the branch aggregates from Account, Loan and Transaction.
+
+    BranchSummary is rebuilt in full and BranchDailyVolume for the last days
+    days, in one transaction. It runs under READ COMMITTED so the rebuild
+    reads committed rows without share-locking Account; a posting that is
+    in flight meanwhile waits on the locked summary rows and applies its
+    delta on top of the rebuilt totals. Accounts are rebuilt in ranges of
+    batch_size account numbers, calling progress(fraction) after each.
+    Returns the branches whose totals had drifted, with the old and
+    corrected values.
+    """
+    days = aggregate_config['reconcile_days'] if days is None else days
+    batch_size = batch_size or aggregate_config['reconcile_batch']
+    since = datetime.now().date() - timedelta(days=days)
+    debit_types = debit_transaction_types()
+    started = time.perf_counter()
+    conn = get_db_connection()
+    cursor = conn.cursor(buffered=True)
+    try:
+        conn.start_transaction(isolation_level='READ COMMITTED')
+        cursor.execute("SELECT BranchID FROM BranchSummary FOR UPDATE")
+        before = read_branch_totals(cursor)
+
+        cursor.execute("DELETE FROM BranchSummary")
+        cursor.execute("""
+            INSERT INTO BranchSummary (BranchID, Slot, LoanCount, LoanBook)
+            SELECT BranchID, 0, COUNT(*), SUM(Amount) FROM Loan GROUP BY BranchID
+        """)
+        cursor.execute("DELETE FROM BranchDailyVolume WHERE TDate >= %s", (since,))
+
+        # Each range adds its accounts and transactions on top of the ranges before it
+        branch = ACCOUNT_BRANCH_SQL.format(where='Customer_Account.AccountNumber BETWEEN %s AND %s')
+        cursor.execute("SELECT MIN(AccountNumber), MAX(AccountNumber) FROM Account")
+        first_account, last_account = cursor.fetchone()
+        if first_account is not None:
+            for low in range(first_account, last_account + 1, batch_size):
+                high = min(low + batch_size - 1, last_account)
+                cursor.execute(f"""
+                    INSERT INTO BranchSummary (BranchID, Slot, AccountCount, Deposits)
+                    SELECT AccountBranch.BranchID, 0, COUNT(*), SUM(Account.Balance)
+                    FROM Account JOIN ({branch}) AS AccountBranch
+                        ON AccountBranch.AccountNumber = Account.AccountNumber
+                    GROUP BY AccountBranch.BranchID
+                    ON DUPLICATE KEY UPDATE AccountCount = AccountCount + VALUES(AccountCount),
+                                            Deposits = Deposits + VALUES(Deposits)
+                """, (low, high))
+                cursor.execute(f"""
+                    INSERT INTO BranchDailyVolume (BranchID, TDate, Slot, Transactions, Credits, Debits)
+                    SELECT AccountBranch.BranchID, `Transaction`.TDate, 0, COUNT(*),
+                           SUM(IF(`Transaction`.TransactionType IN ({_in_list(debit_types)}), 0, `Transaction`.Amount)),
+                           SUM(IF(`Transaction`.TransactionType IN ({_in_list(debit_types)}), `Transaction`.Amount, 0))
+                    FROM `Transaction` JOIN ({branch}) AS AccountBranch
+                        ON AccountBranch.AccountNumber = `Transaction`.AccountNumber
+                    WHERE `Transaction`.TDate >= %s
+                    GROUP BY AccountBranch.BranchID, `Transaction`.TDate
+                    ON DUPLICATE KEY UPDATE Transactions = Transactions + VALUES(Transactions),
+                                            Credits = Credits + VALUES(Credits),
+                                            Debits = Debits + VALUES(Debits)
+                """, (*debit_types, *debit_types, low, high, since))
+                if progress:
+                    progress((high - first_account + 1) / (last_account - first_account + 1))
+
+        after = read_branch_totals(cursor)
+        conn.commit()
+    except mysql.connector.Error:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        release_db_connection(conn)
+
+    fields = ('AccountCount', 'Deposits', 'LoanCount', 'LoanBook')
+    zero = (0, Decimal('0.00'), 0, Decimal('0.00'))
+    drift = []
+    for branch_id in sorted(set(before) | set(after)):
+        old, new = before.get(branch_id, zero), after.get(branch_id, zero)
+        if old != new:
+            drift.append({'BranchID': branch_id,
+                          'before': dict(zip(fields, map(str, old))),
+                          'after': dict(zip(fields, map(str, new)))})
+    return {
+        'branches': len(after),
+        'volume_since': since.isoformat(),
+        'drift': drift,
+        'seconds': round(time.perf_counter() - started, 3)
+    }
+
+@job_handler('reconcile_aggregates', concurrency=1, max_attempts=3, backoff=60)
+def reconcile_aggregates_job(payload, progress):
+    """Rebuilds the branch aggregates; with payload['every'] (seconds) the job re-queues itself."""
+    result = reconcile_branch_aggregates(payload.get('days'), progress=progress)
+    if payload.get('every'):
+        result['next_job'] = enqueue_job('reconcile_aggregates', payload, delay=int(payload['every']))
+    return result
+
+def get_branch_summary(days=None):
+    """Returns per-branch totals and recent daily volume, read from the aggregates only."""
+    days = aggregate_config['dashboard_days'] if days is None else days
+    branches = query_db("""
+        SELECT Branch.BranchID, Branch.Name,
+               COALESCE(SUM(BranchSummary.AccountCount), 0) AS Accounts,
+               COALESCE(SUM(BranchSummary.Deposits), 0) AS Deposits,
+               COALESCE(SUM(BranchSummary.LoanCount), 0) AS Loans,
+               COALESCE(SUM(BranchSummary.LoanBook), 0) AS LoanBook
+        FROM Branch
+        LEFT JOIN BranchSummary ON BranchSummary.BranchID = Branch.BranchID
+        GROUP BY Branch.BranchID, Branch.Name
+        ORDER BY Branch.BranchID
+    """) or []
+    volume = query_db("""
+        SELECT BranchID, TDate, SUM(Transactions) AS Transactions, SUM(Credits) AS Credits, SUM(Debits) AS Debits
+        FROM BranchDailyVolume
+        WHERE TDate > CURDATE() - INTERVAL %s DAY
+        GROUP BY BranchID, TDate
+        ORDER BY BranchID, TDate
+    """, (days,)) or []
+
+    by_branch = {}
+    for row in volume:
+        by_branch.setdefault(row['BranchID'], []).append({
+            'Date': row['TDate'].isoformat(),
+            'Transactions': int(row['Transactions']),
+            'Credits': row['Credits'],
+            'Debits': row['Debits']
+        })
+    for branch in branches:
+        branch['Accounts'] = int(branch['Accounts'])
+        branch['Loans'] = int(branch['Loans'])
+        branch['Volume'] = by_branch.get(branch['BranchID'], [])
+        branch['Transactions'] = sum(day['Transactions'] for day in branch['Volume'])
+    return branches
+
+# -----------------------------
+# Statements
+# -----------------------------
+
+statement_config = {
+    'archive_dir': os.path.join(app.instance_path, 'statements'),
+    'chunk_size': 10000,          # Accounts read per query during generation
+    'accounts_per_file': 1000     # Statements per archive file, by AccountNumber block
+}
+
+# Decoded archive files, keyed by (path, mtime) so regenerated files are re-read
+statement_cache = LRUCache(maxsize=256)
+
+STATEMENT_MONEY_FIELDS = ('OpeningBalance', 'ClosingBalance', 'TotalCredits', 'TotalDebits', 'TotalCharges')
+
+def parse_period(value):
+    """Parses a YYYY-MM statement period into its first day. Returns None if it is malformed."""
+    try:
+        return datetime.strptime(value, '%Y-%m').date()
+    except (TypeError, ValueError):
+        return None
+
+def previous_period(today=None):
+    """Returns the first day of the month before today."""
+    today = today or datetime.now().date()
+    return (today.replace(day=1) - timedelta(days=1)).replace(day=1)
+
+def _statement_file(account_number):
+    return f"{int(account_number) // statement_config['accounts_per_file']:06d}.json.gz"
+
+def statement_path(period, account_number):
+    return os.path.join(statement_config['archive_dir'], period, _statement_file(account_number))
+
+def build_statement(account, transactions, net_after, start, end, debit_types):
+    """Builds one account's statement for start..end, or None if the account had nothing to report.
+
+    The closing balance is the current balance less everything posted after
+    the period; the opening balance is the closing balance less the period's
+    own activity.
+    """
+    credits = debits = charges = Decimal('0.00')
+    for txn in transactions:
+        if txn['TransactionType'] in debit_types:
+            debits += txn['Amount']
+        else:
+            credits += txn['Amount']
+        charges += txn['TransactionCharge']
+    closing = account['Balance'] - net_after
+    opening = closing - credits + debits
+    if not transactions and opening == 0:
+        return None
+
+    lines = []
+    running = opening
+    for txn in transactions:
+        running += -txn['Amount'] if txn['TransactionType'] in debit_types else txn['Amount']
+        lines.append({
+            'TransactionID': txn['TransactionID'],
+            'TransactionType': txn['TransactionType'],
+            'TDate': txn['TDate'].isoformat(),
+            'TTime': str(txn['TTime']),
+            'Amount': str(txn['Amount']),
+            'TransactionCharge': str(txn['TransactionCharge']),
+            'Balance': str(running)
+        })
+    return {
+        'AccountNumber': account['AccountNumber'],
+        'AccountType': account['AccountType'],
+        'Period': start.strftime('%Y-%m'),
+        'PeriodStart': start.isoformat(),
+        'PeriodEnd': end.isoformat(),
+        'OpeningBalance': str(opening),
+        'ClosingBalance': str(closing),
+        'TotalCredits': str(credits),
+        'TotalDebits': str(debits),
+        'TotalCharges': str(charges),
+        'Transactions': lines
+    }
+
+def write_statement_file(path, statements):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with gzip.open(path, 'wt', encoding='utf-8') as f:
+        json.dump(statements, f, separators=(',', ':'))
+
+def generate_statements(period_start, chunk_size=None, progress=None):
+    """Writes every account's statement for the month starting at period_start to the archive.
+
+    Accounts are read in AccountNumber order, chunk_size at a time, and each
+    chunk's transactions for the month come from one query ordered by
+    account, so the whole run is a single ordered pass over Transaction.
+    Everything is read inside one consistent snapshot. Statements are
+    written as gzipped JSON, one file per block of
+    statement_config['accounts_per_file'] accounts, into a scratch
+    directory that replaces the period's archive only once the run is
+    complete. Returns a summary.
+    """
+    chunk_size = chunk_size or statement_config['chunk_size']
+    start = period_start.replace(day=1)
+    end = (start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+    period = start.strftime('%Y-%m')
+    archive = os.path.join(statement_config['archive_dir'], period)
+    scratch = f'{archive}.partial'
+    shutil.rmtree(scratch, ignore_errors=True)
+
+    debit_types = debit_transaction_types()
+    debit_set = set(debit_types)
+    signed_amount = f"IF(TransactionType IN ({_in_list(debit_types)}), -Amount, Amount)"
+    summary = {'period': period, 'accounts': 0, 'statements': 0, 'transactions': 0, 'files': 0}
+    started = time.perf_counter()
+
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True, buffered=True)
+    try:
+        conn.start_transaction(consistent_snapshot=True, readonly=True)
+        cursor.execute("SELECT MAX(AccountNumber) AS MaxAccount FROM Account")
+        max_account = cursor.fetchone()['MaxAccount'] or 0
+
+        block, pending = None, {}
+        last_account = -1
+        while True:
+            cursor.execute("""
+                SELECT AccountNumber, AccountType, Balance FROM Account
+                WHERE AccountNumber > %s ORDER BY AccountNumber LIMIT %s
+            """, (last_account, chunk_size))
+            accounts = cursor.fetchall()
+            if not accounts:
+                break
+            first, last_account = accounts[0]['AccountNumber'], accounts[-1]['AccountNumber']
+
+            cursor.execute(f"""
+                SELECT AccountNumber, SUM({signed_amount}) AS Net FROM `Transaction`
+                WHERE AccountNumber BETWEEN %s AND %s AND TDate > %s
+                GROUP BY AccountNumber
+            """, (*debit_types, first, last_account, end))
+            net_after = {row['AccountNumber']: row['Net'] for row in cursor.fetchall()}
+
+            cursor.execute("""
+                SELECT AccountNumber, TransactionID, TransactionType, TDate, TTime, Amount, TransactionCharge
+                FROM `Transaction`
+                WHERE AccountNumber BETWEEN %s AND %s AND TDate BETWEEN %s AND %s
+                ORDER BY AccountNumber, TDate, TTime, TransactionID
+            """, (first, last_account, start, end))
+            activity = {number: list(rows) for number, rows in groupby(cursor.fetchall(), key=itemgetter('AccountNumber'))}
+
+            for account in accounts:
+                number = account['AccountNumber']
+                transactions = activity.get(number, [])
+                statement = build_statement(account, transactions, net_after.get(number, Decimal('0.00')),
+                                            start, end, debit_set)
+                summary['accounts'] += 1
+                if statement is None:
+                    continue
+                if number // statement_config['accounts_per_file'] != block:
+                    if pending:
+                        write_statement_file(os.path.join(scratch, _statement_file(next(iter(pending)))), pending)
+                        summary['files'] += 1
+                    block, pending = number // statement_config['accounts_per_file'], {}
+                pending[str(number)] = statement
+                summary['statements'] += 1
+                summary['transactions'] += len(transactions)
+
+            if progress and max_account:
+                progress(last_account / max_account)
+
+        if pending:
+            write_statement_file(os.path.join(scratch, _statement_file(next(iter(pending)))), pending)
+            summary['files'] += 1
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        shutil.rmtree(scratch, ignore_errors=True)
+        raise
+    finally:
+        cursor.close()
+        release_db_connection(conn)
+
+    # Swap the finished run into place; readers see the old or the new archive, never a mix
+    os.makedirs(scratch, exist_ok=True)
+    retired = f'{archive}.old'
+    shutil.rmtree(retired, ignore_errors=True)
+    if os.path.isdir(archive):
+        os.replace(archive, retired)
+    os.replace(scratch, archive)
+    shutil.rmtree(retired, ignore_errors=True)
+
+    summary['seconds'] = round(time.perf_counter() - started, 3)
+    return summary
+
+def get_statement(account_number, period):
+    """Returns an archived statement with money fields as Decimal, or None if there is none."""
+    path = statement_path(period, account_number)
+    try:
+        key = (path, os.path.getmtime(path))
+    except OSError:
+        return None
+    statements = statement_cache.get(key)
+    if statements is None:
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            statements = json.load(f)
+        statement_cache.set(key, statements)
+    statement = statements.get(str(account_number))
+    if statement is None:
+        return None
+    statement = dict(statement)
+    for field in STATEMENT_MONEY_FIELDS:
+        statement[field] = Decimal(statement[field])
+    statement['Transactions'] = [
+        dict(line, Amount=Decimal(line['Amount']), TransactionCharge=Decimal(line['TransactionCharge']),
+             Balance=Decimal(line['Balance']))
+        for line in statement['Transactions']
+    ]
+    return statement
+
+def list_statement_periods(account_number):
+    """Returns the archived periods that may hold a statement for the account, newest first."""
+    try:
+        periods = [name for name in os.listdir(statement_config['archive_dir']) if re.fullmatch(r'\d{4}-\d{2}', name)]
+    except OSError:
+        return []
+    return [period for period in sorted(periods, reverse=True) if os.path.exists(statement_path(period, account_number))]
+
+@job_handler('monthly_statements', concurrency=1, max_attempts=3, backoff=300)
+def monthly_statements_job(payload, progress):
+    """Generates statements for payload['period'] (YYYY-MM, default: last month)."""
+    period_start = parse_period(payload.get('period', '')) or previous_period()
+    return generate_statements(period_start, payload.get('chunk_size'), progress)
+
+# -----------------------------
+# Credentials
+# -----------------------------
+
+credential_config = {
+    'method': 'scrypt',       # Any werkzeug method, e.g. 'scrypt:32768:8:1' or 'pbkdf2:sha256:600000'
+    'verify_workers': 4,      # Threads that run password hashing and verification
+    'max_pending': 64,        # Logins allowed to wait for a verification thread before new ones are turned away
+    'verify_timeout': 10,     # Seconds a login waits for its verification
+    'cache_ttl': 60,          # Seconds a verification result is reused
+    'cache_size': 10000
+}
+
+# The KDFs release the GIL, so the pool really runs in parallel while request threads wait.
+credential_pool = ThreadPoolExecutor(max_workers=credential_config['verify_workers'], thread_name_prefix='credentials')
+credential_slots = threading.BoundedSemaphore(credential_config['max_pending'])
+
+# Keyed by an HMAC of (stored hash, password) under a per-process secret, so no password is kept
+# and a changed hash never matches an old entry.
+verification_cache = LRUCache(maxsize=credential_config['cache_size'], ttl=credential_config['cache_ttl'])
+_verification_secret = secrets.token_bytes(32)
+
+class CredentialsBusy(Exception):
+    """Raised when too many logins are already waiting for verification."""
+
+def hash_password(password):
+    """Hashes a password with the configured method."""
+    return generate_password_hash(password, method=credential_config['method'])
+
+def hash_passwords(passwords):
+    """Hashes many passwords in parallel on the credential pool, preserving order."""
+    return list(credential_pool.map(hash_password, passwords))
+
+def is_password_hash(stored):
+    return stored.count('$') == 2 and stored.startswith(('scrypt:', 'pbkdf2:'))
+
+_method_prefixes = {}
+
+def needs_rehash(stored):
+    """True if stored is plaintext or was hashed with other parameters than the configured method."""
+    method = credential_config['method']
+    if method not in _method_prefixes:
+        # werkzeug expands defaults into the stored prefix (e.g. 'scrypt' -> 'scrypt:32768:8:1')
+        _method_prefixes[method] = hash_password('').split('$', 1)[0]
+    return not is_password_hash(stored) or stored.split('$', 1)[0] != _method_prefixes[method]
+
+def _check_password(stored, password):
+    if is_password_hash(stored):
+        return check_password_hash(stored, password)
+    return hmac.compare_digest(stored.encode(), password.encode())
+
+_dummy_hash = None
+
+def verify_password(stored, password):
+    """Checks password against a stored hash (or legacy plaintext) on the credential pool.
+
+    Results are cached for credential_config['cache_ttl'] seconds. With
+    stored=None a dummy hash is checked so unknown usernames take as long as
+    known ones. Raises CredentialsBusy when the pool is saturated.
+    """
+    global _dummy_hash
+    if stored is None:
+        _dummy_hash = _dummy_hash or hash_password(secrets.token_hex(16))
+        stored = _dummy_hash
+    key = hmac.new(_verification_secret, f'{stored}\0{password}'.encode(), hashlib.sha256).digest()
+    cached = verification_cache.get(key)
+    if cached is not None:
+        return cached
+    if not credential_slots.acquire(blocking=False):
+        raise CredentialsBusy('Too many sign-ins in progress, please try again shortly.')
+    try:
+        result = credential_pool.submit(_check_password, stored, password).result(credential_config['verify_timeout'])
+    except FuturesTimeout:
+        raise CredentialsBusy('Sign-in is taking too long, please try again shortly.')
+    finally:
+        credential_slots.release()
+    verification_cache.set(key, result)
+    return result
+
+def authenticate(username, password, usertype):
+    """Returns the Users row for valid credentials, or None.
+
+    Legacy plaintext passwords and hashes made with other parameters are
+    rehashed with the configured method once the password checks out.
+    """
+    query = """
+        SELECT UserID, Username, UserType, CustomerSSN, EmployeeSSN, Password
+        FROM Users
+        WHERE Username = %s AND UserType = %s
+    """
+    user = query_db(query, (username, usertype), fetchone=True)
+    valid = verify_password(user['Password'] if user else None, password)
+    if not user or not valid:
+        return None
+    stored = user.pop('Password')
+    if needs_rehash(stored):
+        # Conditional on the old value, so a concurrent password change is never overwritten
+        query_db("UPDATE Users SET Password = %s WHERE UserID = %s AND Password = %s",
+                 (credential_pool.submit(hash_password, password).result(), user['UserID'], stored), commit=True)
+    return user
+
+# -----------------------------
+# Sessions
+# -----------------------------
+
+session_config = {
+    # 'sqlite' (shared by every worker on the host) or 'memory' (per process; a single worker only,
+    # since a login held by one worker is unknown to the others)
+    'backend': 'sqlite',
+    'sqlite_path': os.path.join(app.instance_path, 'sessions.db'),
+    'idle_timeout': 1800,         # Seconds without a request before a session expires
+    'max_lifetime': 12 * 3600,    # Seconds after login before a session expires regardless of use
+    'refresh_after': 60,          # Seconds between writes that only extend an idle session
+    'purge_interval': 300,        # Seconds between sweeps of expired sessions
+    'max_sessions': 100000        # Memory backend only; the least recently used sessions are dropped first
+}
+
+# The identity fields each stored session is indexed by, so all of a user's sessions can be revoked at once
+SESSION_IDENTITY_KEYS = ('user_id', 'customer_ssn', 'employee_ssn')
+
+class MemorySessionStore:
+    """Keeps sessions in process memory, least recently used first out."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()  # sid -> (payload, created, expires_at, identity)
+        self._lock = threading.Lock()
+
+    def load(self, sid):
+        """Returns (payload, created, expires_at) for a live session, or None."""
+        with self._lock:
+            entry = self._data.get(sid)
+            if entry is None:
+                return None
+            if entry[2] <= time.time():
+                del self._data[sid]
+                return None
+            self._data.move_to_end(sid)
+            return entry[:3]
+
+    def save(self, sid, payload, created, expires_at, identity):
+        with self._lock:
+            self._data[sid] = (payload, created, expires_at, identity)
+            self._data.move_to_end(sid)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, sid):
+        with self._lock:
+            self._data.pop(sid, None)
+
+    def revoke(self, key, value):
+        """Deletes every session whose identity has key == value. Returns how many were deleted."""
+        with self._lock:
+            stale = [sid for sid, entry in self._data.items() if entry[3].get(key) == value]
+            for sid in stale:
+                del self._data[sid]
+        return len(stale)
+
+    def purge(self):
+        now = time.time()
+        with self._lock:
+            stale = [sid for sid, entry in self._data.items() if entry[2] <= now]
+            for sid in stale:
+                del self._data[sid]
+        return len(stale)
+
+    def __len__(self):
+        return len(self._data)
+
+class SQLiteSessionStore:
+    """Keeps sessions in a SQLite file, so every worker on the host shares them and they survive restarts."""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        conn = self._connect()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS sessions (
+                sid TEXT PRIMARY KEY,
+                payload TEXT NOT NULL,
+                created REAL NOT NULL,
+                expires_at REAL NOT NULL,
+                user_id INTEGER,
+                customer_ssn INTEGER,
+                employee_ssn INTEGER
+            )
+        """)
+        for column in SESSION_IDENTITY_KEYS + ('expires_at',):
+            conn.execute(f"CREATE INDEX IF NOT EXISTS idx_sessions_{column} ON sessions ({column})")
+
+    def _connect(self):
+        # sqlite3 connections may not be shared between threads, so each thread opens its own
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def load(self, sid):
+        return self._connect().execute(
+            "SELECT payload, created, expires_at FROM sessions WHERE sid = ? AND expires_at > ?",
+            (sid, time.time())).fetchone()
+
+    def save(self, sid, payload, created, expires_at, identity):
+        self._connect().execute(
+            "INSERT OR REPLACE INTO sessions (sid, payload, created, expires_at, user_id, customer_ssn, employee_ssn) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (sid, payload, created, expires_at) + tuple(identity.get(key) for key in SESSION_IDENTITY_KEYS))
+
+    def delete(self, sid):
+        self._connect().execute("DELETE FROM sessions WHERE sid = ?", (sid,))
+
+    def revoke(self, key, value):
+        if key not in SESSION_IDENTITY_KEYS:
+            raise ValueError(f'Sessions are not indexed by {key}')
+        return self._connect().execute(f"DELETE FROM sessions WHERE {key} = ?", (value,)).rowcount
+
+    def purge(self):
+        return self._connect().execute("DELETE FROM sessions WHERE expires_at <= ?", (time.time(),)).rowcount
+
+    def __len__(self):
+        return self._connect().execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+class ServerSession(SecureCookieSession):
+    """A session whose data stays on the server; the cookie only carries its random id."""
+
+    def __init__(self, initial=None, sid=None, created=None, expires_at=None):
+        super().__init__(initial)
+        self.sid = sid
+        self.created = created
+        self.expires_at = expires_at
+        self.regenerated = False
+
+    def regenerate(self):
+        """Moves the session to a new id, e.g. on login so a planted id is never authenticated."""
+        self.regenerated = True
+        self.modified = True
+
+class ServerSessionInterface(SessionInterface):
+    """Loads and saves sessions through a session store, keyed by an unguessable id in the cookie."""
+
+    serializer = session_json_serializer
+
+    def __init__(self, store):
+        self.store = store
+        self._last_purge = time.time()
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if sid:
+            entry = self.store.load(sid)
+            if entry is not None:
+                payload, created, expires_at = entry
+                return ServerSession(self.serializer.loads(payload), sid=sid, created=created, expires_at=expires_at)
+        return ServerSession()
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        if session.accessed:
+            response.vary.add('Cookie')
+
+        # An emptied session (e.g. logout) is deleted from the store along with its cookie
+        if not session:
+            if session.sid is not None:
+                self.store.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path, secure=self.get_cookie_secure(app),
+                                       samesite=self.get_cookie_samesite(app), httponly=self.get_cookie_httponly(app))
+            return
+
+        now = time.time()
+        if session.sid is None or session.regenerated:
+            if session.sid is not None:
+                self.store.delete(session.sid)
+            session.sid = secrets.token_urlsafe(32)
+            session.created = now
+        expires_at = min(now + session_config['idle_timeout'], session.created + session_config['max_lifetime'])
+
+        # Untouched sessions are only rewritten now and then to push their idle expiry forward
+        stale = session.expires_at is None or expires_at - session.expires_at >= session_config['refresh_after']
+        if not (session.modified or stale):
+            return
+        identity = {key: session.get(key) for key in SESSION_IDENTITY_KEYS}
+        self.store.save(session.sid, self.serializer.dumps(dict(session)), session.created, expires_at, identity)
+        response.set_cookie(name, session.sid, expires=self.get_expiration_time(app, session),
+                            httponly=self.get_cookie_httponly(app), domain=domain, path=path,
+                            secure=self.get_cookie_secure(app), samesite=self.get_cookie_samesite(app))
+
+        if now - self._last_purge >= session_config['purge_interval']:
+            self._last_purge = now
+            self.store.purge()
+
+def create_session_store():
+    if session_config['backend'] == 'sqlite':
+        return SQLiteSessionStore(session_config['sqlite_path'])
+    if app.config['WORKERS'] > 1:
+        raise RuntimeError("The memory session backend cannot be shared by "
+                           f"{app.config['WORKERS']} workers; use the sqlite backend.")
+    return MemorySessionStore(session_config['max_sessions'])
+
+session_store = create_session_store()
+app.session_interface = ServerSessionInterface(session_store)
+
+def start_session(user):
+    """Stores the resolved identity in a fresh session, so requests authorize without touching Users."""
+    session.clear()
+    session.regenerate()
+    session['user_id'] = user['UserID']
+    session['username'] = user['Username']
+    session['usertype'] = user['UserType']
+    session['customer_ssn'] = user['CustomerSSN']
+    session['employee_ssn'] = user['EmployeeSSN']
+
+def revoke_sessions(customer_ssn=None, employee_ssn=None):
+    """Logs a customer or employee out everywhere once the current request commits."""
+    def revoke():
+        if customer_ssn is not None:
+            session_store.revoke('customer_ssn', customer_ssn)
+        if employee_ssn is not None:
+            session_store.revoke('employee_ssn', employee_ssn)
+    on_commit(revoke)
+
 # -----------------------------
-# Helper Functions
+# JSON API
 # -----------------------------
 
-def get_db_connection():
-    """Establishes a new database connection."""
-    return mysql.connector.connect(**db_config)
+api_config = {
+    'page_size': 100,        # Rows per page when page_size is not given
+    'max_page_size': 1000,
+    'max_ids': 1000          # Ids accepted by one batch lookup
+}
 
-def query_db(query, params=(), fetchone=False, commit=False):
-    """Executes a database query and returns the result."""
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
+# The key column is always selected, so every row can be addressed and paged past
+ApiResource = namedtuple('ApiResource', ['table', 'key', 'columns'])
+
+API_RESOURCES = {
+    'branches': ApiResource('Branch', 'BranchID', ['BranchID', 'Name', 'Address', 'City', 'Assets']),
+    'employees': ApiResource('Employee', 'SSN', [
+        'SSN', 'FirstName', 'MiddleName', 'LastName', 'PhoneNo', 'StartDate', 'BranchID', 'ManagerID'
+    ]),
+    'customers': ApiResource('Customer', 'SSN', [
+        'SSN', 'FirstName', 'MiddleName', 'LastName', 'StreetNumber', 'StreetName', 'ApartmentNumber',
+        'City', 'State', 'ZipCode', 'PersonalBankerID'
+    ]),
+    'accounts': ApiResource('Account', 'AccountNumber', [
+        'AccountNumber', 'AccountType', 'Balance', 'LastAccessDate', 'InterestRate', 'OverdraftFlag'
+    ]),
+    'loans': ApiResource('Loan', 'LoanNumber', ['LoanNumber', 'Amount', 'MonthlyRepayment', 'BranchID']),
+    'transactions': ApiResource('Transaction', 'TransactionID', [
+        'TransactionID', 'TransactionType', 'TDate', 'TTime', 'Amount', 'AccountNumber', 'TransactionCharge'
+    ])
+}
+
+class ApiError(Exception):
+    """Raised for a bad API request; carries the HTTP status to answer with."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+def api_response(body, status=200):
+    """Serializes like the exports and job results: dates, times and decimals become strings."""
+    return Response(json.dumps(body, default=str), status=status, mimetype='application/json')
+
+def parse_api_fields(resource):
+    """Returns the columns named by the fields parameter (all columns if absent), key first."""
+    value = request.args.get('fields', '').strip()
+    if not value:
+        return resource.columns
+    fields = [field.strip() for field in value.split(',') if field.strip()]
+    unknown = [field for field in fields if field not in resource.columns]
+    if unknown:
+        raise ApiError(f"Unknown field(s): {', '.join(unknown)}.")
+    return [resource.key] + [field for field in dict.fromkeys(fields) if field != resource.key]
+
+def parse_api_ids(value):
+    """Parses a comma-separated ids parameter into distinct integers, in the order given."""
     try:
-        cursor.execute(query, params)
-        if commit:
-            conn.commit()
-            return None
-        if fetchone:
-            result = cursor.fetchone()
-        else:
-            result = cursor.fetchall()
-        return result
-    except mysql.connector.Error as err:
-        print(f"Error: {err}")
-        flash(f"Database error: {err}", 'danger')
-        return None
-    finally:
-        cursor.close()
-        conn.close()
+        ids = list(dict.fromkeys(int(part) for part in value.split(',') if part.strip()))
+    except ValueError:
+        raise ApiError('ids must be comma-separated integers.')
+    if not ids:
+        raise ApiError('ids must not be empty.')
+    if len(ids) > api_config['max_ids']:
+        raise ApiError(f"At most {api_config['max_ids']} ids per request.")
+    return ids
+
+def select_api_rows(resource, columns, where='', params=(), suffix=''):
+    """Selects only the projected columns; column names come from API_RESOURCES, never from the request."""
+    query = f"SELECT {', '.join(f'`{column}`' for column in columns)} FROM `{resource.table}`"
+    if where:
+        query += f" WHERE {where}"
+    rows = query_db(query + suffix, params)
+    if rows is None:
+        raise ApiError('Database error.', 503)
+    return rows
 
 # -----------------------------
 # Access Control Decorators
@@ -72,6 +3454,20 @@ def employee_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+def api_required(f):
+    """Like employee_required, but answers with a JSON error instead of redirecting."""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if 'username' not in session:
+            return api_response({'error': 'Authentication required.'}, 401)
+        if session.get('usertype') != 'Employee':
+            return api_response({'error': 'Employees only.'}, 403)
+        try:
+            return f(*args, **kwargs)
+        except ApiError as err:
+            return api_response({'error': str(err)}, err.status)
+    return decorated_function
+
 def customer_required(f):
     @wraps(f)
     @login_required
@@ -82,6 +3478,38 @@ def customer_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+# -----------------------------
+# Routes for Diagnostics
+# -----------------------------
+
+@app.route('/employee/db/pool')
+@employee_required
+def pool_stats():
+    return jsonify(dict(db_pool.stats(), replicas=replica_set.stats()))
+
+@app.route('/employee/db/slow-queries')
+@employee_required
+def slow_queries():
+    return jsonify(metrics.snapshot_slow_log())
+
+@app.route('/employee/screening')
+@employee_required
+def screening_status():
+    return jsonify(velocity_screen.snapshot())
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Prometheus scrape endpoint for request latency, query and pool metrics."""
+    token = metrics_config['token']
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        return Response('Unauthorized\n', status=401, mimetype='text/plain')
+    pool = db_pool.stats()
+    counters = {f'bank_db_pool_{name}_total': pool.pop(name) for name in ('created', 'recycled', 'timeouts')}
+    gauges = {f'bank_db_pool_{name}': value for name, value in pool.items()}
+    counters.update({f'bank_velocity_{name}_total': value for name, value in velocity_screen.stats.items()})
+    gauges['bank_velocity_keys'] = len(velocity_screen.counters)
+    return Response(metrics.render(gauges, counters), mimetype='text/plain; version=0.0.4')
+
 # -----------------------------
 # Routes for Authentication
 # -----------------------------
@@ -93,17 +3521,14 @@ def login():
         password = request.form['password']
         usertype = request.form['usertype']
 
-        query = """
-            SELECT UserID, Username, UserType 
-            FROM Users 
-            WHERE Username = %s AND Password = %s AND UserType = %s
-        """
-        user = query_db(query, (username, password, usertype), fetchone=True)
+        try:
+            user = authenticate(username, password, usertype)
+        except CredentialsBusy as err:
+            flash(str(err), 'warning')
+            return render_template('login.html'), 503
 
         if user:
-            session['user_id'] = user['UserID']
-            session['username'] = user['Username']
-            session['usertype'] = user['UserType']
+            start_session(user)
             flash('Login successful!', 'success')
             return redirect(url_for('home'))
         else:
@@ -123,6 +3548,7 @@ def home():
 @app.route('/logout')
 def logout():
     session.clear()
+    session.regenerate()
     flash('You have been logged out.', 'info')
     return redirect(url_for('login'))
 
@@ -133,16 +3559,33 @@ def logout():
 @app.route('/employee/dashboard')
 @employee_required
 def employee_dashboard():
-    return render_template('employee_dashboard.html', username=session['username'])
+    branches = get_branch_summary()
+    return render_template('employee_dashboard.html', username=session['username'], branches=branches,
+                           days=aggregate_config['dashboard_days'])
+
+@app.route('/employee/dashboard/summary')
+@employee_required
+def dashboard_summary():
+    """Branch totals and daily volume as JSON, read from the maintained aggregates."""
+    days = request.args.get('days', type=int) or aggregate_config['dashboard_days']
+    days = max(1, min(days, aggregate_config['reconcile_days']))
+    return jsonify({'days': days, 'branches': get_branch_summary(days)})
 
 # ----- Manage Branches -----
 
+BRANCH_EXPORT_COLUMNS = ['BranchID', 'Name', 'Address', 'City', 'Assets']
+
 @app.route('/employee/branches')
 @employee_required
 def manage_branches():
-    query = "SELECT * FROM Branch"
-    branches = query_db(query)
-    return render_template('manage_branches.html', branches=branches)
+    query = "SELECT BranchID, Name, Address, City, Assets FROM Branch"
+
+    export_format = get_export_format()
+    if export_format:
+        query += " ORDER BY BranchID ASC"
+        return export_response(export_format, stream_db(query), BRANCH_EXPORT_COLUMNS, 'branches')
+
+    return render_page('manage_branches.html', ('branches',), lambda: {'branches': query_db(query)})
 
 @app.route('/employee/branches/add', methods=['GET', 'POST'])
 @employee_required
@@ -159,6 +3602,7 @@ def add_branch():
             VALUES (%s, %s, %s, %s, %s)
         """
         result = query_db(query, (branch_id, name, address, city, assets), commit=True)
+        invalidate_reference_data('branches')
         if result is None:
             flash('Branch added successfully!', 'success')
             return redirect(url_for('manage_branches'))
@@ -182,6 +3626,7 @@ def edit_branch(branch_id):
             WHERE BranchID = %s
         """
         result = query_db(query, (name, address, city, assets, branch_id), commit=True)
+        invalidate_reference_data('branches')
         if result is None:
             flash('Branch updated successfully!', 'success')
             return redirect(url_for('manage_branches'))
@@ -189,7 +3634,7 @@ def edit_branch(branch_id):
             flash('Error updating branch.', 'danger')
 
     # GET request
-    query = "SELECT * FROM Branch WHERE BranchID = %s"
+    query = "SELECT BranchID, Name, Address, City, Assets FROM Branch WHERE BranchID = %s"
     branch = query_db(query, (branch_id,), fetchone=True)
     if not branch:
         flash('Branch not found.', 'danger')
@@ -201,6 +3646,7 @@ def edit_branch(branch_id):
 def delete_branch(branch_id):
     query = "DELETE FROM Branch WHERE BranchID = %s"
     result = query_db(query, (branch_id,), commit=True)
+    invalidate_reference_data('branches')
     if result is None:
         flash('Branch deleted successfully!', 'success')
     else:
@@ -209,21 +3655,21 @@ def delete_branch(branch_id):
 
 # ----- Manage Employees with Search -----
 
+EMPLOYEE_EXPORT_COLUMNS = [
+    'SSN', 'FirstName', 'MiddleName', 'LastName', 'PhoneNo', 'StartDate',
+    'BranchName', 'ManagerFirstName', 'ManagerLastName'
+]
+
 @app.route('/employee/employees', methods=['GET', 'POST'])
 @employee_required
 def manage_employees():
     search_query = ""
-    filters = []
     params = []
 
     if request.method == 'GET':
         search_query = request.args.get('search', '').strip()
-        if search_query:
-            filters.append("(Employee.FirstName LIKE %s OR Employee.LastName LIKE %s OR Branch.Name LIKE %s)")
-            like_query = f"%{search_query}%"
-            params.extend([like_query, like_query, like_query])
 
-    base_query = """
+    columns = """
         SELECT 
             Employee.SSN, 
             Employee.FirstName, 
@@ -234,18 +3680,32 @@ def manage_employees():
             Branch.Name AS BranchName, 
             Manager.FirstName AS ManagerFirstName,
             Manager.LastName AS ManagerLastName
-        FROM Employee
+    """
+    joins = """
         LEFT JOIN Branch ON Employee.BranchID = Branch.BranchID
         LEFT JOIN Employee AS Manager ON Employee.ManagerID = Manager.SSN
     """
 
-    if filters:
-        base_query += " WHERE " + " AND ".join(filters)
+    if search_query:
+        matches, params = build_search(search_query, SEARCH_SOURCES['employees'])
+        base_query = columns + f" FROM ({matches}) AS Matches JOIN Employee ON Employee.SSN = Matches.MatchKey" + joins
+        base_query += " ORDER BY Matches.Score DESC, Employee.FirstName ASC, Employee.LastName ASC"
+    else:
+        base_query = columns + " FROM Employee" + joins
+        base_query += " ORDER BY Employee.FirstName ASC, Employee.LastName ASC"
 
-    base_query += " ORDER BY Employee.FirstName ASC, Employee.LastName ASC"
+    export_format = get_export_format()
+    if export_format:
+        return export_response(export_format, stream_db(base_query, tuple(params)), EMPLOYEE_EXPORT_COLUMNS, 'employees')
 
-    employees = query_db(base_query, tuple(params))
-    return render_template('manage_employees.html', employees=employees, search_query=search_query)
+    page, page_size = get_search_page()
+    base_query += " LIMIT %s OFFSET %s"
+    params.extend([page_size + 1, (page - 1) * page_size])
+
+    employees = query_db(base_query, tuple(params)) or []
+    has_next = len(employees) > page_size
+    return render_template('manage_employees.html', employees=employees[:page_size], search_query=search_query,
+                           page=page, page_size=page_size, has_next=has_next)
 
 @app.route('/employee/employees/add', methods=['GET', 'POST'])
 @employee_required
@@ -268,6 +3728,7 @@ def add_employee():
             VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
         """
         employee_result = query_db(employee_query, (ssn, first_name, middle_name, last_name, phone_no, start_date, branch_id, manager_id if manager_id else None), commit=True)
+        invalidate_reference_data('employees')
         if employee_result is not None:
             flash('Error adding employee.', 'danger')
             return redirect(url_for('manage_employees'))
@@ -277,7 +3738,7 @@ def add_employee():
             INSERT INTO Users (Username, Password, UserType, EmployeeSSN)
             VALUES (%s, %s, 'Employee', %s)
         """
-        user_result = query_db(user_query, (username, password, ssn), commit=True)
+        user_result = query_db(user_query, (username, hash_password(password), ssn), commit=True)
         if user_result is None:
             flash('Employee added successfully!', 'success')
             return redirect(url_for('manage_employees'))
@@ -286,9 +3747,9 @@ def add_employee():
 
     # GET request
     # Fetch all branches for selection
-    branches = query_db("SELECT BranchID, Name FROM Branch")
+    branches = get_branch_choices()
     # Fetch all employees to select as managers
-    managers = query_db("SELECT SSN, FirstName, LastName FROM Employee")
+    managers = get_employee_choices()
     return render_template('add_employee.html', branches=branches, managers=managers)
 
 @app.route('/employee/employees/edit/<int:ssn>', methods=['GET', 'POST'])
@@ -310,19 +3771,23 @@ def edit_employee(ssn):
             WHERE SSN = %s
         """
         employee_result = query_db(employee_query, (first_name, middle_name, last_name, phone_no, start_date, branch_id, manager_id if manager_id else None, ssn), commit=True)
+        invalidate_reference_data('employees')
         if employee_result is not None:
             flash('Error updating employee.', 'danger')
             return redirect(url_for('manage_employees'))
 
-        # Optionally update username and password
+        # Update the username, and the password only if a new one was entered
         username = request.form['username']
-        password = request.form['password']
-        user_query = """
-            UPDATE Users
-            SET Username = %s, Password = %s
-            WHERE EmployeeSSN = %s
-        """
-        user_result = query_db(user_query, (username, password, ssn), commit=True)
+        password = request.form.get('password', '')
+        if password:
+            user_query = "UPDATE Users SET Username = %s, Password = %s WHERE EmployeeSSN = %s"
+            user_params = (username, hash_password(password), ssn)
+        else:
+            user_query = "UPDATE Users SET Username = %s WHERE EmployeeSSN = %s"
+            user_params = (username, ssn)
+        user_result = query_db(user_query, user_params, commit=True)
+        if password:
+            revoke_sessions(employee_ssn=ssn)
         if user_result is None:
             flash('Employee updated successfully!', 'success')
             return redirect(url_for('manage_employees'))
@@ -330,18 +3795,21 @@ def edit_employee(ssn):
             flash('Error updating user for employee.', 'danger')
 
     # GET request
-    query = "SELECT * FROM Employee WHERE SSN = %s"
+    query = """
+        SELECT SSN, FirstName, MiddleName, LastName, PhoneNo, StartDate, BranchID, ManagerID
+        FROM Employee WHERE SSN = %s
+    """
     employee = query_db(query, (ssn,), fetchone=True)
     if not employee:
         flash('Employee not found.', 'danger')
         return redirect(url_for('manage_employees'))
 
     # Fetch all branches for selection
-    branches = query_db("SELECT BranchID, Name FROM Branch")
+    branches = get_branch_choices()
     # Fetch all employees to select as managers
-    managers = query_db("SELECT SSN, FirstName, LastName FROM Employee WHERE SSN != %s", (ssn,))
+    managers = [manager for manager in get_employee_choices() or [] if manager['SSN'] != ssn]
     # Fetch user details
-    user_query = "SELECT Username, Password FROM Users WHERE EmployeeSSN = %s"
+    user_query = "SELECT Username FROM Users WHERE EmployeeSSN = %s"
     user = query_db(user_query, (ssn,), fetchone=True)
     return render_template('edit_employee.html', employee=employee, branches=branches, managers=managers, user=user)
 
@@ -358,6 +3826,8 @@ def delete_employee(ssn):
     # Then, delete the employee
     employee_query = "DELETE FROM Employee WHERE SSN = %s"
     employee_result = query_db(employee_query, (ssn,), commit=True)
+    invalidate_reference_data('employees')
+    revoke_sessions(employee_ssn=ssn)
     if employee_result is None:
         flash('Employee deleted successfully!', 'success')
     else:
@@ -366,21 +3836,21 @@ def delete_employee(ssn):
 
 # ----- Manage Customers with Search -----
 
+CUSTOMER_EXPORT_COLUMNS = [
+    'SSN', 'FirstName', 'MiddleName', 'LastName', 'StreetNumber', 'StreetName', 'ApartmentNumber',
+    'City', 'State', 'ZipCode', 'BranchName', 'BankerFirstName', 'BankerLastName'
+]
+
 @app.route('/employee/customers', methods=['GET', 'POST'])
 @employee_required
 def manage_customers():
     search_query = ""
-    filters = []
     params = []
 
     if request.method == 'GET':
         search_query = request.args.get('search', '').strip()
-        if search_query:
-            filters.append("(Customer.FirstName LIKE %s OR Customer.LastName LIKE %s OR Customer.SSN LIKE %s)")
-            like_query = f"%{search_query}%"
-            params.extend([like_query, like_query, like_query])
 
-    base_query = """
+    columns = """
         SELECT 
             Customer.SSN, 
             Customer.FirstName, 
@@ -395,18 +3865,32 @@ def manage_customers():
             Branch.Name AS BranchName,
             Banker.FirstName AS BankerFirstName,
             Banker.LastName AS BankerLastName
-        FROM Customer
+    """
+    joins = """
         LEFT JOIN Employee AS Banker ON Customer.PersonalBankerID = Banker.SSN
         LEFT JOIN Branch ON Banker.BranchID = Branch.BranchID
     """
 
-    if filters:
-        base_query += " WHERE " + " AND ".join(filters)
+    if search_query:
+        matches, params = build_search(search_query, SEARCH_SOURCES['customers'])
+        base_query = columns + f" FROM ({matches}) AS Matches JOIN Customer ON Customer.SSN = Matches.MatchKey" + joins
+        base_query += " ORDER BY Matches.Score DESC, Customer.FirstName ASC, Customer.LastName ASC"
+    else:
+        base_query = columns + " FROM Customer" + joins
+        base_query += " ORDER BY Customer.FirstName ASC, Customer.LastName ASC"
 
-    base_query += " ORDER BY Customer.FirstName ASC, Customer.LastName ASC"
+    export_format = get_export_format()
+    if export_format:
+        return export_response(export_format, stream_db(base_query, tuple(params)), CUSTOMER_EXPORT_COLUMNS, 'customers')
 
-    customers = query_db(base_query, tuple(params))
-    return render_template('manage_customers.html', customers=customers, search_query=search_query)
+    page, page_size = get_search_page()
+    base_query += " LIMIT %s OFFSET %s"
+    params.extend([page_size + 1, (page - 1) * page_size])
+
+    customers = query_db(base_query, tuple(params)) or []
+    has_next = len(customers) > page_size
+    return render_template('manage_customers.html', customers=customers[:page_size], search_query=search_query,
+                           page=page, page_size=page_size, has_next=has_next)
 
 @app.route('/employee/customers/add', methods=['GET', 'POST'])
 @employee_required
@@ -445,7 +3929,7 @@ def add_customer():
             INSERT INTO Users (Username, Password, UserType, CustomerSSN)
             VALUES (%s, %s, 'Customer', %s)
         """
-        user_result = query_db(user_query, (username, password, ssn), commit=True)
+        user_result = query_db(user_query, (username, hash_password(password), ssn), commit=True)
         if user_result is None:
             flash('Customer added successfully!', 'success')
             return redirect(url_for('manage_customers'))
@@ -454,7 +3938,7 @@ def add_customer():
 
     # GET request
     # Fetch all employees to select as personal bankers
-    personal_bankers = query_db("SELECT SSN, FirstName, LastName FROM Employee")
+    personal_bankers = get_employee_choices()
     return render_template('add_customer.html', personal_bankers=personal_bankers)
 
 @app.route('/employee/customers/edit/<int:ssn>', methods=['GET', 'POST'])
@@ -486,16 +3970,20 @@ def edit_customer(ssn):
         if customer_result is not None:
             flash('Error updating customer.', 'danger')
             return redirect(url_for('manage_customers'))
+        touch_pages(customer_version(ssn))
 
-        # Optionally update username and password
+        # Update the username, and the password only if a new one was entered
         username = request.form['username']
-        password = request.form['password']
-        user_query = """
-            UPDATE Users
-            SET Username = %s, Password = %s
-            WHERE CustomerSSN = %s
-        """
-        user_result = query_db(user_query, (username, password, ssn), commit=True)
+        password = request.form.get('password', '')
+        if password:
+            user_query = "UPDATE Users SET Username = %s, Password = %s WHERE CustomerSSN = %s"
+            user_params = (username, hash_password(password), ssn)
+        else:
+            user_query = "UPDATE Users SET Username = %s WHERE CustomerSSN = %s"
+            user_params = (username, ssn)
+        user_result = query_db(user_query, user_params, commit=True)
+        if password:
+            revoke_sessions(customer_ssn=ssn)
         if user_result is None:
             flash('Customer updated successfully!', 'success')
             return redirect(url_for('manage_customers'))
@@ -503,16 +3991,20 @@ def edit_customer(ssn):
             flash('Error updating user for customer.', 'danger')
 
     # GET request
-    query = "SELECT * FROM Customer WHERE SSN = %s"
+    query = """
+        SELECT SSN, FirstName, MiddleName, LastName, StreetNumber, StreetName, ApartmentNumber,
+               City, State, ZipCode, PersonalBankerID
+        FROM Customer WHERE SSN = %s
+    """
     customer = query_db(query, (ssn,), fetchone=True)
     if not customer:
         flash('Customer not found.', 'danger')
         return redirect(url_for('manage_customers'))
 
     # Fetch all employees for personal banker selection
-    personal_bankers = query_db("SELECT SSN, FirstName, LastName FROM Employee")
+    personal_bankers = get_employee_choices()
     # Fetch user details
-    user_query = "SELECT Username, Password FROM Users WHERE CustomerSSN = %s"
+    user_query = "SELECT Username FROM Users WHERE CustomerSSN = %s"
     user = query_db(user_query, (ssn,), fetchone=True)
     return render_template('edit_customer.html', customer=customer, personal_bankers=personal_bankers, user=user)
 
@@ -529,6 +4021,7 @@ def delete_customer(ssn):
     # Then, delete the customer
     customer_query = "DELETE FROM Customer WHERE SSN = %s"
     customer_result = query_db(customer_query, (ssn,), commit=True)
+    revoke_sessions(customer_ssn=ssn)
     if customer_result is None:
         flash('Customer deleted successfully!', 'success')
     else:
@@ -537,6 +4030,11 @@ def delete_customer(ssn):
 
 # ----- Manage Accounts -----
 
+ACCOUNT_EXPORT_COLUMNS = [
+    'AccountNumber', 'AccountType', 'Balance', 'LastAccessDate', 'InterestRate', 'OverdraftFlag',
+    'CustomerFirstName', 'CustomerLastName'
+]
+
 @app.route('/employee/accounts', methods=['GET', 'POST'])
 @employee_required
 def manage_accounts():
@@ -572,6 +4070,10 @@ def manage_accounts():
 
     base_query += " ORDER BY Account.AccountNumber ASC"
 
+    export_format = get_export_format()
+    if export_format:
+        return export_response(export_format, stream_db(base_query, tuple(params)), ACCOUNT_EXPORT_COLUMNS, 'accounts')
+
     accounts = query_db(base_query, tuple(params))
     return render_template('manage_accounts.html', accounts=accounts, search_query=search_query)
 
@@ -585,12 +4087,21 @@ def add_account():
         last_access_date = request.form['last_access_date']
         interest_rate = request.form['interest_rate']
         overdraft_flag = request.form.get('overdraft_flag') == 'on'
+        customer_ssn = request.form.get('customer_ssn', '').strip()
 
         query = """
             INSERT INTO Account (AccountNumber, AccountType, Balance, LastAccessDate, InterestRate, OverdraftFlag)
             VALUES (%s, %s, %s, %s, %s, %s)
         """
         result = query_db(query, (account_number, account_type, balance, last_access_date, interest_rate, overdraft_flag), commit=True)
+        # An account counts towards its holder's branch (see ACCOUNT_BRANCH_SQL), so one added without
+        # a holder stays out of the aggregates, exactly as reconciliation would leave it.
+        if result is None and customer_ssn:
+            query = "INSERT INTO Customer_Account (SSN, AccountNumber) VALUES (%s, %s)"
+            result = query_db(query, (customer_ssn, account_number), commit=True)
+            if result is None:
+                result = query_db(*account_aggregate_query([account_number], 1), commit=True)
+                touch_pages(customer_version(customer_ssn))
         if result is None:
             flash('Account added successfully!', 'success')
             return redirect(url_for('manage_accounts'))
@@ -609,20 +4120,29 @@ def edit_account(account_number):
         interest_rate = request.form['interest_rate']
         overdraft_flag = request.form.get('overdraft_flag') == 'on'
 
+        # Swap the account's old contribution to the branch aggregates for its new one
+        result = query_db(*account_aggregate_query([account_number], -1), commit=True)
         query = """
             UPDATE Account
             SET AccountType = %s, Balance = %s, LastAccessDate = %s, InterestRate = %s, OverdraftFlag = %s
             WHERE AccountNumber = %s
         """
-        result = query_db(query, (account_type, balance, last_access_date, interest_rate, overdraft_flag, account_number), commit=True)
         if result is None:
+            result = query_db(query, (account_type, balance, last_access_date, interest_rate, overdraft_flag, account_number), commit=True)
+        if result is None:
+            result = query_db(*account_aggregate_query([account_number], 1), commit=True)
+        if result is None:
+            touch_account_owners([account_number])
             flash('Account updated successfully!', 'success')
             return redirect(url_for('manage_accounts'))
         else:
             flash('Error updating account.', 'danger')
 
     # GET request
-    query = "SELECT * FROM Account WHERE AccountNumber = %s"
+    query = """
+        SELECT AccountNumber, AccountType, Balance, LastAccessDate, InterestRate, OverdraftFlag
+        FROM Account WHERE AccountNumber = %s
+    """
     account = query_db(query, (account_number,), fetchone=True)
     if not account:
         flash('Account not found.', 'danger')
@@ -632,8 +4152,12 @@ def edit_account(account_number):
 @app.route('/employee/accounts/delete/<int:account_number>', methods=['POST'])
 @employee_required
 def delete_account(account_number):
-    query = "DELETE FROM Account WHERE AccountNumber = %s"
-    result = query_db(query, (account_number,), commit=True)
+    # Owners are looked up before the delete cascades to Customer_Account
+    touch_account_owners([account_number])
+    result = query_db(*account_aggregate_query([account_number], -1), commit=True)
+    if result is None:
+        query = "DELETE FROM Account WHERE AccountNumber = %s"
+        result = query_db(query, (account_number,), commit=True)
     if result is None:
         flash('Account deleted successfully!', 'success')
     else:
@@ -642,6 +4166,8 @@ def delete_account(account_number):
 
 # ----- Manage Loans -----
 
+LOAN_EXPORT_COLUMNS = ['LoanNumber', 'Amount', 'MonthlyRepayment', 'BranchName']
+
 @app.route('/employee/loans', methods=['GET', 'POST'])
 @employee_required
 def manage_loans():
@@ -672,8 +4198,13 @@ def manage_loans():
 
     base_query += " ORDER BY Loan.LoanNumber ASC"
 
-    loans = query_db(base_query, tuple(params))
-    return render_template('manage_loans.html', loans=loans, search_query=search_query)
+    export_format = get_export_format()
+    if export_format:
+        return export_response(export_format, stream_db(base_query, tuple(params)), LOAN_EXPORT_COLUMNS, 'loans')
+
+    return render_page('manage_loans.html', ('loans', 'branches'),
+                       lambda: {'loans': query_db(base_query, tuple(params)), 'search_query': search_query},
+                       key=search_query)
 
 @app.route('/employee/loans/add', methods=['GET', 'POST'])
 @employee_required
@@ -689,6 +4220,9 @@ def add_loan():
             VALUES (%s, %s, %s, %s)
         """
         result = query_db(query, (loan_number, amount, monthly_repayment, branch_id), commit=True)
+        if result is None:
+            result = query_db(*loan_aggregate_query([loan_number], 1), commit=True)
+        touch_pages('loans')
         if result is None:
             flash('Loan added successfully!', 'success')
             return redirect(url_for('manage_loans'))
@@ -696,7 +4230,7 @@ def add_loan():
             flash('Error adding loan.', 'danger')
 
     # GET request
-    branches = query_db("SELECT BranchID, Name FROM Branch")
+    branches = get_branch_choices()
     return render_template('add_loan.html', branches=branches)
 
 @app.route('/employee/loans/edit/<int:loan_number>', methods=['GET', 'POST'])
@@ -707,12 +4241,18 @@ def edit_loan(loan_number):
         monthly_repayment = request.form['monthly_repayment']
         branch_id = request.form['branch_id']
 
+        result = query_db(*loan_aggregate_query([loan_number], -1), commit=True)
         query = """
             UPDATE Loan
             SET Amount = %s, MonthlyRepayment = %s, BranchID = %s
             WHERE LoanNumber = %s
         """
-        result = query_db(query, (amount, monthly_repayment, branch_id, loan_number), commit=True)
+        if result is None:
+            result = query_db(query, (amount, monthly_repayment, branch_id, loan_number), commit=True)
+        if result is None:
+            result = query_db(*loan_aggregate_query([loan_number], 1), commit=True)
+        invalidate_loan_schedule(loan_number)
+        touch_pages('loans')
         if result is None:
             flash('Loan updated successfully!', 'success')
             return redirect(url_for('manage_loans'))
@@ -720,31 +4260,162 @@ def edit_loan(loan_number):
             flash('Error updating loan.', 'danger')
 
     # GET request
-    query = "SELECT * FROM Loan WHERE LoanNumber = %s"
+    query = "SELECT LoanNumber, Amount, MonthlyRepayment, BranchID FROM Loan WHERE LoanNumber = %s"
     loan = query_db(query, (loan_number,), fetchone=True)
     if not loan:
         flash('Loan not found.', 'danger')
         return redirect(url_for('manage_loans'))
-    branches = query_db("SELECT BranchID, Name FROM Branch")
+    branches = get_branch_choices()
     return render_template('edit_loan.html', loan=loan, branches=branches)
 
 @app.route('/employee/loans/delete/<int:loan_number>', methods=['POST'])
 @employee_required
 def delete_loan(loan_number):
-    query = "DELETE FROM Loan WHERE LoanNumber = %s"
-    result = query_db(query, (loan_number,), commit=True)
+    result = query_db(*loan_aggregate_query([loan_number], -1), commit=True)
+    if result is None:
+        query = "DELETE FROM Loan WHERE LoanNumber = %s"
+        result = query_db(query, (loan_number,), commit=True)
+    invalidate_loan_schedule(loan_number)
+    touch_pages('loans')
     if result is None:
         flash('Loan deleted successfully!', 'success')
     else:
         flash('Error deleting loan.', 'danger')
     return redirect(url_for('manage_loans'))
 
+# ----- Loan Amortization -----
+
+@app.route('/employee/loans/<int:loan_number>/schedule')
+@employee_required
+def loan_schedule(loan_number):
+    query = "SELECT LoanNumber, Amount, MonthlyRepayment, BranchID FROM Loan WHERE LoanNumber = %s"
+    loan = query_db(query, (loan_number,), fetchone=True)
+    if not loan:
+        flash('Loan not found.', 'danger')
+        return redirect(url_for('manage_loans'))
+
+    try:
+        schedule = build_loan_schedules([loan], get_loan_rate(), datetime.now().date().replace(day=1))[0]
+    except ValueError as err:
+        if request.args.get('format') == 'json':
+            return jsonify({'error': str(err)}), 400
+        flash(str(err), 'danger')
+        return render_template('loan_schedule.html', loan=loan, schedule=None), 400
+    if request.args.get('format') == 'json':
+        return jsonify(schedule)
+    return render_template('loan_schedule.html', loan=loan, schedule=schedule)
+
+@app.route('/employee/branches/<int:branch_id>/loan-schedules')
+@employee_required
+def branch_loan_schedules(branch_id):
+    query = "SELECT LoanNumber, Amount, MonthlyRepayment, BranchID FROM Loan WHERE BranchID = %s ORDER BY LoanNumber"
+    loans = query_db(query, (branch_id,)) or []
+    try:
+        schedules = build_loan_schedules(loans, get_loan_rate(), datetime.now().date().replace(day=1))
+    except ValueError as err:
+        return jsonify({'error': str(err)}), 400
+    return jsonify({'BranchID': branch_id, 'Loans': schedules})
+
+@app.route('/employee/loans/summary')
+@employee_required
+def loan_portfolio_summary():
+    query = """
+        SELECT BranchID, CAST(ROUND(Amount * 100) AS SIGNED), CAST(ROUND(MonthlyRepayment * 100) AS SIGNED)
+        FROM Loan
+    """
+    params = ()
+    branch_id = request.args.get('branch_id', type=int)
+    if branch_id is not None:
+        query += " WHERE BranchID = %s"
+        params = (branch_id,)
+
+    try:
+        annual_rate = get_loan_rate()
+    except ValueError as err:
+        return jsonify({'error': str(err)}), 400
+    rate_units = int((annual_rate * RATE_SCALE).to_integral_value(rounding=ROUND_HALF_UP))
+
+    # Plain tuples streamed straight into an array; dict rows would dominate the cost at 100k loans
+    rows = stream_db(query, params, dictionary=False)
+    loans = np.fromiter(chain.from_iterable(rows), dtype=np.int64).reshape(-1, 3)
+    result = amortize(loans[:, 1], loans[:, 2], rate_units)
+    start = datetime.now().date().replace(day=1)
+
+    # Aggregate per branch with grouped reductions instead of one pass per branch
+    branch_ids, group = np.unique(loans[:, 0], return_inverse=True)
+    amortizing = result['amortizing']
+    months = np.where(amortizing, result['months'], 0)
+    interest = np.where(amortizing, result['total_interest'], 0)
+
+    def grouped_sum(values):
+        totals = np.zeros(len(branch_ids), dtype=values.dtype)
+        np.add.at(totals, group, values)
+        return totals
+
+    counts = grouped_sum(np.ones(len(loans), dtype=np.int64))
+    principal = grouped_sum(loans[:, 1])
+    repayments = grouped_sum(loans[:, 2])
+    projected_interest = grouped_sum(interest)
+    amortizing_counts = grouped_sum(amortizing.astype(np.int64))
+    month_totals = grouped_sum(months)
+    longest = np.zeros(len(branch_ids), dtype=np.int64)
+    np.maximum.at(longest, group, months)
+
+    def summary(count, principal_cents, repayment_cents, interest_cents, amortizing_count, total_months, max_months):
+        return {
+            'Loans': int(count),
+            'Principal': Decimal(int(principal_cents)) / 100,
+            'MonthlyRepayments': Decimal(int(repayment_cents)) / 100,
+            'ProjectedInterest': Decimal(int(interest_cents)) / 100,
+            'NotAmortizing': int(count - amortizing_count),
+            'AverageMonths': round(int(total_months) / int(amortizing_count), 1) if amortizing_count else None,
+            'LastPayoffDate': add_months(start, int(max_months)) if amortizing_count else None
+        }
+
+    branches = {
+        int(branch_ids[i]): summary(counts[i], principal[i], repayments[i], projected_interest[i],
+                                    amortizing_counts[i], month_totals[i], longest[i])
+        for i in range(len(branch_ids))
+    }
+    portfolio = summary(counts.sum(), principal.sum(), repayments.sum(), projected_interest.sum(),
+                        amortizing_counts.sum(), month_totals.sum(), longest.max() if len(longest) else 0)
+    return jsonify({'AnnualRate': annual_rate, 'Portfolio': portfolio, 'Branches': branches})
+
 # ----- View Transactions -----
 
+TRANSACTION_EXPORT_COLUMNS = [
+    'TransactionID', 'TransactionType', 'TDate', 'TTime', 'Amount',
+    'TransactionCharge', 'AccountNumber', 'CustomerFirstName', 'CustomerLastName'
+]
+
 @app.route('/employee/transactions')
 @employee_required
 def view_transactions():
-    query = """
+    filters = []
+    params = []
+    filter_args = {}
+
+    start_date = parse_date(request.args.get('start_date', '').strip())
+    if start_date:
+        filters.append("Transaction.TDate >= %s")
+        params.append(start_date)
+        filter_args['start_date'] = start_date.isoformat()
+
+    end_date = parse_date(request.args.get('end_date', '').strip())
+    if end_date:
+        filters.append("Transaction.TDate <= %s")
+        params.append(end_date)
+        filter_args['end_date'] = end_date.isoformat()
+
+    account_number = request.args.get('account_number', '').strip()
+    if account_number.isdigit():
+        filters.append("Transaction.AccountNumber = %s")
+        params.append(int(account_number))
+        filter_args['account_number'] = account_number
+
+    # One row per transaction, named after the account's first holder; joining every holder would
+    # repeat a joint account's transactions and break the page cursor
+    base_query = """
         SELECT 
             Transaction.TransactionID, 
             Transaction.TransactionType, 
@@ -755,14 +4426,150 @@ def view_transactions():
             Account.AccountNumber,
             Customer.FirstName AS CustomerFirstName,
             Customer.LastName AS CustomerLastName
-        FROM Transaction
+        FROM `Transaction`
         JOIN Account ON Transaction.AccountNumber = Account.AccountNumber
-        JOIN Customer_Account ON Account.AccountNumber = Customer_Account.AccountNumber
-        JOIN Customer ON Customer_Account.SSN = Customer.SSN
-        ORDER BY Transaction.TDate DESC, Transaction.TTime DESC
+        JOIN Customer ON Customer.SSN = (
+            SELECT MIN(Customer_Account.SSN) FROM Customer_Account
+            WHERE Customer_Account.AccountNumber = Account.AccountNumber
+        )
     """
-    transactions = query_db(query)
-    return render_template('view_transactions.html', transactions=transactions)
+
+    # Full export: stream every matching row without materializing the result
+    export_format = get_export_format()
+    if export_format:
+        query = base_query
+        if filters:
+            query += " WHERE " + " AND ".join(filters)
+        query += " ORDER BY Transaction.TDate DESC, Transaction.TTime DESC, Transaction.TransactionID DESC"
+        rows = stream_db(query, tuple(params))
+        return export_response(export_format, rows, TRANSACTION_EXPORT_COLUMNS, 'transactions')
+
+    transactions, page_size, next_cursor, prev_cursor = paginate_transactions(base_query, filters, params)
+
+    return render_template('view_transactions.html', transactions=transactions, filter_args=filter_args,
+                           page_size=page_size, next_cursor=next_cursor, prev_cursor=prev_cursor)
+
+# ----- Batch Payments -----
+
+@app.route('/employee/payments/batch', methods=['POST'])
+@employee_required
+def batch_payments():
+    """Posts a JSON list of transfers, e.g. a payroll run, and returns one result per transfer."""
+    body = request.get_json(silent=True)
+    items = body.get('transfers') if isinstance(body, dict) else body
+    if not isinstance(items, list) or not items:
+        return jsonify({'error': 'Expected a JSON list of transfers.'}), 400
+    if len(items) > transfer_config['max_items']:
+        return jsonify({'error': f"At most {transfer_config['max_items']} transfers per request."}), 413
+
+    # Items that do not parse are rejected up front and never reach the database
+    transfers, results = [], [None] * len(items)
+    for index, item in enumerate(items):
+        try:
+            transfers.append((index, parse_transfer(item)))
+        except PostingError as err:
+            results[index] = {'status': 'rejected', 'error': str(err)}
+    for (index, _), result in zip(transfers, post_transfers([transfer for _, transfer in transfers])):
+        results[index] = result
+
+    counts = {status: sum(1 for result in results if result['status'] == status)
+              for status in ('posted', 'rejected', 'failed')}
+    return jsonify(dict(counts, results=results))
+
+# ----- Bulk Import -----
+
+@app.route('/employee/import', methods=['GET', 'POST'])
+@employee_required
+def import_data():
+    if request.method == 'POST':
+        kind = request.form['kind']
+        upload = request.files.get('file')
+        if kind not in IMPORT_SPECS:
+            flash('Unknown import type.', 'danger')
+            return redirect(url_for('import_data'))
+        if not upload or not upload.filename:
+            flash('Please choose a file to import.', 'danger')
+            return redirect(url_for('import_data'))
+        fmt = 'jsonl' if upload.filename.lower().endswith(('.jsonl', '.json')) else 'csv'
+        try:
+            batch_size = max(1, int(request.form.get('batch_size') or IMPORT_BATCH_SIZE))
+        except ValueError:
+            batch_size = IMPORT_BATCH_SIZE
+
+        # Hand the file to a background worker instead of importing inside the request
+        os.makedirs(job_config['upload_dir'], exist_ok=True)
+        path = os.path.join(job_config['upload_dir'], f'{uuid.uuid4().hex}.{fmt}')
+        upload.save(path)
+        payload = {'kind': kind, 'path': path, 'format': fmt, 'batch_size': batch_size}
+        try:
+            job_id = enqueue_job('bulk_import', payload, created_by=session['username'])
+        except mysql.connector.Error as err:
+            os.remove(path)
+            print(f"Error: {err}")
+            flash(f'Could not queue import: {err}', 'danger')
+            return redirect(url_for('import_data'))
+        flash(f'Import queued as job {job_id}.', 'info')
+        return redirect(url_for('import_data', job=job_id))
+
+    job = None
+    job_id = request.args.get('job', type=int)
+    if job_id:
+        job = get_job(job_id)
+        if not job or job['JobType'] != 'bulk_import':
+            flash('Import job not found.', 'danger')
+            job = None
+
+    return render_template('import_data.html', kinds=list(IMPORT_SPECS), job=job,
+                           report=job['Result'] if job else None, batch_size=IMPORT_BATCH_SIZE)
+
+# ----- Background Jobs -----
+
+def job_status(job):
+    return {
+        'job_id': job['JobID'],
+        'job_type': job['JobType'],
+        'status': job['Status'],
+        'progress': float(job['Progress']),
+        'attempts': job['Attempts'],
+        'max_attempts': job['MaxAttempts'],
+        'error': job['Error'],
+        'created_at': job['CreatedAt'],
+        'started_at': job['StartedAt'],
+        'finished_at': job['FinishedAt'],
+        'result_url': url_for('job_result', job_id=job['JobID'])
+    }
+
+@app.route('/employee/jobs/<job_type>', methods=['POST'])
+@employee_required
+def enqueue_job_route(job_type):
+    if job_type not in JOB_HANDLERS or job_type == 'bulk_import':
+        # Imports need an uploaded file and go through import_data
+        return jsonify({'error': f'Unknown job type: {job_type}'}), 404
+    payload = request.get_json(silent=True) or request.form.to_dict()
+    try:
+        job_id = enqueue_job(job_type, payload, created_by=session['username'])
+    except mysql.connector.Error as err:
+        print(f"Error: {err}")
+        return jsonify({'error': 'Could not queue job.'}), 503
+    return jsonify({'job_id': job_id, 'status_url': url_for('job_status_route', job_id=job_id)}), 202
+
+@app.route('/employee/jobs/<int:job_id>')
+@employee_required
+def job_status_route(job_id):
+    job = get_job(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found.'}), 404
+    return jsonify(job_status(job))
+
+@app.route('/employee/jobs/<int:job_id>/result')
+@employee_required
+def job_result(job_id):
+    job = get_job(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found.'}), 404
+    if job['Status'] != 'succeeded':
+        return jsonify(job_status(job)), 409
+    return jsonify(job['Result'])
 
 # -----------------------------
 # Routes for Customers
@@ -771,128 +4578,108 @@ def view_transactions():
 @app.route('/customer/dashboard')
 @customer_required
 def customer_dashboard():
-    user_id = session['user_id']
-
-    # Fetch customer SSN based on UserID
-    query = "SELECT CustomerSSN FROM Users WHERE UserID = %s"
-    result = query_db(query, (user_id,), fetchone=True)
-    if not result:
-        flash('Customer not found.', 'danger')
-        return redirect(url_for('logout'))
-
-    customer_ssn = result['CustomerSSN']
+    customer_ssn = session['customer_ssn']
 
-    # Fetch customer details
-    query = "SELECT * FROM Customer WHERE SSN = %s"
-    customer = query_db(query, (customer_ssn,), fetchone=True)
+    def load():
+        # Fetch customer details
+        query = "SELECT FirstName, LastName FROM Customer WHERE SSN = %s"
+        customer = query_db(query, (customer_ssn,), fetchone=True)
 
-    # Fetch customer accounts
-    query = """
-        SELECT 
-            Account.AccountNumber, 
-            Account.AccountType, 
-            Account.Balance, 
-            Account.LastAccessDate,
-            Account.InterestRate,
-            Account.OverdraftFlag
-        FROM Account
-        JOIN Customer_Account ON Account.AccountNumber = Customer_Account.AccountNumber
-        WHERE Customer_Account.SSN = %s
-    """
-    accounts = query_db(query, (customer_ssn,))
+        # Fetch customer accounts
+        query = """
+            SELECT 
+                Account.AccountNumber, 
+                Account.AccountType, 
+                Account.Balance, 
+                Account.LastAccessDate
+            FROM Account
+            JOIN Customer_Account ON Account.AccountNumber = Customer_Account.AccountNumber
+            WHERE Customer_Account.SSN = %s
+        """
+        accounts = query_db(query, (customer_ssn,))
+        return {'customer': customer, 'accounts': accounts}
 
-    return render_template('customer_dashboard.html', customer=customer, accounts=accounts)
+    return render_page('customer_dashboard.html', (customer_version(customer_ssn), 'accounts'), load)
 
 @app.route('/customer/transaction', methods=['GET', 'POST'])
 @customer_required
 def perform_transaction():
-    user_id = session['user_id']
-
-    # Fetch customer SSN
-    query = "SELECT CustomerSSN FROM Users WHERE UserID = %s"
-    result = query_db(query, (user_id,), fetchone=True)
-    if not result:
-        flash('Customer not found.', 'danger')
-        return redirect(url_for('logout'))
-    customer_ssn = result['CustomerSSN']
-
-    # Fetch customer accounts
-    query = """
-        SELECT AccountNumber, AccountType, Balance 
-        FROM Account
-        JOIN Customer_Account ON Account.AccountNumber = Customer_Account.AccountNumber
-        WHERE Customer_Account.SSN = %s
-    """
-    accounts = query_db(query, (customer_ssn,))
+    customer_ssn = session['customer_ssn']
 
     if request.method == 'POST':
         account_number = request.form['account_number']
         transaction_type = request.form['transaction_type']
-        amount = request.form['amount']
 
-        # Validate amount
-        try:
-            amount = float(amount)
-            if amount <= 0:
-                flash('Amount must be positive.', 'danger')
+        # Check the balance, update it and record the transaction in one database transaction.
+        # A retried request with the same idempotency key gets the first attempt's result instead.
+        idempotency_key = get_idempotency_key()
+        conn = get_request_db()
+        for attempt in range(POSTING_RETRIES + 1):
+            try:
+                amount = parse_amount(request.form['amount'])
+                if transaction_type == 'Transfer':
+                    transfer = Transfer(int(account_number), int(request.form.get('to_account', '')), amount)
+                    postings = transfer_postings(transfer, owner_ssn=customer_ssn)
+                elif transaction_type in ('Deposit', 'Withdrawal'):
+                    postings = [Posting(int(account_number), transaction_type, amount, owner_ssn=customer_ssn)]
+                else:
+                    raise PostingError('Invalid transaction type.')
+                if idempotency_key:
+                    key_hash = idempotency_hash(customer_ssn, idempotency_key)
+                    request_hash = idempotency_hash(*postings)
+                    claimed_at = time.time()
+                    replayed = claim_idempotency_key(conn, key_hash, request_hash)
+                    if replayed is not None:
+                        conn.rollback()
+                        flash(replayed['message'], 'success')
+                        response = redirect(url_for('customer_dashboard'))
+                        response.headers['Idempotent-Replayed'] = 'true'
+                        return response
+                # Checked on every attempt but counted only once the postings commit
+                screened = velocity_screen.check(postings)
+                result = {
+                    'message': f'{transaction_type} successful!',
+                    'transaction_ids': post_entries(conn, postings)
+                }
+                if idempotency_key:
+                    save_idempotent_result(conn, key_hash, result)
+                conn.commit()
+                break
+            except (PostingError, ValueError) as err:
+                conn.rollback()
+                flash(str(err) if isinstance(err, PostingError) else 'Account not found.', 'danger')
                 return redirect(url_for('perform_transaction'))
-        except ValueError:
-            flash('Invalid amount.', 'danger')
-            return redirect(url_for('perform_transaction'))
-
-        # Check if account exists and belongs to the customer
-        account = next((acc for acc in accounts if acc['AccountNumber'] == int(account_number)), None)
-        if not account:
-            flash('Account not found.', 'danger')
-            return redirect(url_for('perform_transaction'))
-
-        if transaction_type == 'Withdrawal':
-            if account['Balance'] < amount:
-                flash('Insufficient funds for withdrawal.', 'danger')
+            except mysql.connector.Error as err:
+                conn.rollback()
+                if err.errno in POSTING_RETRY_ERRORS and attempt < POSTING_RETRIES:
+                    continue
+                print(f"Error: {err}")
+                flash('Error recording transaction.', 'danger')
                 return redirect(url_for('perform_transaction'))
-            new_balance = account['Balance'] - amount
-        elif transaction_type == 'Deposit':
-            new_balance = account['Balance'] + amount
-        else:
-            flash('Invalid transaction type.', 'danger')
-            return redirect(url_for('perform_transaction'))
-
-        # Update Account Balance
-        update_query = "UPDATE Account SET Balance = %s, LastAccessDate = CURDATE() WHERE AccountNumber = %s"
-        update_result = query_db(update_query, (new_balance, account_number), commit=True)
-        if update_result is not None:
-            flash('Error updating account balance.', 'danger')
-            return redirect(url_for('perform_transaction'))
-
-        # Insert into Transaction table
-        transaction_charge = 0.50 if transaction_type == 'Deposit' else 1.00  # Example charges
-        transaction_query = """
-            INSERT INTO `Transaction` (TransactionType, TDate, TTime, Amount, AccountNumber, TransactionCharge)
-            VALUES (%s, CURDATE(), CURTIME(), %s, %s, %s)
-        """
-        transaction_result = query_db(transaction_query, (transaction_type, amount, account_number, transaction_charge), commit=True)
-        if transaction_result is not None:
-            flash('Error recording transaction.', 'danger')
-            return redirect(url_for('perform_transaction'))
 
-        flash(f'{transaction_type} successful!', 'success')
+        velocity_screen.record(screened)
+        if idempotency_key:
+            idempotency_cache.set(key_hash, (request_hash, result, claimed_at + idempotency_config['ttl']))
+        touch_account_owners([posting.account_number for posting in postings])
+        flash(result['message'], 'success')
         return redirect(url_for('customer_dashboard'))
 
-    return render_template('perform_transaction.html', accounts=accounts)
+    # Fetch customer accounts
+    query = """
+        SELECT Account.AccountNumber, AccountType, Balance 
+        FROM Account
+        JOIN Customer_Account ON Account.AccountNumber = Customer_Account.AccountNumber
+        WHERE Customer_Account.SSN = %s
+    """
+    accounts = query_db(query, (customer_ssn,))
+
+    # Each rendered form carries its own key, so resubmitting it cannot post twice
+    return render_template('perform_transaction.html', accounts=accounts, idempotency_key=secrets.token_urlsafe(16))
 
 @app.route('/customer/transactions')
 @customer_required
 def customer_transactions():
-    user_id = session['user_id']
-
-    # Fetch customer SSN based on UserID
-    query = "SELECT CustomerSSN FROM Users WHERE UserID = %s"
-    result = query_db(query, (user_id,), fetchone=True)
-    if not result:
-        flash('Customer not found.', 'danger')
-        return redirect(url_for('logout'))
-
-    customer_ssn = result['CustomerSSN']
+    customer_ssn = session['customer_ssn']
 
     # Fetch transactions for customer's accounts
     query = """
@@ -906,18 +4693,253 @@ def customer_transactions():
             Transaction.AccountNumber
         FROM `Transaction`
         JOIN Customer_Account ON `Transaction`.AccountNumber = Customer_Account.AccountNumber
+    """
+
+    def load():
+        transactions, page_size, next_cursor, prev_cursor = paginate_transactions(
+            query, ["Customer_Account.SSN = %s"], [customer_ssn])
+        return {'transactions': transactions, 'page_size': page_size,
+                'next_cursor': next_cursor, 'prev_cursor': prev_cursor}
+
+    # Keyed on the query string, which carries the page cursor and size
+    return render_page('customer_transactions.html', (customer_version(customer_ssn), 'accounts'), load,
+                       key=request.query_string)
+
+@app.route('/customer/statements')
+@customer_required
+def customer_statements():
+    customer_ssn = session['customer_ssn']
+
+    query = """
+        SELECT Account.AccountNumber, Account.AccountType
+        FROM Account
+        JOIN Customer_Account ON Account.AccountNumber = Customer_Account.AccountNumber
         WHERE Customer_Account.SSN = %s
-        ORDER BY Transaction.TDate DESC, Transaction.TTime DESC
+        ORDER BY Account.AccountNumber
+    """
+    accounts = query_db(query, (customer_ssn,)) or []
+    for account in accounts:
+        account['Periods'] = list_statement_periods(account['AccountNumber'])
+    return render_template('customer_statements.html', accounts=accounts)
+
+@app.route('/customer/statements/<int:account_number>/<period>')
+@customer_required
+def customer_statement(account_number, period):
+    """Serves a statement from the archive; only the ownership check touches the database."""
+    customer_ssn = session['customer_ssn']
+
+    query = "SELECT AccountNumber FROM Customer_Account WHERE SSN = %s AND AccountNumber = %s"
+    statement = None
+    if parse_period(period) and query_db(query, (customer_ssn, account_number), fetchone=True):
+        statement = get_statement(account_number, period)
+    if statement is None:
+        flash('Statement not found.', 'danger')
+        return redirect(url_for('customer_statements'))
+
+    if request.args.get('format') == 'json':
+        return jsonify(statement)
+    return render_template('statement.html', statement=statement)
+
+# -----------------------------
+# Routes for the JSON API
+# -----------------------------
+
+@app.route('/api/v1/<resource_name>')
+@api_required
+def api_list(resource_name):
+    """Lists a resource in key order with cursor pagination, or fetches a batch with ids=1,2,3.
+
+    fields=a,b limits the columns selected from the database.
     """
-    transactions = query_db(query, (customer_ssn,))
+    resource = API_RESOURCES.get(resource_name)
+    if resource is None:
+        raise ApiError(f'Unknown resource: {resource_name}', 404)
+    columns = parse_api_fields(resource)
 
-    return render_template('customer_transactions.html', transactions=transactions)
+    # Batch lookup: one IN query, answered in the order the ids were given
+    if 'ids' in request.args:
+        ids = parse_api_ids(request.args['ids'])
+        rows = select_api_rows(resource, columns, f"`{resource.key}` IN ({_in_list(ids)})", tuple(ids))
+        found = {row[resource.key]: row for row in rows}
+        return api_response({
+            'data': [found[key] for key in ids if key in found],
+            'missing': [key for key in ids if key not in found]
+        })
+
+    page_size = get_page_size(api_config['page_size'], api_config['max_page_size'])
+    where, params = '', []
+    after = request.args.get('after')
+    if after:
+        position = decode_cursor(after, 1)
+        # A hand-edited token can hold any JSON value, not just the string encode_cursor() wrote
+        if position is None or isinstance(position[0], bool) or not isinstance(position[0], (int, str)):
+            raise ApiError('Invalid page cursor.')
+        try:
+            key = int(position[0])
+        except (TypeError, ValueError):
+            raise ApiError('Invalid page cursor.')
+        where = f"`{resource.key}` > %s"
+        params.append(key)
+    params.append(page_size + 1)
+    rows = select_api_rows(resource, columns, where, tuple(params), f" ORDER BY `{resource.key}` LIMIT %s")
+
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = encode_cursor((rows[-1][resource.key],))
+    return api_response({'data': rows, 'next_cursor': next_cursor})
+
+@app.route('/api/v1/<resource_name>/<int:key>')
+@api_required
+def api_detail(resource_name, key):
+    resource = API_RESOURCES.get(resource_name)
+    if resource is None:
+        raise ApiError(f'Unknown resource: {resource_name}', 404)
+    rows = select_api_rows(resource, parse_api_fields(resource), f"`{resource.key}` = %s", (key,))
+    if not rows:
+        raise ApiError('Not found.', 404)
+    return api_response(rows[0])
 
 # -----------------------------
 # Additional Routes and Features
 # -----------------------------
 # You can add more routes here as needed, following the same patterns.
 
+# -----------------------------
+# Command Line
+# -----------------------------
+
+@app.cli.command('import-data')
+@click.argument('kind', type=click.Choice(list(IMPORT_SPECS)))
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']), default=None, help='Defaults to the file extension.')
+@click.option('--batch-size', default=IMPORT_BATCH_SIZE, show_default=True)
+def import_data_command(kind, path, fmt, batch_size):
+    """Bulk-load customers, accounts or loans from a CSV or JSON-lines file."""
+    fmt = fmt or ('jsonl' if path.lower().endswith(('.jsonl', '.json')) else 'csv')
+    with open(path, encoding='utf-8-sig', newline='') as stream:
+        report = run_import(kind, stream, fmt, batch_size)
+    for error in report['errors']:
+        click.echo(f"line {error['line']}: {error['error']}", err=True)
+    click.echo(f"{report['rows_imported']:,} of {report['rows_read']:,} rows imported, "
+               f"{report['error_count']:,} rejected in {report['seconds']}s ({report['rows_per_second']:,} rows/s)")
+
+@app.cli.command('run-worker')
+@click.option('--processes', default=2, show_default=True, help='Number of worker processes.')
+def run_worker_command(processes):
+    """Run background job workers until interrupted."""
+    # Workers must not share sockets, so the parent never touches the pool before forking
+    stop = multiprocessing.Event()
+    prefix = f'{os.uname().nodename}:{os.getpid()}'
+    workers = [multiprocessing.Process(target=_worker_process, args=(f'{prefix}:{n}', stop), daemon=True)
+               for n in range(processes)]
+    for worker in workers:
+        worker.start()
+    click.echo(f'Started {processes} worker(s) for: {", ".join(sorted(JOB_HANDLERS))}')
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+    try:
+        while not stop.is_set() and any(worker.is_alive() for worker in workers):
+            stop.wait(1)
+    except KeyboardInterrupt:
+        stop.set()
+    for worker in workers:
+        worker.join()
+
+@app.cli.command('accrue-interest')
+@click.option('--date', 'business_date', default=None, help='Business date (YYYY-MM-DD). Defaults to today.')
+@click.option('--chunk-size', default=None, type=int, help='Accounts per transaction.')
+def accrue_interest_command(business_date, chunk_size):
+    """Accrue one day of interest on every account."""
+    parsed = parse_date(business_date) if business_date else datetime.now().date()
+    if parsed is None:
+        raise click.BadParameter('Use YYYY-MM-DD.', param_hint='--date')
+    started = time.perf_counter()
+    summary = run_interest_accrual(parsed, chunk_size,
+                                   progress=lambda fraction: click.echo(f'\r{fraction:6.1%}', nl=False))
+    click.echo(f"\n{summary['BusinessDate']}: {summary['AccountsAccrued']:,} accounts, "
+               f"${summary['InterestCents'] / 100:,.2f} interest ({summary['Status']}) "
+               f"in {time.perf_counter() - started:.1f}s")
+
+@app.cli.command('generate-statements')
+@click.option('--period', default=None, help='Statement month (YYYY-MM). Defaults to last month.')
+@click.option('--chunk-size', default=None, type=int, help='Accounts read per query.')
+def generate_statements_command(period, chunk_size):
+    """Write every account's monthly statement to the archive."""
+    period_start = parse_period(period) if period else previous_period()
+    if period_start is None:
+        raise click.BadParameter('Use YYYY-MM.', param_hint='--period')
+    summary = generate_statements(period_start, chunk_size,
+                                  progress=lambda fraction: click.echo(f'\r{fraction:6.1%}', nl=False))
+    click.echo(f"\n{summary['period']}: {summary['statements']:,} statements for {summary['accounts']:,} accounts "
+               f"({summary['transactions']:,} transactions, {summary['files']:,} files) in {summary['seconds']}s")
+
+@app.cli.command('reconcile-aggregates')
+@click.option('--days', default=None, type=int, help='Days of daily volume to rebuild.')
+def reconcile_aggregates_command(days):
+    """Rebuild the branch aggregates from the base tables and report any drift."""
+    result = reconcile_branch_aggregates(days)
+    for branch in result['drift']:
+        click.echo(f"branch {branch['BranchID']}: {branch['before']} -> {branch['after']}")
+    click.echo(f"{result['branches']:,} branches reconciled, {len(result['drift'])} drifted, "
+               f"volume rebuilt since {result['volume_since']} in {result['seconds']}s")
+
+@app.cli.command('purge-idempotency-keys')
+def purge_idempotency_keys_command():
+    """Delete idempotency keys older than their TTL."""
+    click.echo(f"{purge_idempotency_keys():,} expired keys deleted")
+
+@app.cli.command('db-migrate')
+@click.option('--target', default=None, type=int, help='Stop after this version.')
+@click.option('--status', is_flag=True, help='List the migrations and whether each is applied, without applying any.')
+def db_migrate_command(target, status):
+    """Apply pending schema migrations from the migrations directory."""
+    conn = get_db_connection()
+    try:
+        if status:
+            cursor = conn.cursor()
+            done = get_applied_migrations(cursor)
+            cursor.close()
+            for version, name, path in list_migrations():
+                click.echo(f"{version:04d}_{name}: {'applied' if version in done else 'pending'}")
+            return
+        applied = apply_migrations(conn, target, progress=lambda version, name: click.echo(f'applying {version:04d}_{name}'))
+    finally:
+        release_db_connection(conn)
+    click.echo(f'{len(applied)} migration(s) applied' if applied else 'Schema is up to date')
+
+@app.cli.command('db-explain')
+@click.option('--min-rows', default=0, show_default=True, help='Ignore full scans estimated to read fewer rows.')
+@click.option('--verbose', is_flag=True, help='Print every plan, not just the full scans.')
+def db_explain_command(min_rows, verbose):
+    """EXPLAIN every query in app.py and flag full table scans."""
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+    flagged, failed = [], 0
+    try:
+        for line, query in find_queries():
+            try:
+                plan = explain_query(cursor, query)
+            except mysql.connector.Error as err:
+                # Fragments of queries that are completed at run time do not parse on their own
+                failed += 1
+                if verbose:
+                    click.echo(f"line {line}: not explained ({err.msg})")
+                continue
+            scans = [row for row in plan if row['type'] == 'ALL' and (row['rows'] or 0) >= min_rows]
+            if scans:
+                flagged.append(line)
+            for row in plan if verbose else scans:
+                click.echo(f"line {line}: {row['table']} type={row['type']} key={row['key']} rows={row['rows']} "
+                           f"{row['Extra'] or ''}".rstrip())
+            if scans:
+                click.echo(f"    {query[:200]}")
+    finally:
+        cursor.close()
+        release_db_connection(conn)
+    click.echo(f"{len(flagged)} quer{'y' if len(flagged) == 1 else 'ies'} with full table scans, {failed} not explained")
+    if flagged:
+        raise SystemExit(1)
+
 # -----------------------------
 # Run the Application
 # -----------------------------
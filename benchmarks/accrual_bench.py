@@ -0,0 +1,126 @@
+"""Benchmarks the nightly interest accrual.
+
+By default only the vectorized computation is timed, on synthetic accounts,
+and compared with a per-row Decimal loop. With --database the full run
+(read, compute, bulk write) is timed against a seeded scratch database.
+
+    python benchmarks/accrual_bench.py --accounts 10000000
+    python benchmarks/accrual_bench.py --accounts 1000000 --database project_bench
+"""
+import argparse
+import datetime
+import os
+import sys
+import time
+from decimal import Decimal, ROUND_HALF_UP
+
+import numpy as np
+
+from common import app, connect, run_sql_file
+
+def synthetic_accounts(count, seed=42):
+    rng = np.random.default_rng(seed)
+    balance_cents = rng.integers(-50000, 100000000, size=count, dtype=np.int64)
+    rate_units = rng.integers(0, 8 * app.RATE_SCALE, size=count, dtype=np.int64)
+    return balance_cents, rate_units
+
+def decimal_loop(balance_cents, rate_units):
+    """The straightforward per-row implementation, for comparison."""
+    out = []
+    for balance, rate in zip(balance_cents.tolist(), rate_units.tolist()):
+        if balance <= 0 or rate <= 0:
+            out.append(0)
+            continue
+        daily = Decimal(balance) * Decimal(rate) / Decimal(100 * app.RATE_SCALE * 365)
+        out.append(int(daily.quantize(Decimal(1), rounding=ROUND_HALF_UP)))
+    return out
+
+def bench_compute(count, sample):
+    balance_cents, rate_units = synthetic_accounts(count)
+    start = time.perf_counter()
+    interest = app.compute_daily_interest(balance_cents, rate_units)
+    vectorized = time.perf_counter() - start
+    print(f"vectorized: {count:,} accounts in {vectorized:.3f}s ({count / vectorized:,.0f} accounts/s)")
+
+    sample = min(sample, count)
+    start = time.perf_counter()
+    expected = decimal_loop(balance_cents[:sample], rate_units[:sample])
+    looped = time.perf_counter() - start
+    print(f"Decimal loop: {sample:,} accounts in {looped:.3f}s ({sample / looped:,.0f} accounts/s), "
+          f"~{looped * count / sample:.1f}s extrapolated")
+
+    if interest[:sample].tolist() != expected:
+        sys.exit('Mismatch between vectorized and Decimal results')
+    print('results match the Decimal reference')
+
+def seed_database(database, count, batch_size=20000):
+    conn = connect(database)
+    cursor = conn.cursor()
+    for table in ('Transaction', 'Account', 'InterestAccrualRun'):
+        cursor.execute(f"DROP TABLE IF EXISTS `{table}`")
+    cursor.execute("""
+        CREATE TABLE Account (
+            AccountNumber INT PRIMARY KEY,
+            AccountType VARCHAR(20) NOT NULL,
+            Balance DECIMAL(15, 2) NOT NULL,
+            LastAccessDate DATE,
+            InterestRate DECIMAL(7, 4) NOT NULL,
+            OverdraftFlag BOOLEAN NOT NULL DEFAULT FALSE
+        ) ENGINE=InnoDB
+    """)
+    cursor.execute("""
+        CREATE TABLE `Transaction` (
+            TransactionID BIGINT AUTO_INCREMENT PRIMARY KEY,
+            TransactionType VARCHAR(20) NOT NULL,
+            TDate DATE NOT NULL,
+            TTime TIME NOT NULL,
+            Amount DECIMAL(15, 2) NOT NULL,
+            AccountNumber INT NOT NULL,
+            TransactionCharge DECIMAL(10, 2) NOT NULL DEFAULT 0
+        ) ENGINE=InnoDB
+    """)
+    run_sql_file(cursor, os.path.join(app.migration_config['directory'], '0004_interest_accrual.sql'))
+
+    balance_cents, rate_units = synthetic_accounts(count)
+    insert = "INSERT INTO Account (AccountNumber, AccountType, Balance, InterestRate) VALUES (%s, 'Savings', %s, %s)"
+    for offset in range(0, count, batch_size):
+        batch = [(offset + i + 1, Decimal(int(b)) / 100, Decimal(int(r)) / app.RATE_SCALE)
+                 for i, (b, r) in enumerate(zip(balance_cents[offset:offset + batch_size],
+                                                rate_units[offset:offset + batch_size]))]
+        cursor.executemany(insert, batch)
+        conn.commit()
+    cursor.close()
+    conn.close()
+
+def bench_database(database, count, chunk_size):
+    start = time.perf_counter()
+    seed_database(database, count)
+    print(f"seeded {count:,} accounts in {time.perf_counter() - start:.1f}s")
+
+    app.db_config['database'] = database
+    business_date = datetime.date.today()
+    start = time.perf_counter()
+    summary = app.run_interest_accrual(business_date, chunk_size)
+    elapsed = time.perf_counter() - start
+    print(f"accrued {summary['AccountsAccrued']:,} accounts in {elapsed:.1f}s ({count / elapsed:,.0f} accounts/s)")
+
+    start = time.perf_counter()
+    again = app.run_interest_accrual(business_date, chunk_size)
+    print(f"re-run for the same date: {again['AccountsAccrued']:,} accounts (unchanged) "
+          f"in {time.perf_counter() - start:.2f}s")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--accounts', type=int, default=10000000)
+    parser.add_argument('--sample', type=int, default=200000, help='Rows checked against the Decimal loop.')
+    parser.add_argument('--database', help='Scratch database for an end-to-end run.')
+    parser.add_argument('--chunk-size', type=int, default=app.accrual_config['chunk_size'])
+    args = parser.parse_args()
+
+    if args.database:
+        bench_database(args.database, args.accounts, args.chunk_size)
+    else:
+        bench_compute(args.accounts, args.sample)
+
+if __name__ == '__main__':
+    main()
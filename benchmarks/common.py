@@ -0,0 +1,49 @@
+"""Helpers shared by the benchmark scripts."""
+import os
+import statistics
+import sys
+
+import mysql.connector
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+import app  # noqa: E402
+
+def run_sql_file(cursor, path):
+    for statement in app.read_sql_statements(path):
+        cursor.execute(statement)
+
+def connect(database=None):
+    """Connects with the app's credentials, creating database first if it is given and missing."""
+    config = dict(app.db_config)
+    config.pop('database')
+    conn = mysql.connector.connect(**config)
+    if database:
+        cursor = conn.cursor()
+        cursor.execute(f"CREATE DATABASE IF NOT EXISTS `{database}`")
+        cursor.close()
+        conn.database = database
+    return conn
+
+def use_database(database):
+    """Points the app (and its connection pool) at database."""
+    app.db_config['database'] = database
+
+def percentile(ordered, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not ordered:
+        return 0.0
+    rank = max(1, int(round(fraction * len(ordered) + 0.5)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+def summarize(timings):
+    """Returns count, p50/p95/p99/max (ms) and mean for a list of latencies in seconds."""
+    ordered = sorted(t * 1000 for t in timings)
+    return {
+        'count': len(ordered),
+        'mean': statistics.fmean(ordered) if ordered else 0.0,
+        'p50': percentile(ordered, 0.50),
+        'p95': percentile(ordered, 0.95),
+        'p99': percentile(ordered, 0.99),
+        'max': ordered[-1] if ordered else 0.0
+    }
@@ -0,0 +1,215 @@
+"""Generates a deterministic synthetic bank in a scratch database.
+
+Creates the schema by applying every migration, then N branches, employees, customers (with
+logins), accounts, loans and a history of transactions. The same arguments
+and seed always produce the same data. A manifest describing the dataset is
+written next to the app's instance folder for load_bench.py to pick up.
+
+    python benchmarks/datagen.py --customers 100000 --transactions 2000000
+"""
+import argparse
+import datetime
+import json
+import os
+import random
+import time
+
+from common import app, connect, use_database
+
+FIRST_NAMES = ['James', 'Mary', 'John', 'Patricia', 'Robert', 'Jennifer', 'Michael', 'Linda', 'William', 'Elizabeth',
+               'David', 'Barbara', 'Richard', 'Susan', 'Joseph', 'Jessica', 'Thomas', 'Sarah', 'Charles', 'Karen']
+LAST_NAMES = ['Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis', 'Rodriguez', 'Martinez',
+              'Hernandez', 'Lopez', 'Gonzalez', 'Wilson', 'Anderson', 'Thomas', 'Taylor', 'Moore', 'Jackson', 'Martin']
+CITIES = [('Newark', 'NJ'), ('Jersey City', 'NJ'), ('Hoboken', 'NJ'), ('New York', 'NY'), ('Brooklyn', 'NY'),
+          ('Philadelphia', 'PA'), ('Boston', 'MA'), ('Hartford', 'CT')]
+STREETS = ['Main St', 'Broad St', 'Market St', 'Park Ave', 'High St', 'Washington St', 'Elm St', 'Oak Ave']
+ACCOUNT_TYPES = ['Checking', 'Savings', 'Money Market']
+
+TABLES = ['SchemaMigration', 'IdempotencyKey', 'BranchDailyVolume', 'BranchSummary', 'InterestAccrualRun', 'Job', 'Transaction', 'Users', 'Customer_Account',
+          'Loan', 'Account', 'Customer', 'Employee', 'Branch']
+
+# Key ranges, so workloads can derive valid ids without querying
+EMPLOYEE_SSN_BASE = 500000000
+CUSTOMER_SSN_BASE = 100000000
+ACCOUNT_BASE = 1000000
+LOAN_BASE = 1
+
+def manifest_path(database):
+    return os.path.join(app.app.instance_path, f'bench_{database}.json')
+
+def name(rng):
+    return rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES) + ''.join(rng.choice('abcdefghij') for _ in range(2))
+
+def insert_batches(conn, cursor, query, rows, batch_size):
+    batch = []
+    count = 0
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            cursor.executemany(query, batch)
+            conn.commit()
+            count += len(batch)
+            batch = []
+    if batch:
+        cursor.executemany(query, batch)
+        conn.commit()
+        count += len(batch)
+    return count
+
+def create_schema(conn, cursor):
+    cursor.execute("SET FOREIGN_KEY_CHECKS = 0")
+    for table in TABLES:
+        cursor.execute(f"DROP TABLE IF EXISTS `{table}`")
+    cursor.execute("SET FOREIGN_KEY_CHECKS = 1")
+    app.apply_migrations(conn)
+
+def generate(args):
+    rng = random.Random(args.seed)
+    today = datetime.date.today()
+    employees = args.branches * args.employees_per_branch
+    accounts = args.customers * args.accounts_per_customer
+
+    conn = connect(args.database)
+    cursor = conn.cursor()
+    create_schema(conn, cursor)
+    timings = {}
+
+    def step(label, query, rows):
+        start = time.perf_counter()
+        count = insert_batches(conn, cursor, query, rows, args.batch_size)
+        timings[label] = round(time.perf_counter() - start, 1)
+        print(f"{label}: {count:,} rows in {timings[label]}s")
+
+    step('branches', "INSERT INTO Branch (BranchID, Name, Address, City, Assets) VALUES (%s, %s, %s, %s, %s)", (
+        (b, f'{CITIES[b % len(CITIES)][0]} Branch {b}', f'{rng.randint(1, 999)} {rng.choice(STREETS)}',
+         CITIES[b % len(CITIES)][0], rng.randint(1000000, 500000000))
+        for b in range(1, args.branches + 1)))
+
+    # The first employee of each branch manages the rest, so managers are inserted first
+    def employee_rows():
+        for n in range(employees):
+            branch = n % args.branches + 1
+            first, last = name(rng)
+            manager = None if n < args.branches else EMPLOYEE_SSN_BASE + branch - 1
+            start = today - datetime.timedelta(days=rng.randint(30, 7300))
+            yield (EMPLOYEE_SSN_BASE + n, first, '', last, f'555-{rng.randint(1000000, 9999999)}', start, branch, manager)
+    step('employees', """
+        INSERT INTO Employee (SSN, FirstName, MiddleName, LastName, PhoneNo, StartDate, BranchID, ManagerID)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+    """, employee_rows())
+
+    def customer_rows():
+        for n in range(args.customers):
+            first, last = name(rng)
+            city, state = rng.choice(CITIES)
+            yield (CUSTOMER_SSN_BASE + n, first, '', last, str(rng.randint(1, 9999)), rng.choice(STREETS), None,
+                   city, state, f'{rng.randint(1000, 99999):05d}', EMPLOYEE_SSN_BASE + rng.randrange(employees))
+    step('customers', """
+        INSERT INTO Customer (SSN, FirstName, MiddleName, LastName, StreetNumber, StreetName, ApartmentNumber,
+                              City, State, ZipCode, PersonalBankerID)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+    """, customer_rows())
+
+    step('users', "INSERT INTO Users (Username, Password, UserType, CustomerSSN, EmployeeSSN) VALUES (%s, %s, %s, %s, %s)",
+         [(f'employee{n}', f'password{n}', 'Employee', None, EMPLOYEE_SSN_BASE + n) for n in range(employees)]
+         + [(f'customer{n}', f'password{n}', 'Customer', CUSTOMER_SSN_BASE + n, None) for n in range(args.customers)])
+
+    # Transactions are generated per account with a running balance, so withdrawals never overdraw
+    # and each account's final balance matches its history.
+    balances = [0] * accounts
+    day_count = max(args.days, 1)
+
+    def transaction_rows():
+        for n in range(args.transactions):
+            index = rng.randrange(accounts)
+            # Spread evenly and in order over the history, oldest first
+            elapsed = n * day_count * 86400 // max(args.transactions, 1)
+            tdate = today - datetime.timedelta(days=day_count - 1 - elapsed // 86400)
+            ttime = datetime.timedelta(seconds=elapsed % 86400)
+            amount = rng.randint(100, 200000)
+            if balances[index] >= amount and rng.random() < 0.4:
+                balances[index] -= amount
+                kind, charge = 'Withdrawal', '1.00'
+            else:
+                balances[index] += amount
+                kind, charge = 'Deposit', '0.50'
+            yield (kind, tdate, ttime, f'{amount / 100:.2f}', ACCOUNT_BASE + index, charge)
+
+    def account_rows():
+        for index in range(accounts):
+            yield (ACCOUNT_BASE + index, rng.choice(ACCOUNT_TYPES), f'{balances[index] / 100:.2f}',
+                   today - datetime.timedelta(days=rng.randrange(day_count)), f'{rng.uniform(0, 5):.4f}', False)
+
+    # Accounts go in first with zero balances so the transaction foreign key holds, then get their final balance
+    step('accounts', """
+        INSERT INTO Account (AccountNumber, AccountType, Balance, LastAccessDate, InterestRate, OverdraftFlag)
+        VALUES (%s, 'Checking', 0, NULL, 0, FALSE)
+    """, ((ACCOUNT_BASE + index,) for index in range(accounts)))
+    step('customer accounts', "INSERT INTO Customer_Account (SSN, AccountNumber) VALUES (%s, %s)", (
+        (CUSTOMER_SSN_BASE + index // args.accounts_per_customer, ACCOUNT_BASE + index) for index in range(accounts)))
+    step('transactions', """
+        INSERT INTO `Transaction` (TransactionType, TDate, TTime, Amount, AccountNumber, TransactionCharge)
+        VALUES (%s, %s, %s, %s, %s, %s)
+    """, transaction_rows())
+    step('account balances', """
+        INSERT INTO Account (AccountNumber, AccountType, Balance, LastAccessDate, InterestRate, OverdraftFlag)
+        VALUES (%s, %s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE AccountType = VALUES(AccountType), Balance = VALUES(Balance),
+                                LastAccessDate = VALUES(LastAccessDate), InterestRate = VALUES(InterestRate)
+    """, account_rows())
+
+    def loan_rows():
+        for n in range(args.loans):
+            amount = rng.randint(100000, 50000000)
+            payment = max(amount // rng.randint(12, 360), 1000)
+            yield (LOAN_BASE + n, f'{amount / 100:.2f}', f'{payment / 100:.2f}', rng.randint(1, args.branches))
+    step('loans', "INSERT INTO Loan (LoanNumber, Amount, MonthlyRepayment, BranchID) VALUES (%s, %s, %s, %s)",
+         loan_rows())
+
+    cursor.close()
+    conn.close()
+
+    start = time.perf_counter()
+    use_database(args.database)
+    result = app.reconcile_branch_aggregates()
+    print(f"branch aggregates: {result['branches']} branches in {time.perf_counter() - start:.1f}s")
+
+    manifest = {
+        'database': args.database,
+        'seed': args.seed,
+        'branches': args.branches,
+        'employees': employees,
+        'customers': args.customers,
+        'accounts_per_customer': args.accounts_per_customer,
+        'accounts': accounts,
+        'loans': args.loans,
+        'transactions': args.transactions,
+        'employee_ssn_base': EMPLOYEE_SSN_BASE,
+        'customer_ssn_base': CUSTOMER_SSN_BASE,
+        'account_base': ACCOUNT_BASE,
+        'first_names': FIRST_NAMES,
+        'last_names': LAST_NAMES,
+        'timings': timings
+    }
+    os.makedirs(os.path.dirname(manifest_path(args.database)), exist_ok=True)
+    with open(manifest_path(args.database), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    print(f"manifest written to {manifest_path(args.database)}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database', default='project_bench')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--branches', type=int, default=20)
+    parser.add_argument('--employees-per-branch', type=int, default=25)
+    parser.add_argument('--customers', type=int, default=100000)
+    parser.add_argument('--accounts-per-customer', type=int, default=2)
+    parser.add_argument('--loans', type=int, default=20000)
+    parser.add_argument('--transactions', type=int, default=1000000)
+    parser.add_argument('--days', type=int, default=90, help='Days of transaction history.')
+    parser.add_argument('--batch-size', type=int, default=5000)
+    args = parser.parse_args()
+    generate(args)
+
+if __name__ == '__main__':
+    main()
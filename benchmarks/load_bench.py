@@ -0,0 +1,214 @@
+"""Drives scripted workloads against the app and reports throughput and latency percentiles.
+
+By default requests go through Flask's test client in this process, against
+the database seeded by datagen.py. With --url they go over HTTP to a running
+server instead (which must use the same database).
+
+    python benchmarks/datagen.py --customers 10000 --transactions 200000
+    python benchmarks/load_bench.py --workload all --concurrency 8 --duration 30
+    python benchmarks/load_bench.py --workload post --url http://127.0.0.1:5000 --requests 5000
+"""
+import argparse
+import http.cookiejar
+import json
+import random
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+from common import app, summarize, use_database
+from datagen import manifest_path
+
+class TestClientSession:
+    """One virtual user on Flask's in-process test client."""
+
+    def __init__(self, base_url=None):
+        self.client = app.app.test_client()
+
+    def request(self, method, path, data=None):
+        response = self.client.open(path, method=method, data=data)
+        response.close()
+        return response.status_code
+
+class HTTPSession:
+    """One virtual user over HTTP, with its own cookie jar. Redirects are not followed."""
+
+    class _NoRedirect(urllib.request.HTTPRedirectHandler):
+        def redirect_request(self, *args, **kwargs):
+            return None
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()),
+                                                  self._NoRedirect())
+
+    def request(self, method, path, data=None):
+        body = urllib.parse.urlencode(data).encode() if data is not None else None
+        try:
+            with self.opener.open(urllib.request.Request(self.base_url + path, data=body, method=method)) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as err:
+            return err.code
+
+class VirtualUser:
+    def __init__(self, session_class, base_url, dataset, rng):
+        self.session_class = session_class
+        self.base_url = base_url
+        self.dataset = dataset
+        self.rng = rng
+        self.customer = self.rng.randrange(dataset['customers'])
+        self.employee = self.rng.randrange(dataset['employees'])
+        self.as_customer = self.login('customer', self.customer)
+        self.as_employee = self.login('employee', self.employee)
+
+    def login(self, kind, n, session=None):
+        session = session or self.session_class(self.base_url)
+        status = session.request('POST', '/login', {
+            'username': f'{kind}{n}',
+            'password': f'password{n}',
+            'usertype': kind.capitalize()
+        })
+        if status != 302:
+            raise RuntimeError(f'Login failed for {kind}{n} (HTTP {status}); was the dataset generated?')
+        return session
+
+    def account(self):
+        return self.dataset['account_base'] + self.customer * self.dataset['accounts_per_customer'] \
+            + self.rng.randrange(self.dataset['accounts_per_customer'])
+
+# Each workload performs one timed request and returns (HTTP status, expected statuses)
+def login_workload(user):
+    n = user.rng.randrange(user.dataset['customers'])
+    session = user.session_class(user.base_url)
+    return session.request('POST', '/login', {
+        'username': f'customer{n}', 'password': f'password{n}', 'usertype': 'Customer'
+    }), (302,)
+
+def dashboard_workload(user):
+    if user.rng.random() < 0.8:
+        return user.as_customer.request('GET', '/customer/dashboard'), (200,)
+    return user.as_employee.request('GET', '/employee/dashboard'), (200,)
+
+def search_workload(user):
+    rng = user.rng
+    term = rng.choice([
+        rng.choice(user.dataset['first_names']),
+        rng.choice(user.dataset['last_names'])[:rng.randint(2, 5)],
+        f"{rng.choice(user.dataset['first_names'])} {rng.choice(user.dataset['last_names'])[:3]}",
+        str(user.dataset['customer_ssn_base'] + rng.randrange(user.dataset['customers']))
+    ])
+    return user.as_employee.request('GET', '/employee/customers?' + urllib.parse.urlencode({'search': term})), (200,)
+
+def post_workload(user):
+    kind = 'Deposit' if user.rng.random() < 0.6 else 'Withdrawal'
+    return user.as_customer.request('POST', '/customer/transaction', {
+        'account_number': user.account(),
+        'transaction_type': kind,
+        'amount': f'{user.rng.randint(1, 5000) / 100:.2f}'
+    }), (302,)
+
+LISTING_PATHS = [
+    '/employee/branches',
+    '/employee/loans',
+    '/employee/transactions',
+    '/employee/customers',
+    '/employee/employees',
+    '/employee/dashboard/summary'
+]
+
+def listings_workload(user):
+    if user.rng.random() < 0.3:
+        return user.as_customer.request('GET', '/customer/transactions'), (200,)
+    return user.as_employee.request('GET', user.rng.choice(LISTING_PATHS)), (200,)
+
+WORKLOADS = {
+    'login': login_workload,
+    'dashboard': dashboard_workload,
+    'search': search_workload,
+    'post': post_workload,
+    'listings': listings_workload
+}
+
+def run_workload(name, users, requests, duration):
+    """Runs one workload with one thread per user until requests or duration is reached."""
+    workload = WORKLOADS[name]
+    timings, errors = [], []
+    lock = threading.Lock()
+    remaining = [requests]
+    deadline = time.perf_counter() + duration if duration else None
+
+    def worker(user):
+        local_timings, local_errors = [], 0
+        while True:
+            with lock:
+                if requests and remaining[0] <= 0:
+                    break
+                remaining[0] -= 1
+            if deadline and time.perf_counter() >= deadline:
+                break
+            start = time.perf_counter()
+            try:
+                status, expected = workload(user)
+                failed = status not in expected
+            except Exception as err:
+                print(f'{name}: {err!r}')
+                failed = True
+            local_timings.append(time.perf_counter() - start)
+            local_errors += failed
+        with lock:
+            timings.extend(local_timings)
+            errors.append(local_errors)
+
+    threads = [threading.Thread(target=worker, args=(user,)) for user in users]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    stats = summarize(timings)
+    stats.update(workload=name, errors=sum(errors), seconds=round(elapsed, 2),
+                 throughput=stats['count'] / elapsed if elapsed else 0.0)
+    return stats
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database', default='project_bench')
+    parser.add_argument('--workload', choices=['all'] + list(WORKLOADS), default='all')
+    parser.add_argument('--concurrency', type=int, default=4, help='Virtual users (threads).')
+    parser.add_argument('--requests', type=int, default=0, help='Requests per workload (0: use --duration).')
+    parser.add_argument('--duration', type=float, default=10.0, help='Seconds per workload.')
+    parser.add_argument('--url', help='Base URL of a running server; defaults to the in-process test client.')
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--json', action='store_true', help='Print results as JSON lines.')
+    args = parser.parse_args()
+
+    with open(manifest_path(args.database)) as f:
+        dataset = json.load(f)
+    if args.url:
+        session_class = HTTPSession
+    else:
+        use_database(args.database)
+        session_class = TestClientSession
+
+    rng = random.Random(args.seed)
+    users = [VirtualUser(session_class, args.url, dataset, random.Random(rng.random())) for _ in range(args.concurrency)]
+    names = list(WORKLOADS) if args.workload == 'all' else [args.workload]
+
+    if not args.json:
+        print(f"{'workload':<10} {'requests':>9} {'errors':>7} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} "
+              f"{'p99 ms':>9} {'max ms':>9}")
+    for name in names:
+        stats = run_workload(name, users, args.requests, None if args.requests else args.duration)
+        if args.json:
+            print(json.dumps(stats))
+        else:
+            print(f"{name:<10} {stats['count']:>9,} {stats['errors']:>7,} {stats['throughput']:>9,.1f} "
+                  f"{stats['p50']:>9.2f} {stats['p95']:>9.2f} {stats['p99']:>9.2f} {stats['max']:>9.2f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""Measures password verification throughput under a login storm.
+
+Runs --threads simulated request threads, each verifying --logins passwords,
+three ways: hashing inline on the request thread, through the credential
+pool, and through the pool with repeat logins served from the verification
+cache. No database is needed; for end-to-end login latency use
+load_bench.py --workload login.
+
+    python benchmarks/login_bench.py --method scrypt --threads 32 --logins 20
+"""
+import argparse
+import threading
+import time
+
+from common import app, summarize
+
+def storm(threads, logins, verify, passwords):
+    timings = []
+    lock = threading.Lock()
+
+    def worker(offset):
+        local = []
+        for n in range(logins):
+            stored, password = passwords[(offset + n) % len(passwords)]
+            start = time.perf_counter()
+            if not verify(stored, password):
+                raise AssertionError('verification failed')
+            local.append(time.perf_counter() - start)
+        with lock:
+            timings.extend(local)
+
+    workers = [threading.Thread(target=worker, args=(i * logins,)) for i in range(threads)]
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return summarize(timings), time.perf_counter() - started
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--method', default=app.credential_config['method'])
+    parser.add_argument('--threads', type=int, default=32, help='Concurrent login requests.')
+    parser.add_argument('--logins', type=int, default=10, help='Logins per thread.')
+    parser.add_argument('--users', type=int, default=50, help='Distinct credentials; fewer means more cache hits.')
+    parser.add_argument('--workers', type=int, default=app.credential_config['verify_workers'])
+    args = parser.parse_args()
+
+    app.credential_config.update(method=args.method, verify_workers=args.workers, max_pending=args.threads)
+    app.credential_pool = app.ThreadPoolExecutor(max_workers=args.workers, thread_name_prefix='credentials')
+    app.credential_slots = app.threading.BoundedSemaphore(args.threads)
+
+    start = time.perf_counter()
+    passwords = [(app.hash_password(f'password{n}'), f'password{n}') for n in range(args.users)]
+    print(f"{args.method}: {(time.perf_counter() - start) / args.users * 1000:.1f} ms per hash")
+
+    # (label, verify function, verification cache size); a zero-size cache never hits
+    runs = [
+        ('inline', app._check_password, 0),
+        ('pool', app.verify_password, 0),
+        ('pool+cache', app.verify_password, app.credential_config['cache_size'])
+    ]
+    print(f"{'mode':<11} {'logins':>7} {'logins/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for label, verify, cache_size in runs:
+        app.verification_cache = app.LRUCache(maxsize=cache_size, ttl=app.credential_config['cache_ttl'])
+        stats, elapsed = storm(args.threads, args.logins, verify, passwords)
+        print(f"{label:<11} {stats['count']:>7,} {stats['count'] / elapsed:>9,.1f} {stats['p50']:>9.2f} "
+              f"{stats['p95']:>9.2f} {stats['p99']:>9.2f}")
+
+if __name__ == '__main__':
+    main()
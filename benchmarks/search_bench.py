@@ -0,0 +1,117 @@
+"""Compares the indexed customer search against the old LIKE '%term%' scan.
+
+Seeds a scratch database with synthetic customers, then times both search
+paths for a mix of terms and prints latency percentiles.
+
+    python benchmarks/search_bench.py --customers 1000000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+import mysql.connector
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from app import db_config, build_search, SEARCH_SOURCES  # noqa: E402
+
+FIRST_NAMES = ['James', 'Mary', 'John', 'Patricia', 'Robert', 'Jennifer', 'Michael', 'Linda', 'William', 'Elizabeth',
+               'David', 'Barbara', 'Richard', 'Susan', 'Joseph', 'Jessica', 'Thomas', 'Sarah', 'Charles', 'Karen']
+LAST_NAMES = ['Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis', 'Rodriguez', 'Martinez',
+              'Hernandez', 'Lopez', 'Gonzalez', 'Wilson', 'Anderson', 'Thomas', 'Taylor', 'Moore', 'Jackson', 'Martin']
+
+TERMS = ['smith', 'jen', 'mar', 'robert wil', 'Jo', 'Ta', 'zzz']
+
+def seed(conn, count, batch_size=10000):
+    cursor = conn.cursor()
+    cursor.execute("DROP TABLE IF EXISTS Customer")
+    cursor.execute("""
+        CREATE TABLE Customer (
+            SSN INT PRIMARY KEY,
+            FirstName VARCHAR(50) NOT NULL,
+            LastName VARCHAR(50) NOT NULL
+        ) ENGINE=InnoDB
+    """)
+    rng = random.Random(42)
+    insert = "INSERT INTO Customer (SSN, FirstName, LastName) VALUES (%s, %s, %s)"
+    batch = []
+    for ssn in range(100000000, 100000000 + count):
+        # Suffix a few letters so names are not all identical
+        first = rng.choice(FIRST_NAMES)
+        last = rng.choice(LAST_NAMES) + ''.join(rng.choice('abcdefghij') for _ in range(2))
+        batch.append((ssn, first, last))
+        if len(batch) >= batch_size:
+            cursor.executemany(insert, batch)
+            conn.commit()
+            batch = []
+    if batch:
+        cursor.executemany(insert, batch)
+        conn.commit()
+    cursor.execute("""
+        ALTER TABLE Customer
+            ADD FULLTEXT INDEX ft_customer_name (FirstName, LastName),
+            ADD INDEX idx_customer_first_name (FirstName, LastName),
+            ADD INDEX idx_customer_last_name (LastName, FirstName)
+    """)
+    cursor.close()
+
+def time_query(cursor, query, params, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        cursor.execute(query, params)
+        cursor.fetchall()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+def report(label, timings):
+    timings = sorted(timings)
+    p95 = timings[int(len(timings) * 0.95) - 1] if len(timings) >= 20 else timings[-1]
+    print(f"  {label:<8} p50={statistics.median(timings):9.2f} ms  p95={p95:9.2f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--customers', type=int, default=1000000)
+    parser.add_argument('--database', default='project_bench')
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--limit', type=int, default=25)
+    parser.add_argument('--skip-seed', action='store_true')
+    args = parser.parse_args()
+
+    config = dict(db_config)
+    config.pop('database')
+    conn = mysql.connector.connect(**config)
+    cursor = conn.cursor()
+    cursor.execute(f"CREATE DATABASE IF NOT EXISTS `{args.database}`")
+    conn.database = args.database
+
+    if not args.skip_seed:
+        start = time.perf_counter()
+        seed(conn, args.customers)
+        print(f"Seeded {args.customers:,} customers in {time.perf_counter() - start:.1f}s")
+
+    for term in TERMS:
+        print(f"search={term!r}")
+        like = f"%{term}%"
+        like_query = """
+            SELECT SSN, FirstName, LastName FROM Customer
+            WHERE FirstName LIKE %s OR LastName LIKE %s OR SSN LIKE %s
+            ORDER BY FirstName, LastName LIMIT %s
+        """
+        report('LIKE', time_query(cursor, like_query, (like, like, like, args.limit), args.repeat))
+
+        matches, params = build_search(term, SEARCH_SOURCES['customers'])
+        indexed_query = f"""
+            SELECT Customer.SSN, Customer.FirstName, Customer.LastName
+            FROM ({matches}) AS Matches JOIN Customer ON Customer.SSN = Matches.MatchKey
+            ORDER BY Matches.Score DESC, Customer.FirstName, Customer.LastName LIMIT %s
+        """
+        report('indexed', time_query(cursor, indexed_query, tuple(params) + (args.limit,), args.repeat))
+
+    cursor.close()
+    conn.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""Measures batch transfer throughput against the database seeded by datagen.py.
+
+Posts --transfers random transfers between the dataset's accounts through
+app.post_transfers, once per chunk size, split across --threads concurrent
+batches so the lock ordering is exercised. Chunk size 1 is the one
+transaction per transfer baseline. Each run moves real balances, so use a
+scratch database.
+
+    python benchmarks/datagen.py --customers 10000 --transactions 100000
+    python benchmarks/transfer_bench.py --transfers 20000 --chunk-sizes 1,100,500,2000 --threads 4
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from decimal import Decimal
+
+from common import app, use_database
+from datagen import manifest_path
+
+def random_transfers(dataset, count, rng):
+    transfers = []
+    while len(transfers) < count:
+        source = dataset['account_base'] + rng.randrange(dataset['accounts'])
+        target = dataset['account_base'] + rng.randrange(dataset['accounts'])
+        if source != target:
+            transfers.append(app.Transfer(source, target, Decimal(rng.randint(1, 2000)) / 100))
+    return transfers
+
+def run(transfers, chunk_size, threads):
+    """Posts the transfers as `threads` concurrent batches; returns (seconds, status counts)."""
+    batches = [transfers[n::threads] for n in range(threads)]
+    results = []
+    lock = threading.Lock()
+
+    def worker(batch):
+        batch_results = app.post_transfers(batch, chunk_size=chunk_size)
+        with lock:
+            results.extend(batch_results)
+
+    workers = [threading.Thread(target=worker, args=(batch,)) for batch in batches]
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    counts = {status: sum(1 for result in results if result['status'] == status)
+              for status in ('posted', 'rejected', 'failed')}
+    return elapsed, counts
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database', default='project_bench')
+    parser.add_argument('--transfers', type=int, default=10000, help='Transfers per run.')
+    parser.add_argument('--chunk-sizes', default=f"1,100,{app.transfer_config['chunk_size']}",
+                        help='Comma-separated chunk sizes to compare.')
+    parser.add_argument('--threads', type=int, default=4, help='Concurrent batches.')
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    with open(manifest_path(args.database)) as f:
+        dataset = json.load(f)
+    use_database(args.database)
+    rng = random.Random(args.seed)
+
+    print(f"{'chunk':>6} {'transfers':>10} {'posted':>8} {'rejected':>9} {'failed':>7} {'seconds':>8} {'transfers/s':>12}")
+    for chunk_size in (int(size) for size in args.chunk_sizes.split(',')):
+        transfers = random_transfers(dataset, args.transfers, rng)
+        elapsed, counts = run(transfers, chunk_size, args.threads)
+        print(f"{chunk_size:>6} {len(transfers):>10,} {counts['posted']:>8,} {counts['rejected']:>9,} "
+              f"{counts['failed']:>7,} {elapsed:>8.2f} {len(transfers) / elapsed:>12,.1f}")
+
+if __name__ == '__main__':
+    main()
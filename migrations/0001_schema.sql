@@ -0,0 +1,87 @@
+-- Base schema for the application tables. The other files in this directory
+-- add indexes and supporting tables on top of it.
+
+CREATE TABLE IF NOT EXISTS Branch (
+    BranchID INT PRIMARY KEY,
+    Name VARCHAR(100) NOT NULL,
+    Address VARCHAR(200) NOT NULL,
+    City VARCHAR(100) NOT NULL,
+    Assets DECIMAL(18, 2) NOT NULL DEFAULT 0
+) ENGINE=InnoDB;
+
+CREATE TABLE IF NOT EXISTS Employee (
+    SSN INT PRIMARY KEY,
+    FirstName VARCHAR(50) NOT NULL,
+    MiddleName VARCHAR(50),
+    LastName VARCHAR(50) NOT NULL,
+    PhoneNo VARCHAR(20),
+    StartDate DATE,
+    BranchID INT NOT NULL,
+    ManagerID INT NULL,
+    FOREIGN KEY (BranchID) REFERENCES Branch (BranchID),
+    FOREIGN KEY (ManagerID) REFERENCES Employee (SSN) ON DELETE SET NULL
+) ENGINE=InnoDB;
+
+CREATE TABLE IF NOT EXISTS Customer (
+    SSN INT PRIMARY KEY,
+    FirstName VARCHAR(50) NOT NULL,
+    MiddleName VARCHAR(50),
+    LastName VARCHAR(50) NOT NULL,
+    StreetNumber VARCHAR(10) NOT NULL,
+    StreetName VARCHAR(100) NOT NULL,
+    ApartmentNumber VARCHAR(10),
+    City VARCHAR(100) NOT NULL,
+    State VARCHAR(50) NOT NULL,
+    ZipCode VARCHAR(10) NOT NULL,
+    PersonalBankerID INT NULL,
+    FOREIGN KEY (PersonalBankerID) REFERENCES Employee (SSN) ON DELETE SET NULL
+) ENGINE=InnoDB;
+
+CREATE TABLE IF NOT EXISTS Account (
+    AccountNumber INT PRIMARY KEY,
+    AccountType VARCHAR(20) NOT NULL,
+    Balance DECIMAL(15, 2) NOT NULL DEFAULT 0,
+    LastAccessDate DATE,
+    InterestRate DECIMAL(7, 4) NOT NULL DEFAULT 0,
+    OverdraftFlag BOOLEAN NOT NULL DEFAULT FALSE
+) ENGINE=InnoDB;
+
+CREATE TABLE IF NOT EXISTS Customer_Account (
+    SSN INT NOT NULL,
+    AccountNumber INT NOT NULL,
+    PRIMARY KEY (SSN, AccountNumber),
+    INDEX idx_customer_account_account (AccountNumber),
+    FOREIGN KEY (SSN) REFERENCES Customer (SSN) ON DELETE CASCADE,
+    FOREIGN KEY (AccountNumber) REFERENCES Account (AccountNumber) ON DELETE CASCADE
+) ENGINE=InnoDB;
+
+CREATE TABLE IF NOT EXISTS Loan (
+    LoanNumber INT PRIMARY KEY,
+    Amount DECIMAL(15, 2) NOT NULL,
+    MonthlyRepayment DECIMAL(15, 2) NOT NULL,
+    BranchID INT NOT NULL,
+    FOREIGN KEY (BranchID) REFERENCES Branch (BranchID)
+) ENGINE=InnoDB;
+
+CREATE TABLE IF NOT EXISTS `Transaction` (
+    TransactionID BIGINT AUTO_INCREMENT PRIMARY KEY,
+    TransactionType VARCHAR(20) NOT NULL,
+    TDate DATE NOT NULL,
+    TTime TIME NOT NULL,
+    Amount DECIMAL(15, 2) NOT NULL,
+    AccountNumber INT NOT NULL,
+    TransactionCharge DECIMAL(10, 2) NOT NULL DEFAULT 0,
+    INDEX idx_transaction_date (TDate, TTime, TransactionID),
+    FOREIGN KEY (AccountNumber) REFERENCES Account (AccountNumber) ON DELETE CASCADE
+) ENGINE=InnoDB;
+
+CREATE TABLE IF NOT EXISTS Users (
+    UserID INT AUTO_INCREMENT PRIMARY KEY,
+    Username VARCHAR(50) NOT NULL UNIQUE,
+    Password VARCHAR(255) NOT NULL,
+    UserType ENUM('Employee', 'Customer') NOT NULL,
+    CustomerSSN INT NULL,
+    EmployeeSSN INT NULL,
+    INDEX idx_users_customer (CustomerSSN),
+    INDEX idx_users_employee (EmployeeSSN)
+) ENGINE=InnoDB;
@@ -0,0 +1,17 @@
+-- Indexes backing the search in manage_customers and manage_employees.
+-- FULLTEXT indexes serve ranked word-prefix searches; the B-tree indexes
+-- serve the anchored LIKE 'term%' fallback used for short terms.
+
+ALTER TABLE Customer
+    ADD FULLTEXT INDEX ft_customer_name (FirstName, LastName),
+    ADD INDEX idx_customer_first_name (FirstName, LastName),
+    ADD INDEX idx_customer_last_name (LastName, FirstName);
+
+ALTER TABLE Employee
+    ADD FULLTEXT INDEX ft_employee_name (FirstName, LastName),
+    ADD INDEX idx_employee_first_name (FirstName, LastName),
+    ADD INDEX idx_employee_last_name (LastName, FirstName);
+
+ALTER TABLE Branch
+    ADD FULLTEXT INDEX ft_branch_name (Name),
+    ADD INDEX idx_branch_name (Name);
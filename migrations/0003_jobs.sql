@@ -0,0 +1,22 @@
+-- Persistent queue for background jobs (see "Background Jobs" in app.py).
+
+CREATE TABLE IF NOT EXISTS Job (
+    JobID BIGINT AUTO_INCREMENT PRIMARY KEY,
+    JobType VARCHAR(50) NOT NULL,
+    Status ENUM('queued', 'running', 'succeeded', 'failed') NOT NULL DEFAULT 'queued',
+    Payload MEDIUMTEXT NOT NULL,
+    Result MEDIUMTEXT NULL,
+    Error TEXT NULL,
+    Progress DECIMAL(5, 2) NOT NULL DEFAULT 0,
+    Attempts INT NOT NULL DEFAULT 0,
+    MaxAttempts INT NOT NULL DEFAULT 3,
+    RunAfter DATETIME(6) NOT NULL,
+    CreatedAt DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    StartedAt DATETIME NULL,
+    FinishedAt DATETIME NULL,
+    HeartbeatAt DATETIME NULL,
+    WorkerID VARCHAR(100) NULL,
+    CreatedBy VARCHAR(50) NULL,
+    INDEX idx_job_claim (Status, RunAfter),
+    INDEX idx_job_type_status (JobType, Status)
+) ENGINE=InnoDB;
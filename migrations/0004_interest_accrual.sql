@@ -0,0 +1,11 @@
+-- One row per business date; LastAccountNumber is the resume point for the nightly accrual.
+
+CREATE TABLE IF NOT EXISTS InterestAccrualRun (
+    BusinessDate DATE PRIMARY KEY,
+    Status ENUM('running', 'completed') NOT NULL DEFAULT 'running',
+    LastAccountNumber INT NOT NULL DEFAULT -1,
+    AccountsAccrued INT NOT NULL DEFAULT 0,
+    InterestCents BIGINT NOT NULL DEFAULT 0,
+    StartedAt DATETIME NOT NULL,
+    FinishedAt DATETIME NULL
+) ENGINE=InnoDB;
@@ -0,0 +1,4 @@
+-- Serves the statement run's per-account range scans in (TDate, TTime, TransactionID)
+-- order, and the keyset-paginated transaction history of a customer's accounts.
+
+ALTER TABLE `Transaction` ADD INDEX idx_transaction_account_date (AccountNumber, TDate, TTime, TransactionID);
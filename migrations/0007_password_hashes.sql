@@ -0,0 +1,3 @@
+-- Werkzeug hashes (method$salt$hash) are up to ~170 characters; widen older Password columns.
+
+ALTER TABLE Users MODIFY Password VARCHAR(255) NOT NULL;
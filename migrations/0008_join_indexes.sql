@@ -0,0 +1,18 @@
+-- Names the indexes behind the joins and lookups in app.py, so they exist even on
+-- databases created without the foreign keys in 0001 (InnoDB drops its implicit
+-- foreign key index once one of these can serve the constraint).
+--   Employee.BranchID         employee listing, branch aggregates
+--   Employee.ManagerID        manager lookups when editing an employee
+--   Customer.PersonalBankerID customer listing, account -> branch resolution
+--   Loan.BranchID             branch loan schedules (the primary key makes it ordered by LoanNumber)
+-- Customer_Account is covered both ways by its primary key and idx_customer_account_account.
+
+ALTER TABLE Employee
+    ADD INDEX idx_employee_branch (BranchID),
+    ADD INDEX idx_employee_manager (ManagerID);
+
+ALTER TABLE Customer
+    ADD INDEX idx_customer_banker (PersonalBankerID);
+
+ALTER TABLE Loan
+    ADD INDEX idx_loan_branch (BranchID);
@@ -0,0 +1,10 @@
+-- Idempotency keys for posting requests (see "Idempotency Keys" in app.py).
+-- KeyHash and RequestHash are truncated SHA-256 digests, so every row stays a few dozen bytes.
+
+CREATE TABLE IF NOT EXISTS IdempotencyKey (
+    KeyHash BINARY(16) PRIMARY KEY,
+    RequestHash BINARY(16) NOT NULL,
+    Result VARCHAR(1000) NULL,
+    ExpiresAt DATETIME NOT NULL,
+    INDEX idx_idempotency_expires (ExpiresAt)
+) ENGINE=InnoDB;
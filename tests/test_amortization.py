@@ -0,0 +1,84 @@
+from decimal import Decimal
+
+import pytest
+
+import app
+
+RATE = int(Decimal('6.5') * app.RATE_SCALE)
+
+
+def reference_schedule(amount_cents, payment_cents, rate_units):
+    """Month by month in plain Python: (interest, payment) per month."""
+    denominator = 100 * app.RATE_SCALE * 12
+    balance, months = amount_cents, []
+    while balance > 0:
+        interest = (2 * balance * rate_units + denominator) // (2 * denominator)
+        payment = min(payment_cents, balance + interest)
+        balance -= payment - interest
+        months.append((interest, payment))
+    return months
+
+
+def test_final_payment_is_the_remaining_balance_plus_interest():
+    result = app.amortize([100000], [10000], RATE, keep_schedule=True)
+    expected = reference_schedule(100000, 10000, RATE)
+
+    assert result['months'].tolist() == [len(expected)] == [11]
+    assert result['amortizing'].tolist() == [True]
+    assert result['total_interest'].tolist() == [sum(interest for interest, _ in expected)]
+    assert result['total_paid'].tolist() == [100000 + result['total_interest'][0]]
+    *_, last_payment, last_balance = result['schedule'][-1]
+    assert last_payment.tolist() == [expected[-1][1]] == [3094]
+    assert last_balance.tolist() == [0]
+
+
+def test_loans_of_different_lengths_run_together():
+    amounts, payments = [100000, 500000, 0], [10000, 5000, 1000]
+    result = app.amortize(amounts, payments, RATE)
+    assert result['months'].tolist() == [len(reference_schedule(a, p, RATE)) for a, p in zip(amounts, payments)]
+    assert result['amortizing'].tolist() == [True, True, True]
+
+
+def test_repayment_below_the_interest_never_amortizes():
+    result = app.amortize([100000], [100], RATE)
+    assert result['amortizing'].tolist() == [False]
+
+
+def test_loan_still_open_after_max_months_is_not_amortizing():
+    result = app.amortize([100000], [1000], RATE, max_months=12)
+    assert result['months'].tolist() == [12]
+    assert result['amortizing'].tolist() == [False]
+
+
+def test_balance_times_rate_beyond_int64_is_exact():
+    amount = 10 ** 15
+    rate = 100 * app.RATE_SCALE
+    result = app.amortize([amount], [amount], rate)
+    interest = reference_schedule(amount, amount, rate)[0][0]
+    assert result['months'].tolist() == [2]
+    assert int(result['total_interest'][0]) == interest + reference_schedule(interest, amount, rate)[0][0]
+
+
+def test_amounts_or_rates_beyond_int64_raise_value_error():
+    with pytest.raises(ValueError):
+        app.amortize([100000], [1000], 10 ** 30)
+    with pytest.raises(ValueError):
+        app.amortize([10 ** 25], [1000], RATE)
+
+
+@pytest.mark.parametrize('query, expected', [
+    ('', app.loan_config['annual_rate']),
+    ('?rate=0', Decimal('0')),
+    ('?rate=4.25', Decimal('4.25')),
+    ('?rate=100', Decimal('100')),
+])
+def test_get_loan_rate_accepts_percentages_in_range(query, expected):
+    with app.app.test_request_context('/' + query):
+        assert app.get_loan_rate() == expected
+
+
+@pytest.mark.parametrize('value', ['-1', '100.01', '1e30', 'NaN', 'Infinity', 'abc'])
+def test_get_loan_rate_rejects_out_of_range_rates(value):
+    with app.app.test_request_context('/', query_string={'rate': value}):
+        with pytest.raises(ValueError, match='between 0 and'):
+            app.get_loan_rate()
@@ -0,0 +1,42 @@
+import base64
+import json
+
+import pytest
+
+import app
+
+
+@pytest.fixture(autouse=True)
+def no_screening(monkeypatch):
+    # Requests would otherwise start the velocity rebuild against a database
+    monkeypatch.setitem(app.velocity_config, 'enabled', False)
+
+
+@pytest.fixture
+def client():
+    client = app.app.test_client()
+    with client.session_transaction() as session:
+        session['username'] = 'employee'
+        session['usertype'] = 'Employee'
+        session['user_id'] = 1
+    return client
+
+
+def cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip('=')
+
+
+@pytest.mark.parametrize('values', [[1.5], [True], [None], [[1]], [{'BranchID': 1}], ['²'], ['-'], ['1e3']])
+def test_edited_page_cursor_is_a_bad_request(client, values):
+    response = client.get('/api/v1/branches', query_string={'after': cursor(values)})
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'Invalid page cursor.'}
+
+
+def test_unknown_resource_is_not_found(client):
+    assert client.get('/api/v1/nothing').status_code == 404
+
+
+def test_api_requires_an_employee():
+    response = app.app.test_client().get('/api/v1/branches')
+    assert response.status_code == 401
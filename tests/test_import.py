@@ -0,0 +1,45 @@
+import io
+from decimal import Decimal
+
+import pytest
+
+import app
+
+LOANS = app.IMPORT_SPECS['loans']
+
+
+def loan(**fields):
+    row = {'LoanNumber': 1, 'Amount': '1000', 'MonthlyRepayment': '100', 'BranchID': 2}
+    row.update(fields)
+    return row
+
+
+def test_valid_row_is_converted():
+    assert app.validate_import_row(LOANS, loan(LoanNumber=' 7 ', Amount=1000.005, BranchID=2.0)) == {
+        'LoanNumber': 7, 'Amount': Decimal('1000.01'), 'MonthlyRepayment': Decimal('100.00'), 'BranchID': 2
+    }
+
+
+@pytest.mark.parametrize('fields, message', [
+    ({'LoanNumber': [1]}, 'LoanNumber: not a whole number'),
+    ({'LoanNumber': {'n': 1}}, 'LoanNumber: not a whole number'),
+    ({'LoanNumber': 1.9}, 'LoanNumber: not a whole number'),
+    ({'BranchID': True}, 'BranchID: not a whole number'),
+    ({'LoanNumber': '1.5'}, 'LoanNumber: invalid literal'),
+    ({'Amount': [1]}, 'Amount: not an amount'),
+    ({'Amount': 'NaN'}, 'Amount: not an amount'),
+    ({'BranchID': None}, 'BranchID is required'),
+])
+def test_bad_field_is_reported_as_value_error(fields, message):
+    with pytest.raises(ValueError, match=message):
+        app.validate_import_row(LOANS, loan(**fields))
+
+
+def test_jsonl_rows_that_are_not_objects_are_reported_per_line():
+    stream = io.StringIO('{"LoanNumber": 1}\n[1, 2]\n\nnot json\n')
+    rows = list(app.read_import_rows(stream, 'jsonl'))
+    assert [line for line, _ in rows] == [1, 2, 4]
+    assert rows[0][1] == {'LoanNumber': 1}
+    for _, raw in rows[1:]:
+        with pytest.raises(ValueError):
+            app.validate_import_row(LOANS, raw)
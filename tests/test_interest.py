@@ -0,0 +1,46 @@
+import random
+from decimal import Decimal, ROUND_HALF_UP
+
+import numpy as np
+
+import app
+
+
+def reference_interest(balance_cents, rate_units, day_count=365):
+    exact = Decimal(balance_cents) * rate_units / (100 * app.RATE_SCALE * day_count)
+    return int(exact.to_integral_value(rounding=ROUND_HALF_UP))
+
+
+def test_one_day_of_interest_in_cents():
+    # $1,000.00 at 5% for one day is 13.698... cents
+    assert app.compute_daily_interest([100000], [5 * app.RATE_SCALE]).tolist() == [14]
+
+
+def test_half_a_cent_rounds_up():
+    assert app.compute_daily_interest([182500000, 182499999], [1, 1]).tolist() == [1, 0]
+
+
+def test_non_positive_balance_or_rate_accrues_nothing():
+    interest = app.compute_daily_interest([0, -100000, 100000, 100000], [50000, 50000, 0, -50000])
+    assert interest.tolist() == [0, 0, 0, 0]
+
+
+def test_day_count_is_the_divisor():
+    assert app.compute_daily_interest([3600000], [app.RATE_SCALE], day_count=360).tolist() == [100]
+
+
+def test_matches_exact_decimal_arithmetic():
+    rng = random.Random(7)
+    balances = [rng.randint(1, 10 ** 12) for _ in range(1000)]
+    rates = [rng.randint(1, 30 * app.RATE_SCALE) for _ in range(1000)]
+    interest = app.compute_daily_interest(balances, rates)
+    assert interest.tolist() == [reference_interest(b, r) for b, r in zip(balances, rates)]
+
+
+def test_balances_too_large_for_int64_products_are_exact():
+    balance = 2 ** 62 // 1000
+    rate = 99 * app.RATE_SCALE
+    assert balance * rate > app.ACCRUAL_INT_LIMIT
+    interest = app.compute_daily_interest(np.array([balance, 100000]), np.array([rate, rate]))
+    assert interest.dtype == np.int64
+    assert interest.tolist() == [reference_interest(balance, rate), reference_interest(100000, rate)]
@@ -0,0 +1,38 @@
+import base64
+import json
+
+import pytest
+
+import app
+
+
+def test_cursor_round_trip():
+    token = app.encode_cursor(['2024-05-01', '13:45:00', 42])
+    assert '=' not in token
+    assert app.decode_cursor(token, 3) == ['2024-05-01', '13:45:00', '42']
+
+
+def test_cursor_with_wrong_number_of_values_is_rejected():
+    token = app.encode_cursor(['2024-05-01', '13:45:00', 42])
+    assert app.decode_cursor(token, 2) is None
+    assert app.decode_cursor(token, 4) is None
+
+
+@pytest.mark.parametrize('token', [
+    '',
+    'not a cursor',
+    '!!!!',
+    base64.urlsafe_b64encode(b'{"TDate": "2024-05-01"}').decode(),
+    base64.urlsafe_b64encode(b'"2024-05-01"').decode(),
+    base64.urlsafe_b64encode(b'[1, 2').decode(),
+    base64.urlsafe_b64encode(b'\xff\xfe\xfd').decode(),
+])
+def test_tampered_cursor_is_rejected(token):
+    assert app.decode_cursor(token, 3) is None
+
+
+def test_edited_cursor_only_yields_parameter_values():
+    # A hand-made token decodes to plain values that are only ever bound as query parameters
+    raw = json.dumps(['2024-05-01', "13:45:00') OR 1=1 --", 42]).encode()
+    token = base64.urlsafe_b64encode(raw).decode().rstrip('=')
+    assert app.decode_cursor(token, 3) == ['2024-05-01', "13:45:00') OR 1=1 --", 42]
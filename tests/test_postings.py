@@ -0,0 +1,105 @@
+from decimal import Decimal
+
+import pytest
+
+import app
+
+
+class FakeCursor:
+    """Answers post_entries' statements from a dict of account balances."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.rowcount = 0
+        self.lastrowid = None
+        self.row = None
+
+    def execute(self, query, params=()):
+        self.conn.statements.append((' '.join(query.split()), params))
+        if query.startswith('UPDATE Account'):
+            delta, account = params[0], params[1]
+            balance = self.conn.balances.get(account)
+            minimum = params[-1] if 'Account.Balance >=' in query else None
+            if balance is None or (minimum is not None and balance < minimum):
+                self.rowcount = 0
+            else:
+                self.conn.balances[account] = balance + delta
+                self.rowcount = 1
+        elif query.startswith('SELECT Account.AccountNumber'):
+            self.row = {'AccountNumber': params[0]} if params[0] in self.conn.balances else None
+        else:
+            self.conn.next_id += 1
+            self.lastrowid = self.conn.next_id
+
+    def fetchone(self):
+        return self.row
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, balances):
+        self.balances = dict(balances)
+        self.statements = []
+        self.next_id = 100
+
+    def cursor(self, **kwargs):
+        return FakeCursor(self)
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('10', Decimal('10.00')),
+    (' 10.5 ', Decimal('10.50')),
+    ('10.005', Decimal('10.01')),
+    ('10.004', Decimal('10.00')),
+    ('0.005', Decimal('0.01')),
+])
+def test_parse_amount_rounds_half_up_to_cents(value, expected):
+    amount = app.parse_amount(value)
+    assert amount == expected
+    assert amount.as_tuple().exponent == -2
+
+
+@pytest.mark.parametrize('value', ['', 'abc', 'NaN', 'Infinity', '1e999999999'])
+def test_parse_amount_rejects_non_numbers(value):
+    with pytest.raises(app.PostingError, match='Invalid amount'):
+        app.parse_amount(value)
+
+
+@pytest.mark.parametrize('value', ['0', '-5', '0.004'])
+def test_parse_amount_rejects_amounts_that_round_to_nothing(value):
+    with pytest.raises(app.PostingError, match='positive'):
+        app.parse_amount(value)
+
+
+def test_post_entries_applies_rounded_amounts():
+    conn = FakeConnection({1: Decimal('100.00'), 2: Decimal('0.00')})
+    postings = [app.Posting(1, 'Withdrawal', app.parse_amount('33.335')),
+                app.Posting(2, 'Deposit', app.parse_amount('33.335'))]
+
+    app.post_entries(conn, postings, update_aggregates=False)
+
+    assert conn.balances == {1: Decimal('66.66'), 2: Decimal('33.34')}
+    inserted = [params for query, params in conn.statements if query.startswith('INSERT INTO `Transaction`')]
+    assert [params[1] for params in inserted] == [Decimal('33.34'), Decimal('33.34')]
+
+
+def test_post_entries_locks_accounts_in_order_and_returns_ids_in_input_order():
+    conn = FakeConnection({1: Decimal('50.00'), 2: Decimal('50.00')})
+    postings = [app.Posting(2, 'Deposit', Decimal('1.00')), app.Posting(1, 'Deposit', Decimal('1.00'))]
+
+    transaction_ids = app.post_entries(conn, postings, update_aggregates=False)
+
+    updated = [params[1] for query, params in conn.statements if query.startswith('UPDATE Account')]
+    assert updated == [1, 2]
+    assert transaction_ids == [102, 101]
+
+
+def test_post_entries_rejects_overdraft_and_unknown_account():
+    conn = FakeConnection({1: Decimal('10.00')})
+    with pytest.raises(app.PostingError, match='Insufficient funds'):
+        app.post_entries(conn, [app.Posting(1, 'Withdrawal', Decimal('10.01'))], update_aggregates=False)
+    with pytest.raises(app.PostingError, match='Account not found'):
+        app.post_entries(conn, [app.Posting(9, 'Deposit', Decimal('1.00'))], update_aggregates=False)
+    assert conn.balances == {1: Decimal('10.00')}
@@ -0,0 +1,49 @@
+import app
+
+CUSTOMERS = app.SEARCH_SOURCES['customers']
+EMPLOYEES = app.SEARCH_SOURCES['employees']
+
+
+def test_empty_term_uses_prefix_lookups_only():
+    matches, params = app.build_search('', CUSTOMERS)
+    assert 'MATCH(' not in matches
+    assert matches.count('LIKE %s') == len(CUSTOMERS[0]['prefix'])
+    assert params == ['%'] * len(CUSTOMERS[0]['prefix'])
+
+
+def test_punctuation_only_term_is_escaped():
+    matches, params = app.build_search('%_', CUSTOMERS)
+    assert 'MATCH(' not in matches
+    assert set(params) == {'\\%\\_%'}
+
+
+def test_multi_word_term_requires_every_word_as_a_prefix():
+    matches, params = app.build_search('john smith', EMPLOYEES)
+    assert matches.count('AGAINST (%s IN BOOLEAN MODE)') == 2 * len(EMPLOYEES)
+    assert matches.count(' UNION ALL ') == len(EMPLOYEES) - 1
+    assert params == ['+john* +smith*'] * (2 * len(EMPLOYEES))
+
+
+def test_multi_word_term_with_a_short_word_falls_back_to_like():
+    matches, params = app.build_search('al smith', CUSTOMERS)
+    assert 'MATCH(' not in matches
+    assert params == ['al smith%'] * len(CUSTOMERS[0]['prefix'])
+
+
+def test_numeric_term_is_an_exact_key_lookup():
+    matches, params = app.build_search('123456789', CUSTOMERS)
+    assert 'Customer.SSN = %s' in matches
+    assert 'LIKE' not in matches and 'MATCH(' not in matches
+    assert params == [123456789]
+
+
+def test_numeric_term_without_exact_sources_searches_by_prefix():
+    matches, params = app.build_search('12', EMPLOYEES)
+    assert '= %s' not in matches
+    assert params == ['12%'] * sum(len(source['prefix']) for source in EMPLOYEES)
+
+
+def test_matches_are_grouped_to_one_row_per_key():
+    matches, _ = app.build_search('john smith', EMPLOYEES)
+    assert matches.startswith('SELECT MatchKey, MAX(Score) AS Score FROM (')
+    assert matches.endswith('GROUP BY MatchKey')
@@ -0,0 +1,123 @@
+from decimal import Decimal
+
+import pytest
+
+import app
+
+WINDOWS = [('1m', 60, 6), ('1h', 3600, 12)]
+START = 1_000_000_020  # On a 10 second bucket boundary
+
+
+def make_counters(max_keys=100):
+    return app.VelocityCounters(WINDOWS, max_keys)
+
+
+def test_events_count_towards_every_window():
+    counters = make_counters()
+    counters.add('k', START, 500)
+    counters.add('k', START + 5, 250)
+    assert counters.totals('k', START + 5) == {'1m': (2, 750), '1h': (2, 750)}
+
+
+def test_events_expire_once_their_bucket_leaves_the_window():
+    counters = make_counters()
+    counters.add('k', START, 100)
+    # The 1m window covers the current 10 second bucket and the five before it
+    assert counters.totals('k', START + 59)['1m'] == (1, 100)
+    assert counters.totals('k', START + 60)['1m'] == (0, 0)
+    assert counters.totals('k', START + 60)['1h'] == (1, 100)
+    assert counters.totals('k', START + 3600)['1h'] == (0, 0)
+
+
+def test_reused_slot_starts_from_zero():
+    counters = make_counters()
+    counters.add('k', START, 100)
+    counters.add('k', START + 60, 7)   # Same 1m slot, one lap later
+    assert counters.totals('k', START + 60)['1m'] == (1, 7)
+    assert counters.totals('k', START + 60)['1h'] == (2, 107)
+
+
+def test_late_event_for_an_overwritten_slot_is_dropped():
+    counters = make_counters()
+    counters.add('k', START + 60, 7)
+    counters.add('k', START, 100)
+    assert counters.totals('k', START + 60)['1m'] == (1, 7)
+
+
+def test_unknown_key_has_empty_totals():
+    assert make_counters().totals('missing', START) == {'1m': (0, 0), '1h': (0, 0)}
+
+
+def test_least_recently_active_keys_are_dropped():
+    counters = make_counters(max_keys=2)
+    counters.add('a', START, 1)
+    counters.add('b', START, 1)
+    counters.add('a', START, 1)
+    counters.add('c', START, 1)
+    assert len(counters) == 2
+    assert counters.totals('b', START)['1m'] == (0, 0)
+    assert counters.totals('a', START)['1m'] == (2, 2)
+
+
+def test_merge_adds_counts_in_matching_buckets():
+    rebuilt, live = make_counters(), make_counters()
+    rebuilt.add('k', START, 100)
+    rebuilt.add('old', START, 1)
+    live.add('k', START + 5, 10)
+    live.add('new', START, 3)
+    rebuilt.merge(live)
+    assert rebuilt.totals('k', START + 5) == {'1m': (2, 110), '1h': (2, 110)}
+    assert rebuilt.totals('new', START)['1m'] == (1, 3)
+    assert rebuilt.totals('old', START)['1m'] == (1, 1)
+
+
+def test_merge_keeps_the_newer_of_two_buckets_in_a_slot():
+    rebuilt, live = make_counters(), make_counters()
+    rebuilt.add('k', START, 100)
+    live.add('k', START + 3600, 1)   # Same slots in both windows, one lap later
+    rebuilt.merge(live)
+    assert rebuilt.totals('k', START + 3600) == {'1m': (1, 1), '1h': (1, 1)}
+
+
+def test_merge_keeps_the_key_limit():
+    rebuilt, live = make_counters(max_keys=2), make_counters()
+    for key in 'abc':
+        live.add(key, START, 1)
+    rebuilt.merge(live)
+    assert len(rebuilt) == 2
+
+
+@pytest.fixture
+def screen():
+    config = dict(app.velocity_config, windows=WINDOWS,
+                  limits=[('account', '1m', 2, Decimal('100.00'), 'reject'),
+                          ('customer', '1h', 5, None, 'flag')])
+    # Never started, so nothing is loaded from the database
+    return app.VelocityScreen(config)
+
+
+def test_debits_are_only_counted_once_recorded(screen):
+    pending = screen.check([app.Posting(1, 'Withdrawal', Decimal('10.00'))])
+    screen.check([app.Posting(1, 'Withdrawal', Decimal('10.00'))])
+    assert len(screen.counters) == 0
+    screen.record(pending)
+    assert screen.counters.totals(('account', 1), app.time.time())['1m'] == (1, 1000)
+    assert screen.stats['screened'] == 1
+
+
+def test_limit_counts_earlier_debits_in_the_same_check(screen):
+    with pytest.raises(app.PostingError):
+        screen.check([app.Posting(1, 'Withdrawal', Decimal('1.00'))] * 3)
+    assert screen.stats['rejected'] == 1
+
+
+def test_unenforced_limits_are_flagged_on_record(screen):
+    pending = screen.check([app.Posting(1, 'Withdrawal', Decimal('150.00'), owner_ssn=7)], enforce=False)
+    assert not screen.flags
+    screen.record(pending)
+    assert screen.flags[-1]['limits'] == ['account 1 1m']
+    assert screen.owners.get(1) == (7,)
+
+
+def test_credits_are_not_screened(screen):
+    assert screen.check([app.Posting(1, 'Deposit', Decimal('1000000.00'))]) == []